@@ -0,0 +1,301 @@
+"""Admission control: per-client rate limits and a cap on in-flight requests.
+
+Two checks run before a request reaches its route:
+
+* A token bucket per client and route. Each client may make
+  ``rate_limit_per_second`` requests per second to a route, in bursts of up
+  to ``rate_limit_burst``. Individual routes can have their own rate and
+  burst. A client over its rate gets a 429 straight away.
+* A cap on concurrent database-bound requests. Requests beyond
+  ``max_concurrent_requests`` wait in a bounded queue, in arrival order, for
+  up to ``admission_queue_timeout`` seconds. A request arriving at a full
+  queue, or still waiting when its time is up, gets a 503. Streaming routes
+  that hold their slot for a whole download, such as the export, may also
+  use at most ``max_concurrent_streams`` of those slots, and get a 503 at
+  once beyond that, so a few slow downloads cannot starve everything else.
+
+Both answers carry ``Retry-After`` and come back in microseconds, so an
+overloaded server sheds excess work instead of letting every request time
+out. Limits are per process; with ``baggers serve --workers N`` each worker
+enforces its own.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+from .config import Settings, settings
+
+# Routes that hold no database connection while they run, or run for as long
+# as the client stays connected, and so do not count against the cap.
+UNCAPPED_ROUTES = frozenset({"/baggers/changes/stream", "/cache/stats", "/metrics"})
+
+# Routes that hold a database connection for as long as the client keeps
+# reading, and so are limited to ``max_concurrent_streams`` of the slots.
+STREAMING_ROUTES = frozenset({"/baggers/export"})
+
+
+def parse_route_limits(spec: str) -> dict[str, tuple[float, int]]:
+    """Parse per-route rate limits.
+
+    Args:
+        spec: Comma-separated ``METHOD path=rate:burst`` entries, e.g.
+            ``GET /baggers/export=0.1:2``. The burst may be left out, in
+            which case it is the rate rounded up.
+
+    Returns:
+        Mapping of ``METHOD path`` to (requests per second, burst).
+
+    Raises:
+        ValueError: If an entry is malformed.
+    """
+    limits = {}
+    for entry in filter(None, (item.strip() for item in spec.split(","))):
+        route, _, limit = entry.rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        rate, _, burst = limit.partition(":")
+        if not method or not path.strip():
+            raise ValueError(f"Invalid route rate limit: {entry!r}")
+        rate = float(rate)
+        limits[f"{method.upper()} {path.strip()}"] = (
+            rate,
+            int(burst) if burst else max(1, math.ceil(rate)),
+        )
+    return limits
+
+
+class RateLimiter:
+    """Token buckets per client and route.
+
+    Buckets start full and are created on a client's first request. The
+    least recently used are dropped beyond ``max_clients``; a dropped
+    bucket would have refilled anyway unless its client was still busy.
+
+    Args:
+        rate: Requests per second each client may make to a route; 0 means
+            no limit.
+        burst: Requests a client may make at once before the rate applies.
+        routes: Per-route (rate, burst) overrides, keyed by ``METHOD path``.
+        max_clients: Most buckets kept.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        routes: dict[str, tuple[float, int]] | None = None,
+        max_clients: int = 100000,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.routes = routes or {}
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any route is rate limited."""
+        return self.rate > 0 or bool(self.routes)
+
+    def acquire(self, client: str, route: str, now: float | None = None) -> float:
+        """Take a token from the bucket for ``client`` and ``route``.
+
+        Args:
+            client: Client address.
+            route: ``METHOD path`` of the matched route.
+            now: Monotonic time in seconds; defaults to the current time.
+
+        Returns:
+            0 if the request may go ahead, otherwise the seconds until the
+            client's next token.
+        """
+        rate, burst = self.routes.get(route, (self.rate, self.burst))
+        if rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        key = (client, route)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(burst), now]
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        tokens = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rate
+
+
+class ConcurrencyLimiter:
+    """Cap on concurrent requests with a bounded first-come, first-served queue.
+
+    A released slot is handed straight to the longest waiting request, so new
+    arrivals cannot overtake the queue.
+
+    Args:
+        limit: Most requests running at once.
+        queue_size: Most requests waiting for a slot.
+        timeout: Seconds a request waits before giving up.
+    """
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        """Number of requests queued for a slot."""
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Wait for a slot.
+
+        Returns:
+            True once the caller holds a slot, which it must ``release``;
+            False if the queue is full or the wait timed out.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self.timeout):
+                await waiter
+        except TimeoutError:
+            pass
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        if waiter.done() and not waiter.cancelled():
+            # Handed a slot, possibly just as the timeout fired.
+            return True
+        self._abandon(waiter)
+        return False
+
+    def release(self):
+        """Give up a slot, handing it to the longest waiting request."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _abandon(self, waiter: asyncio.Future):
+        """Drop ``waiter`` from the queue, passing on a slot it was given."""
+        if waiter.done() and not waiter.cancelled():
+            self.release()
+        else:
+            waiter.cancel()
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying rate limits and the concurrency cap.
+
+    Only requests matching one of ``routes`` are checked; anything else, such
+    as a 404 or the API docs, is cheap to serve.
+
+    Args:
+        app: ASGI application to wrap.
+        routes: Routes to police, matched the way the router matches them.
+        config: Settings with the rate limits, cap and queue.
+    """
+
+    def __init__(self, app, routes: list, config: Settings = settings):
+        self.app = app
+        self.routes = routes
+        self.rate_limiter = RateLimiter(
+            config.rate_limit_per_second,
+            config.rate_limit_burst,
+            parse_route_limits(config.rate_limit_routes),
+            config.rate_limit_max_clients,
+        )
+        self.concurrency = None
+        if config.max_concurrent_requests > 0:
+            self.concurrency = ConcurrencyLimiter(
+                config.max_concurrent_requests,
+                config.admission_queue_size,
+                config.admission_queue_timeout,
+            )
+        # A stream holds its slot for minutes, so there is no point queueing.
+        self.streams = None
+        if config.max_concurrent_streams > 0:
+            self.streams = ConcurrencyLimiter(
+                config.max_concurrent_streams, 0, config.admission_queue_timeout
+            )
+        self.retry_after = max(1, math.ceil(config.admission_queue_timeout))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (
+            self.concurrency is None
+            and self.streams is None
+            and not self.rate_limiter.enabled
+        ):
+            await self.app(scope, receive, send)
+            return
+        route = self._match(scope)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope["client"][0] if scope.get("client") else ""
+        wait = self.rate_limiter.acquire(client, f"{scope['method']} {route.path}")
+        if wait:
+            await self._reject(scope, receive, send, route, 429, math.ceil(wait))
+            return
+        limiters = []
+        if self.streams is not None and route.path in STREAMING_ROUTES:
+            limiters.append(self.streams)
+        if self.concurrency is not None and route.path not in UNCAPPED_ROUTES:
+            limiters.append(self.concurrency)
+        acquired = []
+        try:
+            for limiter in limiters:
+                if not await limiter.acquire():
+                    await self._reject(
+                        scope, receive, send, route, 503, self.retry_after
+                    )
+                    return
+                acquired.append(limiter)
+            await self.app(scope, receive, send)
+        finally:
+            for limiter in acquired:
+                limiter.release()
+
+    def _match(self, scope):
+        """Find the route that will handle ``scope``, if it is policed."""
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route
+        return None
+
+    @staticmethod
+    async def _reject(scope, receive, send, route, status: int, retry_after: int):
+        # Label the rejection with its route in the request metrics.
+        scope["route"] = route
+        detail = "Too many requests" if status == 429 else "Server busy"
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status,
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,265 @@
+"""Lookup cache backends.
+
+Reads fill the cache after a miss, and writes drop the entries they change.
+A read that misses, queries the database and then stores its result can
+race a write: if the write commits and invalidates after the read's query
+but before its store, the store would put the old record back. To prevent
+that, a read takes a `lease` before querying and passes it to ``set``. The
+store is skipped (or undone) when the key was invalidated in between.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+from .config import Settings, settings
+
+
+class NullCache:
+    """Cache backend that stores nothing; used when caching is disabled."""
+
+    name = "none"
+
+    def get(self, key: str):
+        """Return the cached value for ``key``, or None on a miss."""
+        return None
+
+    def lease(self, key: str):
+        """Return a token to pass to ``set`` after reading ``key``'s value.
+
+        Take it before querying the database, so an invalidation of ``key``
+        while the query runs makes the later ``set`` a no-op.
+        """
+        return None
+
+    def set(self, key: str, value, lease=None):
+        """Cache a JSON-serialisable ``value`` under ``key``.
+
+        Args:
+            key: Cache key.
+            value: Value to store.
+            lease: Token from `lease`; the value is not kept if ``key`` was
+                invalidated since. None stores unconditionally.
+        """
+
+    def delete(self, *keys: str):
+        """Drop ``keys`` from the cache if present."""
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and the current entry count."""
+        return {
+            "backend": self.name,
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "entries": 0,
+        }
+
+
+class LRUCache(NullCache):
+    """In-process least-recently-used cache with a per-entry TTL.
+
+    Args:
+        max_entries: Maximum number of entries before the oldest is evicted.
+        ttl: Seconds an entry stays valid after it is set.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        # Invalidation counter, and the counter value at each key's latest
+        # invalidation. Only the most recent ``max_entries`` keys are
+        # remembered; leases older than the forgotten ones are refused.
+        self._generation = 0
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+        self._forgotten = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def lease(self, key: str):
+        with self._lock:
+            return self._generation
+
+    def set(self, key: str, value, lease=None):
+        with self._lock:
+            if lease is not None and (
+                lease < self._forgotten or self._invalidated.get(key, -1) > lease
+            ):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: str):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+                self._invalidated[key] = self._generation
+                self._invalidated.move_to_end(key)
+            while len(self._invalidated) > self.max_entries:
+                _, self._forgotten = self._invalidated.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+            }
+
+
+class RedisCache(NullCache):
+    """Cache backed by a Redis-compatible client.
+
+    Eviction and expiry are handled by the server, so only hits and misses
+    are counted here.
+
+    Each key has a generation counter, bumped before the key is deleted. A
+    lease is the counter's value; ``set`` stores the value, then rereads the
+    counter and deletes the value again if it moved. Since invalidation
+    bumps before it deletes, a racing write either deletes the stored value
+    itself or is seen by the reread.
+
+    Args:
+        client: Client exposing ``get``, ``set(..., ex=)``, ``delete``,
+            ``incr`` and ``expire``.
+        ttl: Seconds an entry stays valid after it is set.
+        prefix: Prefix added to every key.
+        async_client: Optional ``redis.asyncio`` client with the same
+            methods. Calls made inside an ``AsyncSession.run_sync`` (async
+            mode) go through it, so they do not block the event loop.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        client,
+        ttl: float = 300.0,
+        prefix: str = "baggers:",
+        async_client=None,
+    ):
+        self.client = client
+        self.async_client = async_client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _call(self, method: str, *args, **kwargs):
+        if self.async_client is not None and in_greenlet():
+            return await_only(getattr(self.async_client, method)(*args, **kwargs))
+        return getattr(self.client, method)(*args, **kwargs)
+
+    def _generation_key(self, key: str) -> str:
+        return f"{self.prefix}generation:{key}"
+
+    def get(self, key: str):
+        raw = self._call("get", self.prefix + key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def lease(self, key: str):
+        return self._call("get", self._generation_key(key)) or b"0"
+
+    def set(self, key: str, value, lease=None):
+        self._call(
+            "set", self.prefix + key, json.dumps(value), ex=max(1, int(self.ttl))
+        )
+        if lease is not None:
+            if (self._call("get", self._generation_key(key)) or b"0") != lease:
+                self._call("delete", self.prefix + key)
+
+    def delete(self, *keys: str):
+        for key in keys:
+            generation = self._generation_key(key)
+            self._call("incr", generation)
+            self._call("expire", generation, max(1, int(self.ttl)))
+        if keys:
+            self._call("delete", *(self.prefix + key for key in keys))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**super().stats(), "hits": self.hits, "misses": self.misses}
+
+
+def build_cache(config: Settings = settings) -> NullCache:
+    """Create the cache backend selected by ``BAGGERS_CACHE_BACKEND``.
+
+    Args:
+        config: Settings selecting and sizing the backend.
+
+    Returns:
+        Cache backend instance.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    if config.cache_backend == "none":
+        return NullCache()
+    if config.cache_backend == "memory":
+        return LRUCache(max_entries=config.cache_max_entries, ttl=config.cache_ttl)
+    if config.cache_backend == "redis":
+        import redis
+        import redis.asyncio
+
+        async_client = None
+        if config.async_mode:
+            async_client = redis.asyncio.Redis.from_url(config.cache_redis_url)
+        return RedisCache(
+            redis.Redis.from_url(config.cache_redis_url),
+            config.cache_ttl,
+            async_client=async_client,
+        )
+    raise ValueError(f"Unknown cache backend: {config.cache_backend}")
+
+
+_cache = build_cache()
+
+
+def get_cache() -> NullCache:
+    """Return the active cache backend."""
+    return _cache
+
+
+def configure_cache(backend: NullCache):
+    """Replace the active cache backend.
+
+    Args:
+        backend: Cache backend to use from now on.
+    """
+    global _cache
+    _cache = backend
@@ -0,0 +1,235 @@
+import argparse
+import sys
+from datetime import datetime, timedelta, timezone
+
+from . import crud, migrations, search, server, transfer
+from .config import settings
+from .database import SessionLocal, engine
+
+
+def rebuild_search(args: argparse.Namespace):
+    """Create and repopulate the full-text search index.
+
+    Args:
+        args: Parsed command line arguments.
+    """
+    search.rebuild(engine)
+    print("Search index rebuilt")
+
+
+def migrate(args: argparse.Namespace):
+    """Apply pending schema migrations, or list them with ``--status``.
+
+    Args:
+        args: Parsed command line arguments.
+    """
+    if args.status:
+        applied = migrations.applied_versions(engine)
+        for migration in migrations.MIGRATIONS:
+            state = "applied" if migration.version in applied else "pending"
+            print(f"{migration.version:04d} {migration.name}: {state}")
+        return
+    applied = migrations.upgrade(engine, target=args.to, log=print)
+    if not applied:
+        print("Database schema is up to date")
+
+
+def serve(args: argparse.Namespace):
+    """Run the API with multiple worker processes.
+
+    Args:
+        args: Parsed command line arguments.
+    """
+    server.serve(
+        settings,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        migrate=args.migrate,
+    )
+
+
+def compact_changes(args: argparse.Namespace):
+    """Remove superseded change log entries and expired tombstones.
+
+    Args:
+        args: Parsed command line arguments.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with SessionLocal() as db:
+        removed = crud.compact_changes(db, before=now - timedelta(days=args.days))
+        horizon = crud.get_change_horizon(db)
+    print(f"Removed {removed} change log entries; clients before {horizon} resync")
+
+
+def import_baggers(args: argparse.Namespace):
+    """Load baggers from a CSV, NDJSON or Parquet file.
+
+    Args:
+        args: Parsed command line arguments.
+    """
+
+    def report(summary: transfer.ImportSummary):
+        print(
+            f"{summary.position} records: {summary.created} created, "
+            f"{summary.updated} updated, {summary.rejected} rejected "
+            f"({summary.rows_per_second:,.0f} rows/s)",
+            file=sys.stderr,
+        )
+
+    try:
+        summary = transfer.import_file(
+            engine,
+            args.path,
+            format=args.format,
+            upsert=args.upsert,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            defer_indexes=not args.keep_indexes,
+            restart=args.restart,
+            rejects=args.rejects,
+            progress=report,
+        )
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from None
+    if summary.resumed_from:
+        print(f"Resumed after record {summary.resumed_from}", file=sys.stderr)
+    print(
+        f"Imported {summary.created + summary.updated} of {summary.position} "
+        f"records from {args.path}"
+    )
+
+
+def export_baggers(args: argparse.Namespace):
+    """Write every bagger to a CSV, NDJSON or Parquet file.
+
+    Args:
+        args: Parsed command line arguments.
+    """
+    try:
+        written = transfer.export_file(
+            engine,
+            args.path,
+            format=args.format,
+            progress=lambda rows: print(f"{rows} rows", file=sys.stderr),
+        )
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from None
+    print(f"Exported {written} baggers to {args.path}")
+
+
+def main(argv: list[str] | None = None):
+    """Entry point for the ``baggers`` command.
+
+    Args:
+        argv: Command line arguments, defaulting to ``sys.argv[1:]``.
+    """
+    parser = argparse.ArgumentParser(prog="baggers")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "rebuild-search", help="Create and repopulate the full-text search index"
+    ).set_defaults(handler=rebuild_search)
+
+    migrate_parser = commands.add_parser(
+        "migrate", help="Create or upgrade the database schema"
+    )
+    migrate_parser.add_argument(
+        "--to", type=int, help="Stop after this migration version (default: latest)"
+    )
+    migrate_parser.add_argument(
+        "--status",
+        action="store_true",
+        help="List migrations and whether each is applied",
+    )
+    migrate_parser.set_defaults(handler=migrate)
+
+    serve_parser = commands.add_parser(
+        "serve", help="Run the API with multiple worker processes"
+    )
+    serve_parser.add_argument(
+        "--host", help=f"Interface to bind (default: {settings.server_host})"
+    )
+    serve_parser.add_argument(
+        "--port", type=int, help=f"Port to bind (default: {settings.server_port})"
+    )
+    serve_parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes; 0 starts one per CPU (default: BAGGERS_WORKERS or 0)",
+    )
+    serve_parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="Apply pending migrations before starting the workers",
+    )
+    serve_parser.set_defaults(handler=serve)
+
+    compact = commands.add_parser(
+        "compact-changes", help="Remove superseded and expired change log entries"
+    )
+    compact.add_argument(
+        "--days",
+        type=float,
+        default=30,
+        help="Keep delete tombstones for this many days (default: 30)",
+    )
+    compact.set_defaults(handler=compact_changes)
+
+    import_parser = commands.add_parser(
+        "import", help="Load baggers from a CSV, NDJSON or Parquet file"
+    )
+    import_parser.add_argument("path", help="File to load")
+    import_parser.add_argument(
+        "--format",
+        choices=transfer.FORMATS,
+        help="File format (default: inferred from the suffix)",
+    )
+    import_parser.add_argument(
+        "--upsert",
+        action="store_true",
+        help="Update baggers whose membership number exists instead of rejecting",
+    )
+    import_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=50_000,
+        help="Records committed per transaction (default: 50000)",
+    )
+    import_parser.add_argument(
+        "--workers",
+        type=int,
+        help="Validation processes (default: one per CPU)",
+    )
+    import_parser.add_argument(
+        "--keep-indexes",
+        action="store_true",
+        help="Maintain secondary indexes during the load instead of rebuilding",
+    )
+    import_parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the checkpoint of an interrupted import of this file",
+    )
+    import_parser.add_argument(
+        "--rejects", help="Append rejected records to this file as NDJSON"
+    )
+    import_parser.set_defaults(handler=import_baggers)
+
+    export_parser = commands.add_parser(
+        "export", help="Write every bagger to a CSV, NDJSON or Parquet file"
+    )
+    export_parser.add_argument("path", help="File to write")
+    export_parser.add_argument(
+        "--format",
+        choices=transfer.FORMATS,
+        help="File format (default: inferred from the suffix)",
+    )
+    export_parser.set_defaults(handler=export_baggers)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
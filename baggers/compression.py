@@ -0,0 +1,287 @@
+"""Negotiated response compression: zstd, brotli and gzip.
+
+gzip is always available; brotli and zstd need the ``compression`` extra.
+Bodies below a minimum size are sent as they are. Streaming responses, such
+as the roster export, are compressed chunk by chunk as they are sent, never
+buffered whole. Server-Sent Events are left alone so each event is delivered
+as soon as it is written.
+
+Compressed bodies of responses carrying an ETag are kept in a bounded
+in-memory cache keyed by URL, ETag and coding. An unchanged page is then
+compressed once, however often it is fetched. Entries also record a CRC of
+the uncompressed body, so an ETag reused for different content (say, after
+the database is restored from a backup) is never answered from the cache.
+"""
+
+import zlib
+from collections import OrderedDict
+
+import anyio.to_thread
+
+from .config import Settings, settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the optional extra
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the optional extra
+    zstandard = None
+
+# Already compressed, or must reach the client as soon as each part is sent.
+EXCLUDED_MEDIA_TYPES = ("text/event-stream", "application/gzip", "application/zip")
+
+# Bodies at least this large are compressed on a worker thread so a high
+# compression level does not stall the event loop.
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+
+def _gzip(level: int):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def _brotli(level: int):
+    compressor = brotli.Compressor(quality=level)
+    return compressor.process, compressor.finish
+
+
+def _zstd(level: int):
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return compressor.compress, compressor.flush
+
+
+# Factories returning a (compress, finish) pair of callables for one body.
+ENCODERS = {"gzip": _gzip}
+if brotli is not None:
+    ENCODERS["br"] = _brotli
+if zstandard is not None:
+    ENCODERS["zstd"] = _zstd
+
+
+def compress(body: bytes, coding: str, level: int) -> bytes:
+    """Compress a whole body in one go.
+
+    Args:
+        body: Uncompressed bytes.
+        coding: Content coding, a key of ``ENCODERS``.
+        level: Compression level for that coding.
+
+    Returns:
+        Compressed bytes.
+    """
+    compress_chunk, finish = ENCODERS[coding](level)
+    return compress_chunk(body) + finish()
+
+
+def negotiate(accept_encoding: str, preferred: tuple[str, ...]) -> str | None:
+    """Choose a content coding from an ``Accept-Encoding`` header.
+
+    The coding with the highest quality value wins; ties go to the one
+    listed first in ``preferred``.
+
+    Args:
+        accept_encoding: Header value, e.g. ``gzip, br;q=0.9``.
+        preferred: Codings the server offers, most preferred first.
+
+    Returns:
+        Chosen coding, or None to send the body uncompressed.
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for coding in preferred:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class BodyCache:
+    """LRU cache of compressed bodies, bounded by their total size.
+
+    Args:
+        max_bytes: Total size of cached bodies; 0 disables the cache.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[tuple, tuple[int, bytes]] = OrderedDict()
+
+    def get(self, key: tuple, checksum: int) -> bytes | None:
+        """Return the cached body for ``key``, or None on a miss.
+
+        Args:
+            key: Cache key.
+            checksum: CRC-32 of the uncompressed body; an entry stored for
+                different content is treated as a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != checksum:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: tuple, checksum: int, body: bytes):
+        """Cache ``body`` under ``key``, evicting the least recently used."""
+        if len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous[1])
+        self._entries[key] = (checksum, body)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+def _header(headers: list, name: bytes) -> bytes | None:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses the client can decode.
+
+    Compressed responses get ``Content-Encoding`` and ``Vary:
+    Accept-Encoding``. A strong ETag is made weak, since the compressed
+    bytes differ from the uncompressed representation. ``If-None-Match``
+    still matches because it uses weak comparison.
+
+    Args:
+        app: ASGI application to wrap.
+        config: Settings choosing codings, levels and the size threshold.
+    """
+
+    def __init__(self, app, config: Settings = settings):
+        self.app = app
+        self.minimum_size = config.compression_min_size
+        self.preferred = tuple(
+            coding.strip()
+            for coding in config.compression_encodings.split(",")
+            if coding.strip() in ENCODERS
+        )
+        self.levels = {
+            "gzip": config.compression_gzip_level,
+            "br": config.compression_brotli_level,
+            "zstd": config.compression_zstd_level,
+        }
+        self.cache = BodyCache(config.compression_cache_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD" or not self.preferred:
+            await self.app(scope, receive, send)
+            return
+        accept = _header(scope["headers"], b"accept-encoding")
+        coding = negotiate(accept.decode("latin-1"), self.preferred) if accept else None
+        start = None
+        compress_chunk = finish = None
+
+        async def send_compressed(message):
+            nonlocal start, compress_chunk, finish
+            if message["type"] == "http.response.start":
+                if self._compressible(message):
+                    # Held back until the first body part shows whether the
+                    # response is large enough to compress.
+                    start = message
+                else:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            if compress_chunk is not None:
+                # Later parts of a streaming response.
+                chunk = compress_chunk(message.get("body", b""))
+                if not message.get("more_body", False):
+                    chunk += finish()
+                await send({**message, "body": chunk})
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if not more_body and len(body) < self.minimum_size:
+                held, start = start, None
+                await send(held)
+                await send(message)
+                return
+            if coding is None:
+                # Large enough that the client would get it compressed had
+                # it asked, so shared caches must key on Accept-Encoding.
+                held, start = start, None
+                vary = (b"vary", b"Accept-Encoding")
+                await send({**held, "headers": [*held["headers"], vary]})
+                await send(message)
+                return
+
+            headers = self._encoded(start["headers"], coding)
+            if more_body:
+                compress_chunk, finish = ENCODERS[coding](self.levels[coding])
+                await send({**start, "headers": headers})
+                await send({**message, "body": compress_chunk(body)})
+                return
+            body = await self._compress_whole(scope, start["headers"], body, coding)
+            headers.append((b"content-length", str(len(body)).encode()))
+            await send({**start, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, start: dict) -> bool:
+        if start["status"] in (204, 206, 304):
+            return False
+        headers = start.get("headers", [])
+        if _header(headers, b"content-encoding") is not None:
+            return False
+        media_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+        return media_type.partition(";")[0].strip() not in EXCLUDED_MEDIA_TYPES
+
+    async def _compress_whole(
+        self, scope, headers: list, body: bytes, coding: str
+    ) -> bytes:
+        """Compress a complete GET body, reusing a cached copy for the same ETag."""
+        etag = _header(headers, b"etag")
+        key = None
+        if etag is not None and scope["method"] == "GET":
+            key = (scope["path"], scope["query_string"], etag, coding)
+            checksum = zlib.crc32(body)
+            cached = self.cache.get(key, checksum)
+            if cached is not None:
+                return cached
+        level = self.levels[coding]
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            compressed = await anyio.to_thread.run_sync(compress, body, coding, level)
+        else:
+            compressed = compress(body, coding, level)
+        if key is not None:
+            self.cache.set(key, checksum, compressed)
+        return compressed
+
+    @staticmethod
+    def _encoded(headers: list, coding: str) -> list:
+        """Add the coding headers, drop the length and weaken a strong ETag."""
+        encoded = []
+        for key, value in headers:
+            if key.lower() == b"content-length":
+                continue
+            if key.lower() == b"etag" and not value.startswith(b"W/"):
+                value = b"W/" + value
+            encoded.append((key, value))
+        encoded.append((b"content-encoding", coding.encode()))
+        encoded.append((b"vary", b"Accept-Encoding"))
+        return encoded
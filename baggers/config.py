@@ -0,0 +1,113 @@
+import os
+import types
+from dataclasses import dataclass, fields
+from typing import Union, get_args, get_origin
+
+
+def _coerce(raw: str, annotation):
+    """Convert an environment variable string to a settings field type.
+
+    Args:
+        raw: Raw environment variable value.
+        annotation: Type annotation of the settings field.
+
+    Returns:
+        Value converted to the annotated type.
+    """
+    if get_origin(annotation) in (Union, types.UnionType):
+        if raw == "":
+            return None
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    if annotation is bool:
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    return annotation(raw)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Runtime configuration.
+
+    Every field can be overridden with a ``BAGGERS_<FIELD>`` environment
+    variable, e.g. ``BAGGERS_ASYNC_MODE=1``.
+    """
+
+    database_url: str = "sqlite:///./baggers.db"
+    replica_urls: str = ""
+    read_your_writes_seconds: float = 5.0
+    async_mode: bool = False
+
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_cache_size: int = -64000
+    sqlite_mmap_size: int = 268435456
+    sqlite_temp_store: str = "memory"
+    sqlite_busy_timeout: int = 5000
+    sqlite_memory: bool = False
+    sqlite_memory_persist_seconds: float = 0.0
+
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+
+    cache_backend: str = "none"
+    cache_max_entries: int = 10000
+    cache_ttl: float = 300.0
+    cache_redis_url: str = "redis://localhost:6379/0"
+
+    change_poll_interval: float = 1.0
+
+    phone_country_code: str = "61"
+
+    idempotency_ttl: float = 86400.0
+
+    group_commit: bool = False
+    group_commit_max_batch: int = 64
+    group_commit_max_wait_ms: float = 0.0
+
+    compression_encodings: str = "zstd,br,gzip"
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_level: int = 4
+    compression_zstd_level: int = 3
+    compression_cache_bytes: int = 33554432
+
+    rate_limit_per_second: float = 0.0
+    rate_limit_burst: int = 50
+    rate_limit_routes: str = ""
+    rate_limit_max_clients: int = 100000
+    max_concurrent_requests: int = 15
+    max_concurrent_streams: int = 2
+    admission_queue_size: int = 100
+    admission_queue_timeout: float = 2.0
+    max_page_size: int = 10000
+
+    metrics_enabled: bool = True
+    slow_query_ms: float = 100.0
+
+    server_host: str = "127.0.0.1"
+    server_port: int = 8000
+    workers: int = 0
+    server_backlog: int = 2048
+    server_keep_alive: int = 5
+    server_graceful_timeout: int = 30
+    server_access_log: bool = False
+
+    @classmethod
+    def from_env(cls, environ=os.environ) -> "Settings":
+        """Build settings from environment variables.
+
+        Args:
+            environ: Mapping to read ``BAGGERS_*`` variables from.
+
+        Returns:
+            Settings instance.
+        """
+        values = {}
+        for field in fields(cls):
+            raw = environ.get(f"BAGGERS_{field.name.upper()}")
+            if raw is not None:
+                values[field.name] = _coerce(raw, field.type)
+        return cls(**values)
+
+
+settings = Settings.from_env()
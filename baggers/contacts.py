@@ -0,0 +1,81 @@
+"""Normalized forms of contact details, for duplicate detection and lookups.
+
+Email addresses and phone numbers are stored as entered. Each bagger also
+carries an indexed normalized copy of both (``email_normalized`` and
+``phone_normalized``), written by the ``crud`` functions alongside the
+original, so members entered twice in different formats share a key.
+"""
+
+import re
+
+from .config import settings
+
+_NON_DIGITS = re.compile(r"\D")
+
+# E.164 numbers have at most 15 digits after the "+".
+MAX_PHONE_DIGITS = 15
+
+
+def normalize_email(email: str | None) -> str | None:
+    """Lower-case an email address and strip surrounding whitespace.
+
+    Args:
+        email: Email address as entered.
+
+    Returns:
+        Normalized address, or None if empty.
+    """
+    if email is None:
+        return None
+    return email.strip().lower() or None
+
+
+def normalize_phone(phone: str | None, country_code: str | None = None) -> str | None:
+    """Convert a phone number to E.164 form, e.g. ``+61412345678``.
+
+    Spaces, dashes, dots and brackets are dropped. Numbers starting with
+    ``+`` or ``00`` are taken as international. A leading ``0`` is a trunk
+    prefix, replaced with the country code; any other number is assumed to
+    be national without its trunk prefix.
+
+    Args:
+        phone: Phone number as entered.
+        country_code: Country calling code for national numbers, without
+            the ``+``. Defaults to ``settings.phone_country_code``.
+
+    Returns:
+        Normalized number, or None if it has no digits or too many.
+    """
+    if phone is None:
+        return None
+    phone = phone.strip()
+    digits = _NON_DIGITS.sub("", phone)
+    if digits and not phone.startswith("+"):
+        if digits.startswith("00"):
+            digits = digits[2:]
+        else:
+            country_code = country_code or settings.phone_country_code
+            digits = country_code + digits.removeprefix("0")
+    if not digits or len(digits) > MAX_PHONE_DIGITS:
+        return None
+    return f"+{digits}"
+
+
+def normalized_columns(values: dict) -> dict:
+    """Normalized columns for the contact details in a row of values.
+
+    Only columns whose source is present in ``values`` are returned, so a
+    partial update leaves the other normalized column alone.
+
+    Args:
+        values: Column values keyed by name, e.g. a ``BaggerCreate`` dump.
+
+    Returns:
+        Dict of ``email_normalized`` and/or ``phone_normalized`` values.
+    """
+    normalized = {}
+    if "emailAddress" in values:
+        normalized["email_normalized"] = normalize_email(values["emailAddress"])
+    if "phoneNumber" in values:
+        normalized["phone_normalized"] = normalize_phone(values["phoneNumber"])
+    return normalized
@@ -1,6 +1,94 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
-from . import models, schemas
+from . import cache, contacts, models, schemas, search
+from .database import is_replica
+
+BAGGER_COLUMNS = ("id", "name", "membershipNo", "emailAddress", "phoneNumber")
+# Cached records also carry the row version so ETags can be served from cache.
+CACHED_COLUMNS = (*BAGGER_COLUMNS, "version")
+
+
+def _insert(db: Session, table):
+    """Build an INSERT supporting ``ON CONFLICT`` for the session's dialect.
+
+    Args:
+        db: Database session.
+        table: Mapped class or table to insert into.
+
+    Returns:
+        SQLite or PostgreSQL ``Insert`` construct.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def _id_key(bagger_id: int) -> str:
+    return f"bagger:{bagger_id}"
+
+
+def _membership_key(membership_no: str) -> str:
+    return f"membership:{membership_no}"
+
+
+def _detach(db: Session, db_bagger):
+    """Detach a bagger loaded by a RETURNING clause from the session.
+
+    Committing expires every object in the session, which would make the next
+    attribute access issue another SELECT. The RETURNING row already holds the
+    committed values, so the object is detached before the commit instead.
+
+    Args:
+        db: Database session.
+        db_bagger: Bagger model instance or None.
+
+    Returns:
+        The same instance, now detached.
+    """
+    if db_bagger is not None:
+        db.expunge(db_bagger)
+    return db_bagger
+
+
+def invalidate(*baggers):
+    """Drop cache entries for baggers that were just written.
+
+    Membership keys only map to an ID and are re-checked against the cached
+    record on read, so dropping the ID key is enough to hide a changed
+    membership number; the membership key is dropped to free the slot.
+
+    Args:
+        baggers: Objects or rows with ``id`` and ``membershipNo`` attributes.
+    """
+    cache.get_cache().delete(
+        *(_id_key(bagger.id) for bagger in baggers),
+        *(_membership_key(bagger.membershipNo) for bagger in baggers),
+    )
+
+
+def _fill_cache(db: Session):
+    """Cache to fill after a miss.
+
+    Replicas may lag behind the primary, so rows read from one could put a
+    record back after its write invalidated it; their reads fill nothing.
+    """
+    if is_replica(db.get_bind()):
+        return cache.NullCache()
+    return cache.get_cache()
 
 
 def get_bagger(db: Session, bagger_id: int):
@@ -11,23 +99,199 @@ def get_bagger(db: Session, bagger_id: int):
         bagger_id: The ID of the bagger to retrieve.
 
     Returns:
-        Bagger model instance or None if not found.
+        Bagger model instance or None if not found. Cache hits return a
+        transient instance that is not attached to ``db``.
+    """
+    backend = cache.get_cache()
+    key = _id_key(bagger_id)
+    cached = backend.get(key)
+    if cached is not None:
+        return models.Bagger(**cached)
+
+    fill = _fill_cache(db)
+    lease = fill.lease(key)
+    db_bagger = db.query(models.Bagger).filter(models.Bagger.id == bagger_id).first()
+    if db_bagger is not None:
+        fill.set(
+            key,
+            {column: getattr(db_bagger, column) for column in CACHED_COLUMNS},
+            lease,
+        )
+    return db_bagger
+
+
+def get_bagger_fields(
+    db: Session, bagger_id: int, columns: tuple[str, ...]
+) -> dict | None:
+    """Get some of a bagger's columns, plus its row version.
+
+    A cached record is used when present; otherwise only ``columns`` and the
+    version are selected, and the cache is left as it is.
+
+    Args:
+        db: Database session.
+        bagger_id: The ID of the bagger to retrieve.
+        columns: Columns to return, a subset of ``BAGGER_COLUMNS``.
+
+    Returns:
+        Dictionary keyed by ``columns`` and ``version``, or None if not found.
     """
-    return db.query(models.Bagger).filter(models.Bagger.id == bagger_id).first()
+    cached = cache.get_cache().get(_id_key(bagger_id))
+    if cached is not None:
+        return {column: cached[column] for column in (*columns, "version")}
+    table = models.Bagger.__table__
+    row = (
+        db.execute(
+            select(*(table.c[name] for name in (*columns, "version"))).where(
+                table.c.id == bagger_id
+            )
+        )
+        .mappings()
+        .first()
+    )
+    return None if row is None else dict(row)
 
 
-def get_baggers(db: Session, skip: int = 0, limit: int = 100):
+def get_bagger_version(db: Session, bagger_id: int) -> int | None:
+    """Get a bagger's row version without loading the record.
+
+    Args:
+        db: Database session.
+        bagger_id: The ID of the bagger.
+
+    Returns:
+        Row version, or None if the bagger does not exist.
+    """
+    cached = cache.get_cache().get(_id_key(bagger_id))
+    if cached is not None:
+        return cached["version"]
+    return db.execute(
+        select(models.Bagger.version).where(models.Bagger.id == bagger_id)
+    ).scalar_one_or_none()
+
+
+def get_table_version(db: Session) -> int:
+    """Get the baggers table's change counter.
+
+    Every inserted, updated or deleted row appends to the change log, so the
+    newest sequence number changes whenever any list page could. Compaction
+    may delete the newest entry (an expired tombstone), so the compaction
+    horizon is included to keep the counter from going backwards.
+
+    Args:
+        db: Database session.
+
+    Returns:
+        Current change count.
+    """
+    changes = models.BaggerChange.__table__
+    latest, horizon = db.execute(
+        select(
+            select(func.max(changes.c.seq)).scalar_subquery(),
+            select(models.ChangeLogState.compacted_through).scalar_subquery(),
+        )
+    ).one()
+    return max(latest or 0, horizon or 0)
+
+
+def get_baggers(db: Session, skip: int = 0, limit: int = 100, after: int | None = None):
     """Get all baggers with optional pagination.
 
+    When ``after`` is given the page is read with a range scan on the primary
+    key instead of an OFFSET, so deep pages cost the same as the first one.
+
+    Args:
+        db: Database session.
+        skip: Number of records to skip. Ignored when ``after`` is set.
+        limit: Maximum number of records to return.
+        after: Only return baggers with an ID greater than this value.
+
+    Returns:
+        List of Bagger model instances ordered by ID.
+    """
+    query = db.query(models.Bagger).order_by(models.Bagger.id)
+    if after is not None:
+        query = query.filter(models.Bagger.id > after)
+    else:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+
+def _rows_query(columns: tuple[str, ...] = BAGGER_COLUMNS):
+    """Build the ID-ordered column query used by row-level (non-ORM) reads."""
+    table = models.Bagger.__table__
+    return select(*(table.c[name] for name in columns)).order_by(table.c.id)
+
+
+def get_bagger_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: int | None = None,
+    columns: tuple[str, ...] = BAGGER_COLUMNS,
+):
+    """Get a page of baggers as plain dictionaries.
+
+    Same paging as `get_baggers`, but selects the columns with a Core query so
+    no ORM objects are built; used by the list endpoint's fast response path.
+    Selecting fewer ``columns`` lets SQLite answer from a covering index
+    instead of reading whole rows.
+
     Args:
         db: Database session.
-        skip: Number of records to skip.
+        skip: Number of records to skip. Ignored when ``after`` is set.
         limit: Maximum number of records to return.
+        after: Only return baggers with an ID greater than this value.
+        columns: Columns to select, a subset of ``BAGGER_COLUMNS``.
 
     Returns:
-        List of Bagger model instances.
+        List of dictionaries keyed by ``columns``, ordered by ID.
     """
-    return db.query(models.Bagger).offset(skip).limit(limit).all()
+    query = _rows_query(columns)
+    if after is not None:
+        query = query.where(models.Bagger.id > after)
+    else:
+        query = query.offset(skip)
+    return [dict(row) for row in db.execute(query.limit(limit)).mappings()]
+
+
+def iter_baggers(bind, batch_size: int = 1000):
+    """Stream every bagger as a plain row tuple.
+
+    Rows are read through a server-side cursor on a dedicated connection, so
+    memory use does not grow with the size of the table and the stream can
+    outlive the request's session.
+
+    Args:
+        bind: Engine to read from.
+        batch_size: Number of rows fetched per round trip.
+
+    Yields:
+        Row tuples in ``BAGGER_COLUMNS`` order.
+    """
+    with bind.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=batch_size
+        ).execute(_rows_query())
+        yield from result
+
+
+async def aiter_baggers(bind, batch_size: int = 1000):
+    """Async variant of `iter_baggers`.
+
+    Args:
+        bind: AsyncEngine to read from.
+        batch_size: Number of rows fetched per round trip.
+
+    Yields:
+        Row tuples in ``BAGGER_COLUMNS`` order.
+    """
+    async with bind.connect() as conn:
+        result = await conn.stream(
+            _rows_query().execution_options(yield_per=batch_size)
+        )
+        async for row in result:
+            yield row
 
 
 def get_bagger_by_membership(db: Session, membership_no: str):
@@ -40,68 +304,539 @@ def get_bagger_by_membership(db: Session, membership_no: str):
     Returns:
         Bagger model instance or None if not found.
     """
-    return (
+    backend = cache.get_cache()
+    key = _membership_key(membership_no)
+    bagger_id = backend.get(key)
+    if bagger_id is not None:
+        db_bagger = get_bagger(db, bagger_id)
+        if db_bagger is not None and db_bagger.membershipNo == membership_no:
+            return db_bagger
+
+    fill = _fill_cache(db)
+    lease = fill.lease(key)
+    db_bagger = (
         db.query(models.Bagger)
         .filter(models.Bagger.membershipNo == membership_no)
         .first()
     )
+    if db_bagger is not None:
+        fill.set(key, db_bagger.id, lease)
+    return db_bagger
+
 
+def get_baggers_by_membership(
+    db: Session, membership_nos: list[str], chunk_size: int = 5000
+):
+    """Get many baggers by membership number.
+
+    Each chunk is resolved with a single ``IN (...)`` query on the unique
+    ``membershipNo`` index rather than one query per number.
+
+    Args:
+        db: Database session.
+        membership_nos: AFL membership numbers to search for.
+        chunk_size: Maximum number of membership numbers per query.
+
+    Returns:
+        List of Bagger model instances found, in no particular order.
+    """
+    unique = list(dict.fromkeys(membership_nos))
+    found = []
+    for start in range(0, len(unique), chunk_size):
+        chunk = unique[start : start + chunk_size]
+        found.extend(
+            db.query(models.Bagger).filter(models.Bagger.membershipNo.in_(chunk)).all()
+        )
+    return found
+
+
+def get_baggers_by_email(db: Session, email: str, limit: int = 100):
+    """Get the baggers with an email address, ignoring case and whitespace.
+
+    Args:
+        db: Database session.
+        email: Email address in any letter case.
+        limit: Maximum number of records to return.
 
-def create_bagger(db: Session, bagger: schemas.BaggerCreate):
+    Returns:
+        List of Bagger model instances ordered by ID.
+    """
+    return _get_baggers_by_contact(
+        db, models.Bagger.email_normalized, contacts.normalize_email(email), limit
+    )
+
+
+def get_baggers_by_phone(db: Session, phone: str, limit: int = 100):
+    """Get the baggers with a phone number, in any format.
+
+    Args:
+        db: Database session.
+        phone: Phone number, national or international.
+        limit: Maximum number of records to return.
+
+    Returns:
+        List of Bagger model instances ordered by ID.
+    """
+    return _get_baggers_by_contact(
+        db, models.Bagger.phone_normalized, contacts.normalize_phone(phone), limit
+    )
+
+
+def _get_baggers_by_contact(db: Session, column, value: str | None, limit: int):
+    if value is None:
+        return []
+    return (
+        db.query(models.Bagger)
+        .filter(column == value)
+        .order_by(models.Bagger.id)
+        .limit(limit)
+        .all()
+    )
+
+
+DUPLICATE_KEYS = {"email": "email_normalized", "phone": "phone_normalized"}
+
+
+def get_duplicates(
+    db: Session, by: str = "email", limit: int = 100, after: str | None = None
+):
+    """Find baggers sharing a normalized email address or phone number.
+
+    A single statement groups the normalized column's index in key order to
+    find keys used more than once, then reads those keys' baggers from the
+    same index. Pages of clusters are keyed on the normalized value, so each
+    page only scans the index from ``after`` onwards.
+
+    Args:
+        db: Database session.
+        by: ``email`` or ``phone``.
+        limit: Maximum number of clusters to return.
+        after: Only return clusters whose key sorts after this value.
+
+    Returns:
+        List of (key, rows) tuples ordered by key, where rows are
+        dictionaries keyed by ``BAGGER_COLUMNS``, ordered by ID.
+    """
+    table = models.Bagger.__table__
+    column = table.c[DUPLICATE_KEYS[by]]
+    keys = select(column).where(column.is_not(None))
+    if after is not None:
+        keys = keys.where(column > after)
+    keys = keys.group_by(column).having(func.count() > 1).order_by(column).limit(limit)
+    query = (
+        select(column.label("key"), *(table.c[name] for name in BAGGER_COLUMNS))
+        .where(column.in_(keys))
+        .order_by(column, table.c.id)
+    )
+    clusters = []
+    for row in db.execute(query).mappings():
+        if not clusters or clusters[-1][0] != row["key"]:
+            clusters.append((row["key"], []))
+        clusters[-1][1].append({name: row[name] for name in BAGGER_COLUMNS})
+    return clusters
+
+
+def search_baggers(
+    db: Session,
+    q: str,
+    limit: int = 20,
+    after: tuple[float, int] | None = None,
+):
+    """Full-text prefix search over name, email address and phone number.
+
+    Results are ranked by BM25 and paged with a keyset on ``(rank, id)``.
+    Databases without FTS5 fall back to case-insensitive regular expression
+    matching on word starts, unranked (every ``rank`` is 0) and in ID order.
+
+    Args:
+        db: Database session.
+        q: Search text; each word is matched as a prefix.
+        limit: Maximum number of records to return.
+        after: ``(rank, id)`` of the last result of the previous page.
+
+    Returns:
+        List of row mappings with the bagger columns plus ``rank``, best
+        match first.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return _search_baggers_regexp(db, q, limit, after)
+    match = search.build_match_query(q)
+    if not match:
+        return []
+
+    keyset = ""
+    params = {"match": match, "limit": limit}
+    if after is not None:
+        keyset = "AND (f.rank > :rank OR (f.rank = :rank AND f.rowid > :id))"
+        params["rank"], params["id"] = after
+    columns = ", ".join(f'b."{column}"' for column in BAGGER_COLUMNS)
+    return (
+        db.execute(
+            text(
+                f"SELECT {columns}, f.rank AS rank "
+                f"FROM {search.FTS_TABLE} AS f JOIN baggers AS b ON b.id = f.rowid "
+                f"WHERE {search.FTS_TABLE} MATCH :match {keyset} "
+                "ORDER BY f.rank, f.rowid LIMIT :limit"
+            ),
+            params,
+        )
+        .mappings()
+        .all()
+    )
+
+
+def _latest_change_seq(changes):
+    """Correlated subquery for the newest log entry of each row's bagger."""
+    newer = models.BaggerChange.__table__.alias("newer")
+    return (
+        select(func.max(newer.c.seq))
+        .where(newer.c.bagger_id == changes.c.bagger_id)
+        .scalar_subquery()
+    )
+
+
+def _change_seq_floor(db: Session) -> int:
+    """Lowest PostgreSQL change ``seq`` an uncommitted transaction could hold.
+
+    The next sequence value is read before the writers' advisory locks (see
+    `models.CHANGE_LOG_LOCK`): a writer not holding one yet draws its first
+    ``seq`` later, above that value. Both are read in statements before the
+    caller's query, so with READ COMMITTED every entry below the floor has
+    committed by the time the query takes its snapshot.
+    """
+    floor = db.execute(text(f"SELECT {models.NEXT_CHANGE_SEQ}")).scalar_one()
+    held = db.execute(
+        text(
+            "SELECT min(objid::bigint) FROM pg_locks WHERE locktype = 'advisory' "
+            "AND classid = CAST(:lock AS oid) AND objsubid = 2 AND database = "
+            "(SELECT oid FROM pg_database WHERE datname = current_database())"
+        ),
+        {"lock": models.CHANGE_LOG_LOCK},
+    ).scalar_one()
+    return floor if held is None else min(floor, held)
+
+
+def get_changes(db: Session, since: int = 0, limit: int = 1000):
+    """Get baggers changed after a change log sequence number.
+
+    Only each bagger's latest change is returned, so a client catching up
+    receives at most one entry per bagger however often it was written.
+
+    Args:
+        db: Database session.
+        since: Sequence number of the last change the client has applied.
+        limit: Maximum number of changes to return.
+
+    Returns:
+        List of row mappings with ``seq`` and ``operation`` plus the bagger
+        columns (None for deletes), in sequence order.
+    """
+    changes = models.BaggerChange.__table__
+    baggers = models.Bagger.__table__
+    query = (
+        select(
+            changes.c.seq,
+            changes.c.operation,
+            changes.c.bagger_id,
+            *(baggers.c[column] for column in BAGGER_COLUMNS if column != "id"),
+        )
+        .select_from(changes.outerjoin(baggers, baggers.c.id == changes.c.bagger_id))
+        .where(changes.c.seq > since, changes.c.seq == _latest_change_seq(changes))
+        .order_by(changes.c.seq)
+        .limit(limit)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.where(changes.c.seq < _change_seq_floor(db))
+    return db.execute(query).mappings().all()
+
+
+def get_change_horizon(db: Session) -> int:
+    """Get the sequence number the change log has been compacted through.
+
+    Clients that last synced before this point may have missed tombstones and
+    must resync from zero.
+
+    Args:
+        db: Database session.
+
+    Returns:
+        Compaction horizon, 0 if the log was never compacted.
+    """
+    return (
+        db.execute(select(models.ChangeLogState.compacted_through)).scalar_one_or_none()
+        or 0
+    )
+
+
+def compact_changes(db: Session, before: datetime) -> int:
+    """Remove change log entries no client needs any more.
+
+    Entries superseded by a later change to the same bagger are always
+    removed: a client syncing past them receives the later entry instead.
+    Tombstones written before ``before`` are removed too, and the horizon is
+    advanced past them so clients that might have missed them resync.
+
+    Args:
+        db: Database session.
+        before: Keep tombstones written at or after this UTC time.
+
+    Returns:
+        Number of entries removed.
+    """
+    changes = models.BaggerChange.__table__
+    removed = db.execute(
+        delete(changes).where(changes.c.seq < _latest_change_seq(changes))
+    ).rowcount
+
+    horizon = db.execute(
+        select(func.max(changes.c.seq)).where(
+            changes.c.operation == "delete", changes.c.changed_at < before
+        )
+    ).scalar_one_or_none()
+    if horizon is not None:
+        removed += db.execute(
+            delete(changes).where(
+                changes.c.operation == "delete", changes.c.seq <= horizon
+            )
+        ).rowcount
+        current = models.ChangeLogState.compacted_through
+        db.execute(
+            _insert(db, models.ChangeLogState)
+            .values(id=1, compacted_through=horizon)
+            .on_conflict_do_update(
+                index_elements=[models.ChangeLogState.id],
+                set_={
+                    "compacted_through": case(
+                        (current > horizon, current), else_=horizon
+                    )
+                },
+            )
+        )
+    db.commit()
+    return removed
+
+
+def _search_baggers_regexp(
+    db: Session, q: str, limit: int, after: tuple[float, int] | None
+):
+    """Portable fallback for `search_baggers` using regular expressions.
+
+    Every word must start a word in one of the searched columns, matching
+    case-insensitively like the FTS5 prefix query does.
+    """
+    words = search.terms(q)
+    if not words:
+        return []
+    columns = [models.Bagger.__table__.c[column] for column in search.FTS_COLUMNS]
+    query = _rows_query().add_columns(literal(0.0).label("rank"))
+    for word in words:
+        query = query.where(
+            or_(*(column.regexp_match(rf"(?i)(^|\W){word}") for column in columns))
+        )
+    if after is not None:
+        query = query.where(models.Bagger.id > after[1])
+    return db.execute(query.limit(limit)).mappings().all()
+
+
+def create_bagger(db: Session, bagger: schemas.BaggerCreate, commit: bool = True):
     """Create a new bagger.
 
     Args:
         db: Database session.
         bagger: Bagger data to create.
+        commit: Commit and invalidate the cache. Pass False to leave both to
+            the caller, e.g. to group several writes in one transaction.
 
     Returns:
         Created Bagger model instance.
     """
-    db_bagger = models.Bagger(
-        name=bagger.name,
-        membershipNo=bagger.membershipNo,
-        emailAddress=bagger.emailAddress,
-        phoneNumber=bagger.phoneNumber,
-    )
-    db.add(db_bagger)
-    db.commit()
-    db.refresh(db_bagger)
+    values = bagger.model_dump()
+    db_bagger = db.execute(
+        insert(models.Bagger)
+        .values(**values, **contacts.normalized_columns(values))
+        .returning(models.Bagger)
+    ).scalar_one()
+    _detach(db, db_bagger)
+    if commit:
+        db.commit()
+        invalidate(db_bagger)
     return db_bagger
 
 
-def update_bagger(db: Session, bagger_id: int, bagger: schemas.BaggerCreate):
-    """Update an existing bagger.
+def bulk_upsert_baggers(
+    db: Session,
+    baggers: list[schemas.BaggerCreate],
+    upsert: bool = False,
+    chunk_size: int = 1000,
+    commit: bool = True,
+):
+    """Insert many baggers in a single transaction.
+
+    Rows are written in chunks with one multi-row ``INSERT ... RETURNING`` per
+    chunk. Membership numbers that already exist are either updated in place
+    (``ON CONFLICT DO UPDATE``) or rejected, without failing the other rows.
+    When a membership number repeats within the batch, the last row wins in
+    upsert mode and the repeats are rejected otherwise.
+
+    Args:
+        db: Database session.
+        baggers: Bagger data to create or update.
+        upsert: Update existing baggers instead of rejecting them.
+        chunk_size: Number of rows written per statement.
+        commit: Commit and invalidate the cache. Pass False to leave both to
+            the caller, e.g. to commit more work in the same transaction.
+
+    Returns:
+        List of BulkResult objects, one per input row in the same order.
+    """
+    results: list[schemas.BulkResult | None] = [None] * len(baggers)
+    rows: dict[str, dict] = {}
+    owners: dict[str, list[int]] = {}
+    for index, bagger in enumerate(baggers):
+        membership_no = bagger.membershipNo
+        if membership_no in owners and not upsert:
+            results[index] = schemas.BulkResult(
+                index=index,
+                status="rejected",
+                membershipNo=membership_no,
+                detail="Duplicate membership number in batch",
+            )
+            continue
+        owners.setdefault(membership_no, []).append(index)
+        values = bagger.model_dump()
+        rows[membership_no] = {**values, **contacts.normalized_columns(values)}
+
+    pending = list(rows.values())
+    touched = []
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start : start + chunk_size]
+        existing = dict(
+            db.execute(
+                select(models.Bagger.membershipNo, models.Bagger.id).where(
+                    models.Bagger.membershipNo.in_(
+                        [row["membershipNo"] for row in chunk]
+                    )
+                )
+            ).all()
+        )
+        stmt = _insert(db, models.Bagger)
+        if upsert:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[models.Bagger.membershipNo],
+                set_={
+                    **{
+                        column: stmt.excluded[column]
+                        for column in (
+                            "name",
+                            "emailAddress",
+                            "phoneNumber",
+                            "email_normalized",
+                            "phone_normalized",
+                        )
+                    },
+                    "version": models.Bagger.version + 1,
+                    "updated_at": func.now(),
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(
+                index_elements=[models.Bagger.membershipNo]
+            )
+        returned = db.execute(
+            stmt.returning(models.Bagger.membershipNo, models.Bagger.id), chunk
+        ).all()
+        touched.extend(returned)
+        written = dict(returned)
+
+        for row in chunk:
+            membership_no = row["membershipNo"]
+            for position, index in enumerate(owners[membership_no]):
+                if membership_no not in written:
+                    result = schemas.BulkResult(
+                        index=index,
+                        status="rejected",
+                        membershipNo=membership_no,
+                        detail="Membership number already registered",
+                    )
+                else:
+                    created = position == 0 and membership_no not in existing
+                    result = schemas.BulkResult(
+                        index=index,
+                        status="created" if created else "updated",
+                        id=written[membership_no],
+                        membershipNo=membership_no,
+                    )
+                results[index] = result
+
+    if commit:
+        db.commit()
+        invalidate(*touched)
+    return results
+
+
+def update_bagger(
+    db: Session,
+    bagger_id: int,
+    bagger: schemas.BaggerCreate,
+    versions: list[int] | None = None,
+    commit: bool = True,
+):
+    """Update an existing bagger with a single ``UPDATE ... RETURNING``.
+
+    The row version is bumped and ``updated_at`` refreshed. Passing
+    ``versions`` makes the update conditional on the current version, which
+    gives optimistic concurrency without a separate read.
 
     Args:
         db: Database session.
         bagger_id: The ID of the bagger to update.
         bagger: Updated bagger data.
+        versions: Only update if the row version is one of these.
+        commit: Commit and invalidate the cache. Pass False to leave both to
+            the caller.
 
     Returns:
-        Updated Bagger model instance or None if not found.
+        Updated Bagger model instance, or None if not found or the version
+        did not match.
     """
-    db_bagger = db.query(models.Bagger).filter(models.Bagger.id == bagger_id).first()
-    if db_bagger:
-        update_data = bagger.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_bagger, key, value)
+    query = update(models.Bagger).where(models.Bagger.id == bagger_id)
+    if versions is not None:
+        query = query.where(models.Bagger.version.in_(versions))
+    values = bagger.model_dump(exclude_unset=True)
+    db_bagger = db.execute(
+        query.values(
+            **values,
+            **contacts.normalized_columns(values),
+            version=models.Bagger.version + 1,
+            updated_at=func.now(),
+        ).returning(models.Bagger)
+    ).scalar_one_or_none()
+    _detach(db, db_bagger)
+    if commit:
         db.commit()
-        db.refresh(db_bagger)
+        if db_bagger is not None:
+            invalidate(db_bagger)
     return db_bagger
 
 
-def delete_bagger(db: Session, bagger_id: int):
-    """Delete a bagger by ID.
+def delete_bagger(db: Session, bagger_id: int, versions: list[int] | None = None):
+    """Delete a bagger by ID with a single ``DELETE ... RETURNING``.
 
     Args:
         db: Database session.
         bagger_id: The ID of the bagger to delete.
+        versions: Only delete if the row version is one of these.
 
     Returns:
-        Deleted Bagger model instance or None if not found.
+        Deleted Bagger model instance, or None if not found or the version
+        did not match.
     """
-    db_bagger = db.query(models.Bagger).filter(models.Bagger.id == bagger_id).first()
-    if db_bagger:
-        db.delete(db_bagger)
-        db.commit()
+    query = delete(models.Bagger).where(models.Bagger.id == bagger_id)
+    if versions is not None:
+        query = query.where(models.Bagger.version.in_(versions))
+    db_bagger = db.execute(query.returning(models.Bagger)).scalar_one_or_none()
+    _detach(db, db_bagger)
+    db.commit()
+    if db_bagger is not None:
+        invalidate(db_bagger)
     return db_bagger
@@ -1,25 +1,489 @@
-from sqlalchemy import create_engine
+import itertools
+import sqlite3
+import threading
+import time
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./baggers.db"
+from . import metrics
+from .config import Settings, settings
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Async drivers substituted for each dialect's default sync driver.
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def to_async_url(url: str) -> str:
+    """Swap a database URL's driver for its async equivalent.
+
+    Args:
+        url: Database URL, e.g. ``postgresql+psycopg://host/db``.
+
+    Returns:
+        URL using the async driver, e.g. ``postgresql+asyncpg://host/db``.
+    """
+    parsed = make_url(url)
+    if parsed.get_dialect().is_async:
+        return url
+    driver = ASYNC_DRIVERS[parsed.get_backend_name()]
+    return parsed.set(
+        drivername=f"{parsed.get_backend_name()}+{driver}"
+    ).render_as_string(hide_password=False)
+
+
+SQLALCHEMY_DATABASE_URL = settings.database_url
+ASYNC_SQLALCHEMY_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+
+def _engine_options(url: str, config: Settings) -> dict:
+    """Build keyword arguments shared by the sync and async engine factories.
+
+    Args:
+        url: Database URL.
+        config: Settings supplying pool sizes.
+
+    Returns:
+        Keyword arguments for ``create_engine``/``create_async_engine``.
+    """
+    parsed = make_url(url)
+    options = {}
+    in_memory = False
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        in_memory = parsed.database in (None, "", ":memory:")
+    # In-memory SQLite uses a single-connection pool that takes no sizing.
+    if not in_memory:
+        is_async = parsed.get_dialect().is_async
+        options.update(
+            poolclass=(
+                metrics.TimedAsyncAdaptedQueuePool
+                if is_async
+                else metrics.TimedQueuePool
+            ),
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow,
+            pool_timeout=config.pool_timeout,
+        )
+    return options
+
+
+def _install_pragmas(sync_engine, config: Settings):
+    """Apply the SQLite tuning PRAGMAs to every new connection.
+
+    Other dialects are left untouched.
+
+    Args:
+        sync_engine: Engine (or an async engine's ``sync_engine``).
+        config: Settings supplying the PRAGMA values.
+    """
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={config.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={config.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA cache_size={config.sqlite_cache_size:d}")
+        cursor.execute(f"PRAGMA mmap_size={config.sqlite_mmap_size:d}")
+        cursor.execute(f"PRAGMA temp_store={config.sqlite_temp_store}")
+        cursor.execute(f"PRAGMA busy_timeout={config.sqlite_busy_timeout:d}")
+        cursor.close()
+
+
+def create_db_engine(
+    url: str = SQLALCHEMY_DATABASE_URL, config: Settings = settings, creator=None
+):
+    """Create an engine, tuned with PRAGMAs when it is SQLite.
+
+    Args:
+        url: Database URL.
+        config: Settings supplying PRAGMA values and pool sizes.
+        creator: Optional callable returning new DBAPI connections, e.g.
+            ``MemoryDatabase.connect``.
+
+    Returns:
+        SQLAlchemy Engine.
+    """
+    options = _engine_options(url, config)
+    if creator is not None:
+        options["creator"] = creator
+    engine = create_engine(url, **options)
+    _install_pragmas(engine, config)
+    if config.metrics_enabled:
+        metrics.instrument_engine(engine, config.slow_query_ms)
+    return engine
+
+
+def create_async_db_engine(
+    url: str = ASYNC_SQLALCHEMY_DATABASE_URL, config: Settings = settings
+):
+    """Create an async engine, tuned with PRAGMAs when it is SQLite.
+
+    Args:
+        url: Async database URL, e.g. ``sqlite+aiosqlite:///./baggers.db``.
+        config: Settings supplying PRAGMA values and pool sizes.
+
+    Returns:
+        SQLAlchemy AsyncEngine.
+
+    Raises:
+        ValueError: If in-memory serving is on; it only works with the sync
+            engine.
+    """
+    if config.sqlite_memory:
+        raise ValueError("BAGGERS_SQLITE_MEMORY cannot be combined with async mode")
+    async_engine = create_async_engine(url, **_engine_options(url, config))
+    _install_pragmas(async_engine.sync_engine, config)
+    if config.metrics_enabled:
+        metrics.instrument_engine(async_engine.sync_engine, config.slow_query_ms)
+    return async_engine
+
+
+class _MemoryConnection(sqlite3.Connection):
+    """Connection to the in-memory copy that reports commits to its owner."""
+
+    owner: "MemoryDatabase"
+    committed_changes = 0
+
+    def commit(self):
+        changes = self.total_changes
+        super().commit()
+        if changes != self.committed_changes:
+            self.committed_changes = changes
+            self.owner.committed()
+
+
+class MemoryDatabase:
+    """In-memory copy of a SQLite file that serves every query.
+
+    The file is copied into memory with the SQLite backup API on first
+    connect. Pool connections all open the same in-process ``memdb``
+    database. Whenever a commit changes rows, the whole copy is written back
+    to the file, again with the backup API:
+
+    * With ``persist_seconds`` 0, before the commit returns. A write that
+      returned successfully is on disk. If writing back fails, the commit
+      raises; the write stays in memory and goes out with the next one.
+    * Otherwise from a background thread, at most every ``persist_seconds``.
+      A crash loses at most that many seconds of writes; ``close`` writes
+      back whatever is left.
+
+    Each write-back replaces the file in a single transaction, so a crash
+    part-way leaves the previous copy intact, never a mix of the two. The
+    copy assumes it owns the file: changes made to it by anything else are
+    overwritten by the next write-back, so it needs a single worker process.
+    The ``memdb`` database has no WAL, so a commit waits for reads already
+    in progress, such as a streaming export, to finish.
+
+    Args:
+        path: Path of the SQLite database file.
+        persist_seconds: Write-back interval; 0 writes back synchronously.
+    """
+
+    def __init__(self, path: str, persist_seconds: float = 0.0):
+        self.path = path
+        self.persist_seconds = persist_seconds
+        # A name starting with "/" is shared by every connection in the
+        # process; the id keeps two instances apart.
+        self.uri = f"file:/baggers-{id(self):x}?vfs=memdb"
+        self.load_seconds = None
+        self.write_backs = 0
+        self._anchor = None
+        self._lock = threading.Lock()
+        self._persist_lock = threading.Lock()
+        self._commits = 0
+        self._persisted = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_url(cls, url: str, config: Settings) -> "MemoryDatabase":
+        """Create the in-memory copy of a SQLite URL's file.
+
+        Args:
+            url: ``sqlite:///path`` database URL.
+            config: Settings supplying the write-back interval.
+
+        Returns:
+            MemoryDatabase, not yet loaded.
+
+        Raises:
+            ValueError: If ``url`` is not a SQLite file.
+        """
+        parsed = make_url(url)
+        if parsed.get_backend_name() != "sqlite" or parsed.database in (
+            None,
+            "",
+            ":memory:",
+        ):
+            raise ValueError("In-memory serving needs a SQLite database file")
+        return cls(parsed.database, config.sqlite_memory_persist_seconds)
+
+    def load(self):
+        """Copy the file into memory, if not done already.
+
+        The connection holding the copy stays open until ``close``, since the
+        ``memdb`` database is freed once its last connection closes.
+        """
+        with self._lock:
+            if self._anchor is not None:
+                return
+            start = time.perf_counter()
+            source = sqlite3.connect(self.path)
+            try:
+                image = bytearray(source.serialize())
+            finally:
+                source.close()
+            # A WAL file's header marks it as such, and memdb cannot open a
+            # database so marked. Clear the flag (header bytes 18 and 19) in a
+            # private copy, then back that up into the shared database.
+            image[18:20] = b"\x01\x01"
+            staging = sqlite3.connect(":memory:")
+            anchor = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+            try:
+                staging.deserialize(image)
+                del image
+                staging.backup(anchor)
+            finally:
+                staging.close()
+            self._anchor = anchor
+            self.load_seconds = time.perf_counter() - start
+            if self.persist_seconds > 0:
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="baggers-write-back", daemon=True
+                )
+                self._thread.start()
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a connection to the in-memory copy, loading it first if needed.
+
+        Returns:
+            DBAPI connection, for use as an engine's ``creator``.
+        """
+        self.load()
+        conn = sqlite3.connect(
+            self.uri, uri=True, check_same_thread=False, factory=_MemoryConnection
+        )
+        conn.owner = self
+        return conn
+
+    def committed(self):
+        """Record a commit that changed rows, writing it back if synchronous."""
+        with self._lock:
+            self._commits += 1
+            commit = self._commits
+        if self.persist_seconds <= 0:
+            self.persist(commit)
+
+    def persist(self, commit: int | None = None):
+        """Write the in-memory copy back to the file if it has changed.
+
+        Concurrent callers share one write-back: a caller whose commit was
+        already written back by another returns straight away.
+
+        Args:
+            commit: Number of the caller's commit; None writes back every
+                commit so far.
+        """
+        with self._persist_lock:
+            with self._lock:
+                target = self._commits
+                anchor = self._anchor
+            if anchor is None or self._persisted >= (commit or target):
+                return
+            destination = sqlite3.connect(self.path)
+            try:
+                anchor.backup(destination)
+            finally:
+                destination.close()
+            self._persisted = target
+            self.write_backs += 1
+
+    def close(self):
+        """Stop the write-back thread, write back pending commits and free the copy."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        self.persist()
+        with self._lock:
+            anchor, self._anchor = self._anchor, None
+        if anchor is not None:
+            anchor.close()
+
+    def _run(self):
+        while not self._stop.wait(self.persist_seconds):
+            self.persist()
+
+
+class ReplicaRouter:
+    """Choose the engine that serves a request.
+
+    Reads (GET and HEAD) are spread round-robin over the replicas. Writes go
+    to the primary and set a cookie that pins the client's reads to the
+    primary for ``sticky_seconds``, so it reads its own writes even while the
+    replicas lag behind. The change feed is always read from the primary: on
+    PostgreSQL it is bounded by the writers' advisory locks (see
+    `models.CHANGE_LOG_LOCK`), which replicas do not see.
+
+    Replica engines are tagged with the ``REPLICA`` execution option (see
+    `is_replica`), so code holding a session can tell its rows may be stale.
+
+    Args:
+        primary: Engine for writes and pinned reads.
+        replicas: Read-only replica engines; with none, everything uses the
+            primary.
+        sticky_seconds: How long reads stay on the primary after a write.
+    """
+
+    COOKIE = "baggers_primary"
+    READ_METHODS = ("GET", "HEAD")
+    PRIMARY_PATHS = ("/baggers/changes",)
+    REPLICA = "baggers_replica"
+
+    def __init__(self, primary, replicas=(), sticky_seconds: float = 5.0):
+        self.primary = primary
+        self.replicas = [
+            replica.execution_options(**{self.REPLICA: True}) for replica in replicas
+        ]
+        self.sticky_seconds = sticky_seconds
+        self._next_replica = itertools.cycle(self.replicas)
+
+    def bind_for(self, request: Request, response: Response):
+        """Pick the engine for ``request``.
+
+        Args:
+            request: Incoming request.
+            response: Response the stickiness cookie is set on after a write.
+
+        Returns:
+            Engine (or AsyncEngine) to bind the request's session to.
+        """
+        if not self.replicas:
+            return self.primary
+        if request.method not in self.READ_METHODS:
+            response.set_cookie(
+                self.COOKIE, "1", max_age=int(self.sticky_seconds), httponly=True
+            )
+            return self.primary
+        if self.COOKIE in request.cookies:
+            return self.primary
+        if request.url.path.startswith(self.PRIMARY_PATHS):
+            return self.primary
+        return next(self._next_replica)
+
+
+def is_replica(bind) -> bool:
+    """Whether ``bind`` is a replica engine handed out by a `ReplicaRouter`.
+
+    Args:
+        bind: Engine or connection, e.g. from ``Session.get_bind()``.
+
+    Returns:
+        True for replica engines, False for the primary.
+    """
+    return bool(bind.get_execution_options().get(ReplicaRouter.REPLICA))
+
+
+def _replica_urls(config: Settings) -> list[str]:
+    return [url.strip() for url in config.replica_urls.split(",") if url.strip()]
+
+
+# In-memory serving copies the primary into memory; replicas stay on disk.
+memory_database = None
+if settings.sqlite_memory:
+    memory_database = MemoryDatabase.from_url(SQLALCHEMY_DATABASE_URL, settings)
+engine = create_db_engine(creator=memory_database and memory_database.connect)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+replica_router = ReplicaRouter(
+    engine,
+    [create_db_engine(url) for url in _replica_urls(settings)],
+    settings.read_your_writes_seconds,
+)
+
+# The async engine needs an async driver, so it is only created in async mode.
+async_engine = None
+AsyncSessionLocal = None
+async_replica_router = None
+if settings.async_mode:
+    async_engine = create_async_db_engine()
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+    async_replica_router = ReplicaRouter(
+        async_engine,
+        [create_async_db_engine(to_async_url(url)) for url in _replica_urls(settings)],
+        settings.read_your_writes_seconds,
+    )
 
 Base = declarative_base()
 
 
-def get_db():
+def get_sync_db(request: Request, response: Response):
     """Dependency to get database session.
 
+    Args:
+        request: Incoming request, used to route reads to a replica.
+        response: Outgoing response, used to pin the client after a write.
+
     Yields:
         Session: SQLAlchemy database session.
     """
-    db = SessionLocal()
+    db = SessionLocal(bind=replica_router.bind_for(request, response))
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request, response: Response):
+    """Dependency to get an async database session.
+
+    Args:
+        request: Incoming request, used to route reads to a replica.
+        response: Outgoing response, used to pin the client after a write.
+
+    Yields:
+        AsyncSession: SQLAlchemy async database session.
+    """
+    bind = async_replica_router.bind_for(request, response)
+    async with AsyncSessionLocal(bind=bind) as db:
+        yield db
+
+
+get_db = get_async_db if settings.async_mode else get_sync_db
+
+
+async def run_db(db, fn, /, *args, **kwargs):
+    """Run a synchronous ``crud`` function from an async route handler.
+
+    Async sessions run it on the event loop through ``AsyncSession.run_sync``;
+    sync sessions run it on the threadpool as FastAPI would for a sync route,
+    recording how long the call queued for a worker.
+
+    Args:
+        db: Session or AsyncSession.
+        fn: Function taking the sync session as its first argument.
+        args: Positional arguments passed on to ``fn``.
+        kwargs: Keyword arguments passed on to ``fn``.
+
+    Returns:
+        Whatever ``fn`` returns.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+
+    submitted = time.perf_counter()
+
+    def call():
+        metrics.record_threadpool_wait(time.perf_counter() - submitted)
+        return fn(db, *args, **kwargs)
+
+    return await run_in_threadpool(call)
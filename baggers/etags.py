@@ -0,0 +1,77 @@
+def bagger_etag(bagger_id: int, version: int) -> str:
+    """Build the strong ETag for a single bagger.
+
+    Args:
+        bagger_id: Bagger ID.
+        version: Row version, bumped on every update.
+
+    Returns:
+        Quoted entity tag, e.g. ``"12.3"``.
+    """
+    return f'"{bagger_id}.{version}"'
+
+
+def collection_etag(change_count: int) -> str:
+    """Build the strong ETag for a list of baggers.
+
+    Args:
+        change_count: Table-level change counter.
+
+    Returns:
+        Quoted entity tag, e.g. ``"c42"``.
+    """
+    return f'"c{change_count}"'
+
+
+def parse_etags(header: str) -> list[str]:
+    """Split an ``If-Match``/``If-None-Match`` header into entity tags.
+
+    Args:
+        header: Header value, e.g. ``"1.2", W/"1.3"`` or ``*``.
+
+    Returns:
+        Entity tags with any weak ``W/`` prefix kept, or ``["*"]``.
+    """
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def none_match(header: str | None, etag: str) -> bool:
+    """Evaluate ``If-None-Match`` with the weak comparison RFC 9110 requires.
+
+    Args:
+        header: ``If-None-Match`` header value, if sent.
+        etag: Current entity tag.
+
+    Returns:
+        True if the client's copy is current, i.e. a 304 should be sent.
+    """
+    if header is None:
+        return False
+    tags = parse_etags(header)
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def match_versions(header: str, bagger_id: int) -> list[int] | None:
+    """Extract the row versions an ``If-Match`` header allows for a bagger.
+
+    Weak tags never match under ``If-Match``, and tags for other baggers are
+    ignored.
+
+    Args:
+        header: ``If-Match`` header value.
+        bagger_id: ID of the bagger being modified.
+
+    Returns:
+        Allowed versions (possibly empty), or None for ``*`` (any version).
+    """
+    tags = parse_etags(header)
+    if "*" in tags:
+        return None
+    prefix = f'"{bagger_id}.'
+    versions = []
+    for tag in tags:
+        if tag.startswith(prefix) and tag.endswith('"'):
+            version = tag[len(prefix) : -1]
+            if version.isdigit():
+                versions.append(int(version))
+    return versions
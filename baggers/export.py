@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from .crud import BAGGER_COLUMNS
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _encode(rows: list, format: str) -> bytes:
+    """Encode a batch of row tuples.
+
+    Args:
+        rows: Row tuples in ``BAGGER_COLUMNS`` order.
+        format: ``ndjson`` or ``csv``.
+
+    Returns:
+        Encoded bytes for the batch.
+    """
+    if format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode()
+    return "".join(
+        json.dumps(dict(zip(BAGGER_COLUMNS, row)), separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode()
+
+
+def _header(format: str) -> bytes:
+    """Return the leading bytes of an export, i.e. the CSV header row."""
+    return (",".join(BAGGER_COLUMNS) + "\n").encode() if format == "csv" else b""
+
+
+def stream_export(rows, format: str, chunk_rows: int = 1000):
+    """Encode a row iterator into export chunks.
+
+    Rows are encoded ``chunk_rows`` at a time so each chunk is one write to
+    the client while only a single batch is held in memory.
+
+    Args:
+        rows: Iterator of row tuples.
+        format: ``ndjson`` or ``csv``.
+        chunk_rows: Number of rows per chunk.
+
+    Yields:
+        Encoded chunks.
+    """
+    yield _header(format)
+    rows = iter(rows)
+    while batch := list(islice(rows, chunk_rows)):
+        yield _encode(batch, format)
+
+
+async def astream_export(rows, format: str, chunk_rows: int = 1000):
+    """Async variant of `stream_export` for async row iterators.
+
+    Args:
+        rows: Async iterator of row tuples.
+        format: ``ndjson`` or ``csv``.
+        chunk_rows: Number of rows per chunk.
+
+    Yields:
+        Encoded chunks.
+    """
+    yield _header(format)
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) == chunk_rows:
+            yield _encode(batch, format)
+            batch = []
+    if batch:
+        yield _encode(batch, format)
@@ -0,0 +1,203 @@
+"""Group commit: coalesce concurrent single-record writes into one transaction.
+
+With group commit enabled, ``POST /baggers/`` and ``PUT /baggers/{id}`` hand
+their write to a queue instead of committing on their own. A single writer
+thread collects whatever is queued, up to ``max_batch`` writes or
+``max_wait`` seconds after the first one. It runs each write in its own
+savepoint and commits the whole batch at once, so a burst of writes pays for
+one commit (and one fsync) instead of one each.
+
+A write that fails, e.g. with an ``IntegrityError`` on a duplicate membership
+number, only rolls back its own savepoint and gets the exception back. If the
+commit itself fails, every write in the batch gets that error.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from sqlalchemy import text
+
+from . import crud
+from .config import Settings, settings
+from .database import SessionLocal
+
+
+@dataclass
+class _Write:
+    fn: object
+    kwargs: dict
+    future: Future = field(default_factory=Future)
+
+
+class GroupCommitter:
+    """Single writer thread that commits queued writes in batches.
+
+    Args:
+        session_factory: Callable returning a new sync Session on the primary.
+        max_batch: Most writes committed together.
+        max_wait: Seconds to wait for more writes after the first one arrives;
+            0 only takes writes that queued while the previous batch ran.
+    """
+
+    def __init__(self, session_factory, max_batch: int = 64, max_wait: float = 0.0):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: queue.Queue[_Write | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, fn, /, **kwargs) -> Future:
+        """Queue a write.
+
+        Args:
+            fn: ``crud`` write function accepting ``commit=False``.
+            kwargs: Keyword arguments passed on to ``fn``.
+
+        Returns:
+            Future resolving to ``fn``'s result once the batch has committed.
+        """
+        write = _Write(fn, kwargs)
+        # Enqueue under the lock, so a concurrent ``close`` cannot put its
+        # stop sentinel ahead of this write and leave it unanswered.
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="baggers-group-commit", daemon=True
+                )
+                self._thread.start()
+            self._queue.put(write)
+        return write.future
+
+    async def run(self, fn, /, **kwargs):
+        """Queue a write and wait for its result.
+
+        Args:
+            fn: ``crud`` write function accepting ``commit=False``.
+            kwargs: Keyword arguments passed on to ``fn``.
+
+        Returns:
+            Whatever ``fn`` returns.
+
+        Raises:
+            Exception: Whatever ``fn`` or the batch commit raised.
+        """
+        return await asyncio.wrap_future(self.submit(fn, **kwargs))
+
+    def close(self):
+        """Flush queued writes and stop the writer thread.
+
+        A later ``submit`` starts a new thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _collect(self, first: _Write) -> tuple[list[_Write], bool]:
+        """Gather a batch starting with ``first``.
+
+        Returns:
+            Tuple of (batch, whether the stop sentinel was reached).
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    write = self._queue.get(timeout=remaining)
+                else:
+                    write = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if write is None:
+                return batch, True
+            batch.append(write)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stopping = self._collect(first)
+            self._flush(batch)
+
+    def _flush(self, batch: list[_Write]):
+        """Run ``batch`` in one transaction and resolve each write's future."""
+        outcomes = []
+        with self.session_factory() as db:
+            try:
+                if db.get_bind().dialect.name == "sqlite":
+                    # pysqlite only opens a transaction before DML, so the
+                    # savepoints below would each commit on their own. BEGIN
+                    # IMMEDIATE also takes the write lock before any work.
+                    db.execute(text("BEGIN IMMEDIATE"))
+                for write in batch:
+                    try:
+                        with db.begin_nested():
+                            result = write.fn(db, **write.kwargs, commit=False)
+                    except Exception as exc:
+                        outcomes.append((write, None, exc))
+                    else:
+                        outcomes.append((write, result, None))
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                for write in batch:
+                    write.future.set_exception(exc)
+                return
+        self.batches += 1
+        self.writes += len(batch)
+        crud.invalidate(*(result for _, result, exc in outcomes if result is not None))
+        for write, result, exc in outcomes:
+            if exc is not None:
+                write.future.set_exception(exc)
+            else:
+                write.future.set_result(result)
+
+
+def build_committer(config: Settings = settings) -> GroupCommitter | None:
+    """Create the group committer described by ``config``.
+
+    Args:
+        config: Settings selecting and sizing group commit.
+
+    Returns:
+        GroupCommitter on the primary database, or None if disabled.
+    """
+    if not config.group_commit:
+        return None
+    return GroupCommitter(
+        SessionLocal,
+        max_batch=config.group_commit_max_batch,
+        max_wait=config.group_commit_max_wait_ms / 1000,
+    )
+
+
+_committer = build_committer()
+
+
+def get_committer() -> GroupCommitter | None:
+    """Return the active group committer, or None if group commit is off."""
+    return _committer
+
+
+def configure_committer(committer: GroupCommitter | None):
+    """Replace the active group committer.
+
+    Args:
+        committer: Group committer to use from now on, or None to disable.
+    """
+    global _committer
+    _committer = committer
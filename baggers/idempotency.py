@@ -0,0 +1,131 @@
+"""Idempotency keys: make retried writes safe to repeat.
+
+A client that sends ``Idempotency-Key`` with ``POST /baggers/`` or
+``PUT /baggers/{id}`` can retry the request after a timeout without writing
+twice. The first request to commit stores its response under the key, in the
+same transaction as the write. A retry with the same key and request gets the
+stored response back after one primary-key lookup on ``idempotency_keys``,
+without touching the ``baggers`` table.
+
+Only successful writes are stored. A failed write rolls back with nothing
+recorded, so its retry runs again and fails, or succeeds, on its own merits.
+If two requests with one key race, the second one's key insert conflicts.
+Its whole transaction, including its write, is rolled back, and it replays
+the first one's response.
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from . import crud, models
+from .config import settings
+
+# Expired keys removed by each stored response. More than one, so expired
+# rows are cleared faster than new ones arrive.
+PURGE_BATCH = 10
+
+
+def fingerprint(method: str, path: str, body: bytes) -> bytes:
+    """Identify a request, to tell a retry from a reused key.
+
+    Args:
+        method: HTTP method.
+        path: Request path.
+        body: Canonical request body.
+
+    Returns:
+        16-byte digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (method.encode(), path.encode(), body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.digest()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def get_response(db: Session, key: str):
+    """Get the response stored under a key that has not expired.
+
+    Args:
+        db: Database session.
+        key: Client-supplied idempotency key.
+
+    Returns:
+        Row with ``fingerprint``, ``body`` and ``etag``, or None.
+    """
+    table = models.IdempotencyKey.__table__
+    return db.execute(
+        select(table).where(table.c.key == key, table.c.expires_at > _utcnow())
+    ).one_or_none()
+
+
+def run(
+    db: Session,
+    write,
+    key: str,
+    fingerprint: bytes,
+    render,
+    commit: bool = True,
+    **kwargs,
+):
+    """Run a ``crud`` write and store its response under ``key``.
+
+    Expired keys, including an expired copy of ``key``, are removed in the
+    same transaction, a few at a time.
+
+    Args:
+        db: Database session.
+        write: ``crud`` write function accepting ``commit=False``.
+        key: Client-supplied idempotency key.
+        fingerprint: Request fingerprint from `fingerprint`.
+        render: Callable turning ``write``'s result into a tuple of (response
+            body, ETag).
+        commit: Commit and invalidate the cache. Pass False to leave both to
+            the caller, e.g. group commit.
+        kwargs: Keyword arguments passed on to ``write``.
+
+    Returns:
+        Whatever ``write`` returns. Nothing is stored if that is None.
+
+    Raises:
+        IntegrityError: If ``write`` fails on a constraint, or ``key`` was
+            stored by a concurrent request first.
+    """
+    result = write(db, **kwargs, commit=False)
+    if result is None:
+        return None
+    body, etag = render(result)
+    now = _utcnow()
+    table = models.IdempotencyKey.__table__
+    expired = (
+        select(table.c.key)
+        .where(table.c.expires_at <= now)
+        .order_by(table.c.expires_at)
+        .limit(PURGE_BATCH)
+    )
+    db.execute(
+        delete(table).where(
+            table.c.expires_at <= now,
+            (table.c.key == key) | table.c.key.in_(expired),
+        )
+    )
+    db.execute(
+        insert(table).values(
+            key=key,
+            fingerprint=fingerprint,
+            body=body,
+            etag=etag,
+            expires_at=now + timedelta(seconds=settings.idempotency_ttl),
+        )
+    )
+    if commit:
+        db.commit()
+        crud.invalidate(result)
+    return result
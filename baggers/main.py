@@ -1,11 +1,42 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from . import database, group_commit
+from .admission import AdmissionMiddleware
+from .compression import CompressionMiddleware
+from .config import settings
+from .metrics import MetricsMiddleware
 from .router import router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the in-memory database on startup; flush pending writes on shutdown."""
+    if database.memory_database is not None:
+        database.memory_database.load()
+    yield
+    committer = group_commit.get_committer()
+    if committer is not None:
+        committer.close()
+    if database.memory_database is not None:
+        database.memory_database.close()
+
+
 app = FastAPI(
     title="Baggers API",
     description="A simple API for managing contact details and AFL membership numbers",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.include_router(router)
+
+# Added innermost first: metrics wrap everything, so their timings include
+# compression and shed requests are counted, and admission control rejects
+# excess requests before any work is done for them.
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(AdmissionMiddleware, routes=router.routes)
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
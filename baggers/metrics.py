@@ -0,0 +1,346 @@
+"""Request-level performance metrics.
+
+``MetricsMiddleware`` times each request and, together with the engine hooks
+installed by ``instrument_engine``, attributes that time to SQL statements,
+threadpool queueing and connection pool checkout. Totals are kept as
+Prometheus histograms (served at ``GET /metrics``) and each response carries
+a ``Server-Timing`` header with its own breakdown.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .config import settings
+
+logger = logging.getLogger("baggers.slow_query")
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with a fixed set of labels.
+
+    Args:
+        name: Metric name.
+        documentation: Help text.
+        labelnames: Label names, in the order values are passed to ``observe``.
+        buckets: Upper bounds of the cumulative buckets, ascending.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        """Record one observation.
+
+        Args:
+            value: Observed value.
+            labels: Label values matching ``labelnames``.
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self) -> list[str]:
+        """Format the histogram in the Prometheus text exposition format.
+
+        Returns:
+            Exposition lines.
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = {
+                labels: ([*counts], count, total)
+                for labels, (counts, count, total) in self._series.items()
+            }
+        for labels, (counts, count, total) in sorted(series.items()):
+            pairs = [
+                f'{name}="{value}"' for name, value in zip(self.labelnames, labels)
+            ]
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = ",".join([*pairs, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {cumulative}")
+            le = ",".join([*pairs, 'le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{le}}} {count}")
+            suffix = f"{{{','.join(pairs)}}}" if pairs else ""
+            lines.append(f"{self.name}_count{suffix} {count}")
+            lines.append(f"{self.name}_sum{suffix} {total}")
+        return lines
+
+
+class Counter:
+    """Thread-safe Prometheus counter without labels.
+
+    Args:
+        name: Metric name, conventionally ending in ``_total``.
+        documentation: Help text.
+    """
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        """Increase the counter by ``amount``."""
+        with self._lock:
+            self.value += amount
+
+    def render(self) -> list[str]:
+        """Format the counter in the Prometheus text exposition format.
+
+        Returns:
+            Exposition lines.
+        """
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {self.value}",
+        ]
+
+
+REQUEST_SECONDS = Histogram(
+    "baggers_request_duration_seconds",
+    "Time from request start to the end of the response body.",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+REQUEST_STATEMENTS = Histogram(
+    "baggers_request_statements",
+    "SQL statements executed per request.",
+    ("method", "route"),
+    STATEMENT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "baggers_request_db_seconds",
+    "Time spent executing SQL statements per request.",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+THREADPOOL_WAIT_SECONDS = Histogram(
+    "baggers_threadpool_wait_seconds",
+    "Time database calls waited for a threadpool worker.",
+    (),
+    LATENCY_BUCKETS,
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    "baggers_pool_checkout_seconds",
+    "Time spent checking a connection out of the engine pool.",
+    (),
+    LATENCY_BUCKETS,
+)
+SLOW_QUERIES = Counter(
+    "baggers_slow_queries_total",
+    "SQL statements slower than BAGGERS_SLOW_QUERY_MS.",
+)
+
+REGISTRY = (
+    REQUEST_SECONDS,
+    REQUEST_STATEMENTS,
+    REQUEST_DB_SECONDS,
+    THREADPOOL_WAIT_SECONDS,
+    POOL_CHECKOUT_SECONDS,
+    SLOW_QUERIES,
+)
+
+
+def render() -> str:
+    """Render every metric in the Prometheus text exposition format.
+
+    Returns:
+        Exposition text for ``GET /metrics``.
+    """
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+@dataclass
+class RequestTimings:
+    """Time and statements attributed to the request being served."""
+
+    statements: int = 0
+    db_seconds: float = 0.0
+    threadpool_wait_seconds: float = 0.0
+    pool_checkout_seconds: float = 0.0
+
+    def server_timing(self, total_seconds: float) -> str:
+        """Format the timings as a ``Server-Timing`` header value.
+
+        Args:
+            total_seconds: Time spent on the request so far.
+
+        Returns:
+            Header value with ``db``, ``pool``, ``queue`` and ``app`` entries.
+        """
+        return ", ".join(
+            [
+                f'db;dur={self.db_seconds * 1000:.3f};desc="{self.statements} queries"',
+                f"pool;dur={self.pool_checkout_seconds * 1000:.3f}",
+                f"queue;dur={self.threadpool_wait_seconds * 1000:.3f}",
+                f"app;dur={total_seconds * 1000:.3f}",
+            ]
+        )
+
+
+# Threadpool workers and AsyncSession.run_sync both run in a copy of the
+# request's context, so they see (and update) the same RequestTimings.
+current_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "current_timings", default=None
+)
+
+
+def record_threadpool_wait(seconds: float):
+    """Record how long a database call queued for a threadpool worker.
+
+    Args:
+        seconds: Time between submitting the call and a worker starting it.
+    """
+    THREADPOOL_WAIT_SECONDS.observe(seconds)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.threadpool_wait_seconds += seconds
+
+
+class _TimedCheckout:
+    """Pool mixin recording how long ``connect()`` takes to hand out a connection."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            elapsed = time.perf_counter() - start
+            POOL_CHECKOUT_SECONDS.observe(elapsed)
+            timings = current_timings.get()
+            if timings is not None:
+                timings.pool_checkout_seconds += elapsed
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    """``QueuePool`` that records checkout time."""
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """``AsyncAdaptedQueuePool`` that records checkout time."""
+
+
+def instrument_engine(sync_engine, slow_query_ms: float | None = None):
+    """Time every statement executed on ``sync_engine``.
+
+    Statement counts and durations are added to the current request's
+    timings, and statements slower than ``slow_query_ms`` are logged to the
+    ``baggers.slow_query`` logger.
+
+    Args:
+        sync_engine: Engine (or an async engine's ``sync_engine``).
+        slow_query_ms: Slow-query threshold in milliseconds. Defaults to
+            ``settings.slow_query_ms``; ``0`` disables the log.
+    """
+    threshold = settings.slow_query_ms if slow_query_ms is None else slow_query_ms
+
+    # A connection runs one statement at a time, so one start time is kept.
+    # A failed statement's start is overwritten by the next one's.
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_start")
+        timings = current_timings.get()
+        if timings is not None:
+            timings.statements += 1
+            timings.db_seconds += elapsed
+        if threshold and elapsed * 1000 >= threshold:
+            SLOW_QUERIES.inc()
+            logger.warning(
+                "slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split())
+            )
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and database timings.
+
+    Routes are labelled by their path template (e.g. ``/baggers/{bagger_id}``)
+    so label cardinality stays bounded; unmatched paths share one label.
+
+    Args:
+        app: ASGI application to wrap.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                value = timings.server_timing(time.perf_counter() - start)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", value.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timings.reset(token)
+            route = scope.get("route")
+            label = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start, method, label, str(status)
+            )
+            REQUEST_STATEMENTS.observe(timings.statements, method, label)
+            REQUEST_DB_SECONDS.observe(timings.db_seconds, method, label)
@@ -0,0 +1,412 @@
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    func,
+    inspect,
+    text,
+)
+
+from . import contacts, models, search
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+_history = MetaData()
+schema_migrations = Table(
+    MIGRATIONS_TABLE,
+    _history,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One schema change.
+
+    Attributes:
+        version: Position in the migration order, starting at 1.
+        name: Short description shown by ``baggers migrate --status``.
+        upgrade: Function applying the change to a connection.
+        transactional: Run inside a transaction. Online index builds on
+            PostgreSQL (``CREATE INDEX CONCURRENTLY``) must run outside one.
+    """
+
+    version: int
+    name: str
+    upgrade: Callable
+    transactional: bool = True
+
+
+def _has_table(conn, name: str) -> bool:
+    return inspect(conn).has_table(name)
+
+
+def _initial_schema(conn):
+    """Create the baggers table and, on SQLite, its full-text search index.
+
+    Tables are declared here rather than taken from ``models`` so this step
+    keeps creating the original schema as the models evolve. Databases that
+    already have the table (from before migrations existed) are left as is.
+    """
+    metadata = MetaData()
+    Table(
+        "baggers",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True, autoincrement=True),
+        Column("name", String, nullable=False),
+        Column("membershipNo", String, nullable=False, unique=True, index=True),
+        Column("emailAddress", String, nullable=True),
+        Column("phoneNumber", String, nullable=True),
+    )
+    metadata.create_all(conn)
+    if conn.dialect.name == "sqlite":
+        had_index = _has_table(conn, search.FTS_TABLE)
+        for statement in search.CREATE_STATEMENTS:
+            conn.execute(text(statement))
+        if not had_index:
+            conn.execute(text(search.REBUILD_STATEMENT))
+
+
+def _row_version(conn):
+    """Add the ``version`` and ``updated_at`` columns used for ETags."""
+    columns = {column["name"] for column in inspect(conn).get_columns("baggers")}
+    if "version" not in columns:
+        conn.execute(
+            text("ALTER TABLE baggers ADD COLUMN version INTEGER NOT NULL DEFAULT '1'")
+        )
+    if "updated_at" not in columns:
+        if conn.dialect.name == "sqlite":
+            _rebuild_with_updated_at(conn, sorted(columns))
+        else:
+            conn.execute(
+                text(
+                    "ALTER TABLE baggers ADD COLUMN updated_at TIMESTAMP NOT NULL "
+                    "DEFAULT now()"
+                )
+            )
+
+
+def _rebuild_with_updated_at(conn, columns: list[str]):
+    """Add ``updated_at``, defaulting to the insert time, to SQLite's baggers.
+
+    SQLite cannot add a column with a non-constant default to a table that
+    has rows. The column is added with a placeholder default, then the table
+    is copied into one declaring the real default, with existing rows
+    stamped with the migration time. Indexes and triggers are recreated from
+    their original DDL.
+    """
+    placeholder = "DEFAULT '1970-01-01 00:00:00'"
+    conn.exec_driver_sql(
+        f"ALTER TABLE baggers ADD COLUMN updated_at DATETIME NOT NULL {placeholder}"
+    )
+    (table,) = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'baggers'"
+    ).one()
+    dependents = (
+        conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = 'baggers' "
+            "AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+        )
+        .scalars()
+        .all()
+    )
+    table = re.sub(
+        r"^CREATE TABLE\s+\S+", "CREATE TABLE baggers_rebuild", table, count=1
+    ).replace(placeholder, "DEFAULT (CURRENT_TIMESTAMP)")
+    copied = ", ".join(f'"{column}"' for column in columns)
+    conn.exec_driver_sql(table)
+    conn.exec_driver_sql(
+        f"INSERT INTO baggers_rebuild ({copied}) SELECT {copied} FROM baggers"
+    )
+    conn.exec_driver_sql("DROP TABLE baggers")
+    conn.exec_driver_sql("ALTER TABLE baggers_rebuild RENAME TO baggers")
+    for statement in dependents:
+        conn.exec_driver_sql(statement)
+
+
+def _change_log(conn):
+    """Create the change log and its triggers, seeded with every live bagger.
+
+    Seeding one ``create`` entry per existing bagger means a client syncing
+    from ``since=0`` receives the whole roster.
+    """
+    had_log = _has_table(conn, "bagger_changes")
+    metadata = MetaData()
+    Table(
+        "bagger_changes",
+        metadata,
+        Column("seq", Integer, primary_key=True, autoincrement=True),
+        Column("bagger_id", Integer, nullable=False),
+        Column("operation", String, nullable=False),
+        Column("changed_at", DateTime, nullable=False, server_default=func.now()),
+        Index("ix_bagger_changes_bagger_seq", "bagger_id", "seq"),
+        sqlite_autoincrement=True,
+    )
+    Table(
+        "change_log_state",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("compacted_through", Integer, nullable=False),
+    )
+    metadata.create_all(conn)
+    if had_log:
+        return
+    conn.execute(
+        text(
+            "INSERT INTO bagger_changes (bagger_id, operation) "
+            "SELECT id, 'create' FROM baggers ORDER BY id"
+        )
+    )
+    if conn.dialect.name == "sqlite":
+        statements = models.CHANGE_LOG_STATEMENTS
+    else:
+        statements = models.POSTGRESQL_CHANGE_LOG_STATEMENTS
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def _lookup_indexes(conn):
+    """Index ``name`` and ``emailAddress``, plus a covering list index on PostgreSQL.
+
+    On PostgreSQL the indexes are built with ``CREATE INDEX CONCURRENTLY``, so
+    reads and writes continue during the build. SQLite has no online build:
+    in WAL mode readers carry on, but writers wait until each index is done.
+    SQLite tables are stored in primary-key order already, so the list query
+    needs no covering index there.
+    """
+    concurrently = "CONCURRENTLY " if conn.dialect.name == "postgresql" else ""
+    statements = [
+        f"CREATE INDEX {concurrently}IF NOT EXISTS ix_baggers_name ON baggers (name)",
+        f'CREATE INDEX {concurrently}IF NOT EXISTS "ix_baggers_emailAddress" '
+        'ON baggers ("emailAddress")',
+    ]
+    if conn.dialect.name == "postgresql":
+        statements.append(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_baggers_list ON baggers (id) "
+            'INCLUDE (name, "membershipNo", "emailAddress", "phoneNumber")'
+        )
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def _projection_indexes(conn):
+    """Cover the common ``fields=`` list projections on SQLite.
+
+    Pages of ``id,membershipNo`` (gate scanners) or ``id,name`` (directory)
+    are then read from an index holding just those columns, in ID order,
+    rather than from whole table rows. On PostgreSQL ``ix_baggers_list``
+    already covers every column.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_baggers_id_membership "
+            'ON baggers (id, "membershipNo")'
+        )
+    )
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_baggers_id_name ON baggers (id, name)")
+    )
+
+
+def _import_checkpoints(conn):
+    """Record the progress of ``baggers import`` runs so they can resume."""
+    metadata = MetaData()
+    Table(
+        "import_checkpoints",
+        metadata,
+        Column("source", String, primary_key=True),
+        Column("fingerprint", String, nullable=False),
+        Column("position", Integer, nullable=False),
+        Column("created", Integer, nullable=False),
+        Column("updated", Integer, nullable=False),
+        Column("rejected", Integer, nullable=False),
+        Column("updated_at", DateTime, nullable=False, server_default=func.now()),
+    )
+    metadata.create_all(conn)
+
+
+def _normalized_contacts(conn, batch_size: int = 10_000):
+    """Add and backfill the normalized email and phone columns, indexed.
+
+    The backfill is not a change to any bagger, so the change log trigger is
+    disabled while it runs rather than logging an update per row.
+    """
+    columns = {column["name"] for column in inspect(conn).get_columns("baggers")}
+    for column in ("email_normalized", "phone_normalized"):
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE baggers ADD COLUMN {column} VARCHAR"))
+
+    sqlite = conn.dialect.name == "sqlite"
+    if sqlite:
+        conn.execute(text("DROP TRIGGER IF EXISTS bagger_changes_au"))
+    else:
+        conn.execute(text("ALTER TABLE baggers DISABLE TRIGGER bagger_changes_log"))
+    statement = text(
+        "UPDATE baggers SET email_normalized = :email_normalized, "
+        "phone_normalized = :phone_normalized WHERE id = :id"
+    )
+    last = 0
+    while rows := conn.execute(
+        text(
+            'SELECT id, "emailAddress", "phoneNumber" FROM baggers '
+            "WHERE id > :last ORDER BY id LIMIT :limit"
+        ),
+        {"last": last, "limit": batch_size},
+    ).all():
+        last = rows[-1][0]
+        updates = [
+            {
+                "id": bagger_id,
+                **contacts.normalized_columns(
+                    {"emailAddress": email, "phoneNumber": phone}
+                ),
+            }
+            for bagger_id, email, phone in rows
+            if email is not None or phone is not None
+        ]
+        if updates:
+            conn.execute(statement, updates)
+    if sqlite:
+        for statement in models.CHANGE_LOG_STATEMENTS:
+            conn.execute(text(statement))
+    else:
+        conn.execute(text("ALTER TABLE baggers ENABLE TRIGGER bagger_changes_log"))
+
+    for column in ("email_normalized", "phone_normalized"):
+        conn.execute(
+            text(
+                f"CREATE INDEX IF NOT EXISTS ix_baggers_{column} ON baggers ({column})"
+            )
+        )
+
+
+def _idempotency_keys(conn):
+    """Store responses to writes made with an ``Idempotency-Key`` header."""
+    metadata = MetaData()
+    Table(
+        "idempotency_keys",
+        metadata,
+        Column("key", String, primary_key=True),
+        Column("fingerprint", LargeBinary, nullable=False),
+        Column("body", LargeBinary, nullable=False),
+        Column("etag", String),
+        Column("expires_at", DateTime, nullable=False),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+    metadata.create_all(conn)
+
+
+def _ordered_change_log(conn):
+    """Let PostgreSQL change feed readers skip past no uncommitted entry.
+
+    Replaces the trigger function with one that records the transaction's
+    lowest possible ``seq`` in a ``models.CHANGE_LOG_LOCK`` advisory lock;
+    SQLite needs no change.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(models.POSTGRESQL_CHANGE_LOG_STATEMENTS[0]))
+
+
+def _email_index_name(conn):
+    """Restore the case of ``ix_baggers_emailAddress`` on PostgreSQL.
+
+    Migration 4 created it unquoted, so PostgreSQL folded the name to lower
+    case and imports, which drop and recreate it by name, built a second
+    copy.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(
+            text(
+                "ALTER INDEX IF EXISTS ix_baggers_emailaddress "
+                'RENAME TO "ix_baggers_emailAddress"'
+            )
+        )
+
+
+MIGRATIONS = (
+    Migration(1, "initial schema", _initial_schema),
+    Migration(2, "row version columns", _row_version),
+    Migration(3, "change log", _change_log),
+    Migration(4, "name and email indexes", _lookup_indexes, transactional=False),
+    Migration(5, "projection covering indexes", _projection_indexes),
+    Migration(6, "import checkpoints", _import_checkpoints),
+    Migration(7, "normalized contact columns", _normalized_contacts),
+    Migration(8, "idempotency keys", _idempotency_keys),
+    Migration(9, "ordered change log on PostgreSQL", _ordered_change_log),
+    Migration(10, "email index name on PostgreSQL", _email_index_name),
+)
+
+
+def applied_versions(bind) -> set[int]:
+    """List the migrations already applied to a database.
+
+    Args:
+        bind: Engine to inspect.
+
+    Returns:
+        Applied migration versions; empty for a database never migrated.
+    """
+    with bind.connect() as conn:
+        if not _has_table(conn, MIGRATIONS_TABLE):
+            return set()
+        return set(conn.execute(schema_migrations.select()).scalars())
+
+
+def upgrade(bind, target: int | None = None, log=None) -> list[Migration]:
+    """Apply pending migrations in order.
+
+    Each transactional migration commits together with its history row, so
+    an interrupted upgrade resumes at the first unapplied step. Steps are
+    also written to tolerate objects that already exist, which lets
+    databases created before migrations existed be brought under version
+    control by running every step.
+
+    Args:
+        bind: Engine to migrate.
+        target: Stop after this version; defaults to the latest.
+        log: Optional callable receiving a progress line per migration.
+
+    Returns:
+        Migrations applied by this call.
+    """
+    _history.create_all(bind)
+    done = applied_versions(bind)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done:
+            continue
+        if target is not None and migration.version > target:
+            break
+        start = time.perf_counter()
+        record = schema_migrations.insert().values(
+            version=migration.version, name=migration.name
+        )
+        if migration.transactional:
+            with bind.begin() as conn:
+                migration.upgrade(conn)
+                conn.execute(record)
+        else:
+            with bind.connect() as conn:
+                autocommit = conn.execution_options(isolation_level="AUTOCOMMIT")
+                migration.upgrade(autocommit)
+            with bind.begin() as conn:
+                conn.execute(record)
+        applied.append(migration)
+        if log is not None:
+            elapsed = time.perf_counter() - start
+            log(f"{migration.version:04d} {migration.name} ({elapsed:.2f}s)")
+    return applied
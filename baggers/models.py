@@ -1,13 +1,199 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import (
+    DDL,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    event,
+    func,
+)
 
+from . import search
 from .database import Base
 
 
 class Bagger(Base):
     __tablename__ = "baggers"
+    __table_args__ = (
+        Index("ix_baggers_name", "name"),
+        Index("ix_baggers_emailAddress", "emailAddress"),
+        Index(
+            "ix_baggers_list",
+            "id",
+            postgresql_include=["name", "membershipNo", "emailAddress", "phoneNumber"],
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_baggers_id_membership", "id", "membershipNo").ddl_if(
+            dialect="sqlite"
+        ),
+        Index("ix_baggers_id_name", "id", "name").ddl_if(dialect="sqlite"),
+        Index("ix_baggers_email_normalized", "email_normalized"),
+        Index("ix_baggers_phone_normalized", "phone_normalized"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, nullable=False)
     membershipNo = Column(String, nullable=False, unique=True, index=True)
     emailAddress = Column(String, nullable=True)
     phoneNumber = Column(String, nullable=True)
+    # Maintained by crud from emailAddress and phoneNumber; see contacts.py.
+    email_normalized = Column(String, nullable=True)
+    phone_normalized = Column(String, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(
+        DateTime, nullable=False, default=func.now(), server_default=func.now()
+    )
+
+
+class BaggerChange(Base):
+    """Append-only log of writes to the baggers table, in commit order.
+
+    Rows are added by triggers in the same transaction as the write they
+    record; deletes leave a tombstone with ``operation == "delete"``.
+    """
+
+    __tablename__ = "bagger_changes"
+    __table_args__ = (
+        Index("ix_bagger_changes_bagger_seq", "bagger_id", "seq"),
+        # Sequence numbers must never be reused after compaction deletes the
+        # newest entries, or clients could skip changes.
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    bagger_id = Column(Integer, nullable=False)
+    operation = Column(String, nullable=False)
+    changed_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class ChangeLogState(Base):
+    """Single-row record of how far the change log has been compacted."""
+
+    __tablename__ = "change_log_state"
+
+    id = Column(Integer, primary_key=True)
+    compacted_through = Column(Integer, nullable=False, default=0)
+
+
+class ImportCheckpoint(Base):
+    """Progress of an interrupted ``baggers import``, one row per source file.
+
+    Updated in the same transaction as each batch it counts, so a resumed
+    import starts exactly after the last committed batch.
+    """
+
+    __tablename__ = "import_checkpoints"
+
+    source = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+    created = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    updated_at = Column(
+        DateTime, nullable=False, default=func.now(), server_default=func.now()
+    )
+
+
+class IdempotencyKey(Base):
+    """Response to a write made with an ``Idempotency-Key`` header.
+
+    Written in the same transaction as the write, so a key is stored exactly
+    when its write committed. Rows past ``expires_at`` are ignored and
+    removed a few at a time by later writes.
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+
+    key = Column(String, primary_key=True)
+    fingerprint = Column(LargeBinary, nullable=False)
+    body = Column(LargeBinary, nullable=False)
+    etag = Column(String, nullable=True)
+    expires_at = Column(DateTime, nullable=False)
+
+
+# SQLite triggers fire once per affected row, one trigger per write kind.
+CHANGE_LOG_STATEMENTS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS bagger_changes_{suffix} AFTER {action} ON baggers
+    BEGIN
+        INSERT INTO bagger_changes (bagger_id, operation) VALUES ({row}.id, '{operation}');
+    END
+    """
+    for suffix, action, row, operation in (
+        ("ai", "INSERT", "new", "create"),
+        ("au", "UPDATE", "new", "update"),
+        ("ad", "DELETE", "old", "delete"),
+    )
+]
+
+# PostgreSQL draws ``seq`` from a sequence when the row is inserted, but
+# transactions commit in any order, so a reader could see seq 11 before 10
+# commits and then never go back for it. Before its first entry each writing
+# transaction takes a shared advisory lock keyed on the next ``seq`` it can
+# draw, held until commit; shared locks never wait on each other, so writers
+# run concurrently. ``crud.get_changes`` serves entries only below the lowest
+# key still held, which no uncommitted entry can precede (SQLite allows one
+# writer at a time already).
+CHANGE_LOG_LOCK = 0x62616767
+
+# Next value the change log sequence hands out; assumes the default CACHE 1.
+NEXT_CHANGE_SEQ = (
+    "coalesce(pg_sequence_last_value("
+    "pg_get_serial_sequence('bagger_changes', 'seq')::regclass), 0) + 1"
+)
+
+POSTGRESQL_CHANGE_LOG_STATEMENTS = [
+    f"""
+    CREATE OR REPLACE FUNCTION bagger_changes_log() RETURNS trigger AS $$
+    BEGIN
+        IF coalesce(current_setting('baggers.change_log_floor', true), '') = '' THEN
+            PERFORM set_config('baggers.change_log_floor', 'held', true);
+            PERFORM pg_advisory_xact_lock_shared(
+                {CHANGE_LOG_LOCK}, ({NEXT_CHANGE_SEQ})::integer
+            );
+        END IF;
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO bagger_changes (bagger_id, operation) VALUES (OLD.id, 'delete');
+        ELSE
+            INSERT INTO bagger_changes (bagger_id, operation)
+            VALUES (NEW.id, CASE TG_OP WHEN 'INSERT' THEN 'create' ELSE 'update' END);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER bagger_changes_log AFTER INSERT OR UPDATE OR DELETE ON baggers
+    FOR EACH ROW EXECUTE FUNCTION bagger_changes_log()
+    """,
+]
+
+
+# The full-text index is SQLite-specific DDL that the ORM does not model, so
+# it is created and dropped alongside the baggers table.
+for statement in search.CREATE_STATEMENTS:
+    event.listen(
+        Bagger.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite"),
+    )
+event.listen(
+    Bagger.__table__,
+    "after_drop",
+    DDL(search.DROP_STATEMENT).execute_if(dialect="sqlite"),
+)
+for statement in CHANGE_LOG_STATEMENTS:
+    event.listen(
+        BaggerChange.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite"),
+    )
+for statement in POSTGRESQL_CHANGE_LOG_STATEMENTS:
+    event.listen(
+        BaggerChange.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
@@ -0,0 +1,34 @@
+import base64
+import json
+
+
+def encode_cursor(*values) -> str:
+    """Encode keyset values into an opaque pagination cursor.
+
+    Args:
+        values: JSON-serialisable values identifying the last row of a page.
+
+    Returns:
+        URL-safe cursor token.
+    """
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str) -> list:
+    """Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        token: Cursor token supplied by the client.
+
+    Returns:
+        List of keyset values.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    padded = token + "=" * (-len(token) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    if not isinstance(values, list):
+        raise ValueError("Cursor must encode a list")
+    return values
@@ -0,0 +1,44 @@
+from functools import lru_cache
+from typing import Any, List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from .schemas import BaggerRow, bagger_projection
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the optional "fast" extra
+    orjson = None
+
+_rows_adapter = TypeAdapter(List[BaggerRow] | BaggerRow)
+
+
+@lru_cache(maxsize=None)
+def _projection_adapter(fields: tuple[str, ...]) -> TypeAdapter:
+    row = bagger_projection(fields)
+    return TypeAdapter(List[row] | row)
+
+
+class BaggerJSONResponse(JSONResponse):
+    """JSON response for plain bagger rows that skips model validation.
+
+    Route handlers that return this directly bypass FastAPI's
+    ``response_model`` validation; the rows come straight from the database,
+    so their shape is already known. Encoding uses orjson when installed and
+    otherwise a ``TypeAdapter`` over ``BaggerRow``, or over a trimmed copy of
+    it when ``fields`` names the columns the rows were projected to.
+    """
+
+    def __init__(
+        self, content: Any, *args, fields: tuple[str, ...] | None = None, **kwargs
+    ):
+        self.fields = fields
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        if self.fields is not None:
+            return _projection_adapter(self.fields).dump_json(content)
+        return _rows_adapter.dump_json(content)
@@ -1,122 +1,924 @@
-from typing import List
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import List, Literal
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.orm import Session
 
-from . import crud, models, schemas
-from .database import engine, get_db
-
-models.Base.metadata.create_all(bind=engine)
+from . import (
+    cache,
+    crud,
+    etags,
+    export,
+    group_commit,
+    idempotency,
+    metrics,
+    schemas,
+)
+from .config import settings
+from .database import get_db, run_db
+from .pagination import decode_cursor, encode_cursor
+from .responses import BaggerJSONResponse
 
 router = APIRouter()
 
 
+async def _write(db, fn, /, **kwargs):
+    """Run a single-record ``crud`` write, through group commit if enabled.
+
+    Args:
+        db: Session or AsyncSession, used when group commit is off.
+        fn: ``crud`` write function.
+        kwargs: Keyword arguments passed on to ``fn``.
+
+    Returns:
+        Whatever ``fn`` returns.
+    """
+    committer = group_commit.get_committer()
+    if committer is None:
+        return await run_db(db, fn, **kwargs)
+    return await committer.run(fn, **kwargs)
+
+
+def _render_bagger(db_bagger) -> tuple[bytes, str]:
+    """Encode a written bagger as stored for idempotent replay."""
+    body = schemas.Bagger.model_validate(db_bagger).model_dump_json()
+    return body.encode(), etags.bagger_etag(db_bagger.id, db_bagger.version)
+
+
+async def _replay(db, key: str, fingerprint: bytes) -> Response | None:
+    """Return the stored response for an idempotency key, if there is one.
+
+    Args:
+        db: Session or AsyncSession.
+        key: Client-supplied ``Idempotency-Key``.
+        fingerprint: Fingerprint of the current request.
+
+    Returns:
+        Replayed response, or None if the key is unused or expired.
+
+    Raises:
+        HTTPException: 422 if the key was used for a different request.
+    """
+    stored = await run_db(db, idempotency.get_response, key=key)
+    if stored is None:
+        return None
+    if stored.fingerprint != fingerprint:
+        raise HTTPException(
+            status_code=422, detail="Idempotency-Key was used for a different request"
+        )
+    headers = {"Idempotent-Replayed": "true"}
+    if stored.etag is not None:
+        headers["ETag"] = stored.etag
+    return Response(stored.body, media_type="application/json", headers=headers)
+
+
+async def _idempotent_write(db, key: str | None, fingerprint: bytes, fn, /, **kwargs):
+    """Run a single-record write, replaying its response on a retried key.
+
+    Args:
+        db: Session or AsyncSession.
+        key: Client-supplied ``Idempotency-Key``, or None.
+        fingerprint: Fingerprint of the current request; unused without a key.
+        fn: ``crud`` write function.
+        kwargs: Keyword arguments passed on to ``fn``.
+
+    Returns:
+        Whatever ``fn`` returns, or the replayed Response.
+
+    Raises:
+        IntegrityError: If the write fails on a constraint and no concurrent
+            request stored a response under the key.
+    """
+    if key is None:
+        return await _write(db, fn, **kwargs)
+    replay = await _replay(db, key, fingerprint)
+    if replay is not None:
+        return replay
+    try:
+        return await _write(
+            db,
+            idempotency.run,
+            write=fn,
+            key=key,
+            fingerprint=fingerprint,
+            render=_render_bagger,
+            **kwargs,
+        )
+    except IntegrityError:
+        await run_db(db, Session.rollback)
+        replay = await _replay(db, key, fingerprint)
+        if replay is None:
+            raise
+        return replay
+
+
 @router.post("/baggers/", response_model=schemas.Bagger)
-def create_bagger(bagger: schemas.BaggerCreate, db: Session = Depends(get_db)):
+async def create_bagger(
+    bagger: schemas.BaggerCreate,
+    response: Response,
+    idempotency_key: str | None = Header(default=None, max_length=255),
+    db: Session = Depends(get_db),
+):
     """Create a new bagger.
 
+    With ``Idempotency-Key``, a retry of a request that already succeeded
+    gets the original response back instead of creating the bagger again.
+
     Args:
         bagger: Bagger data to create.
+        response: Response used to set the ETag header.
+        idempotency_key: Client-chosen key identifying this request.
         db: Database session dependency.
 
     Returns:
         Created bagger object.
 
     Raises:
-        HTTPException: 422 if membership number already exists.
+        HTTPException: 422 if membership number already exists, or the
+            idempotency key was used for a different request.
     """
+    fingerprint = idempotency.fingerprint(
+        "POST", "/baggers/", bagger.model_dump_json().encode()
+    )
     try:
-        return crud.create_bagger(db=db, bagger=bagger)
+        db_bagger = await _idempotent_write(
+            db, idempotency_key, fingerprint, crud.create_bagger, bagger=bagger
+        )
     except IntegrityError:
-        db.rollback()
+        await run_db(db, Session.rollback)
         raise HTTPException(
             status_code=422, detail="Membership number already registered"
         )
+    if isinstance(db_bagger, Response):
+        return db_bagger
+    response.headers["ETag"] = etags.bagger_etag(db_bagger.id, db_bagger.version)
+    return db_bagger
+
+
+def _parse_bulk_body(body: bytes, content_type: str) -> list:
+    """Split a bulk request body into raw rows.
+
+    Args:
+        body: Raw request body.
+        content_type: Request Content-Type header.
+
+    Returns:
+        List of decoded rows. Undecodable NDJSON lines are returned as
+        ValueError instances so they can be rejected individually.
+
+    Raises:
+        HTTPException: 422 if a JSON body is not an array.
+    """
+    if content_type.startswith("application/x-ndjson"):
+        rows = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as exc:
+                rows.append(exc)
+        return rows
+
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        rows = None
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=422, detail="Expected a JSON array")
+    return rows
+
+
+@router.post("/baggers/bulk", response_model=schemas.BulkResponse)
+async def bulk_create_baggers(
+    request: Request, upsert: bool = False, db: Session = Depends(get_db)
+):
+    """Create or update many baggers in one transaction.
+
+    Accepts a JSON array, or NDJSON when sent as ``application/x-ndjson``.
+    Invalid rows and membership number conflicts are reported per row rather
+    than failing the whole batch.
+
+    Args:
+        request: Incoming request carrying the batch.
+        upsert: Update existing baggers with matching membership numbers.
+        db: Database session dependency.
+
+    Returns:
+        Per-row results with created/updated/rejected totals.
+
+    Raises:
+        HTTPException: 422 if a JSON body is not an array.
+    """
+    rows = _parse_bulk_body(
+        await request.body(), request.headers.get("content-type", "")
+    )
+
+    results: list[schemas.BulkResult | None] = [None] * len(rows)
+    valid, positions = [], []
+    for index, row in enumerate(rows):
+        try:
+            if isinstance(row, ValueError):
+                raise row
+            valid.append(schemas.BaggerCreate.model_validate(row))
+            positions.append(index)
+        except ValidationError as exc:
+            detail = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                for error in exc.errors()
+            )
+            results[index] = schemas.BulkResult(
+                index=index, status="rejected", detail=detail
+            )
+        except ValueError:
+            results[index] = schemas.BulkResult(
+                index=index, status="rejected", detail="Invalid JSON"
+            )
+
+    outcomes = await run_db(db, crud.bulk_upsert_baggers, valid, upsert=upsert)
+    for index, outcome in zip(positions, outcomes):
+        results[index] = outcome.model_copy(update={"index": index})
+
+    return schemas.BulkResponse(
+        created=sum(result.status == "created" for result in results),
+        updated=sum(result.status == "updated" for result in results),
+        rejected=sum(result.status == "rejected" for result in results),
+        results=results,
+    )
+
+
+def _page_limit(limit: int) -> int:
+    """Clamp a requested page size to ``settings.max_page_size``.
+
+    A negative limit, which SQLite reads as "no limit", gets the ceiling too.
+
+    Args:
+        limit: Page size the client asked for.
+
+    Returns:
+        Page size to query.
+    """
+    ceiling = settings.max_page_size
+    if ceiling and not 0 <= limit <= ceiling:
+        return ceiling
+    return limit
+
+
+def _parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    """Translate a ``fields=`` parameter into the columns to select.
+
+    ``id`` is always included, since cursors and ETags are built from it.
+
+    Args:
+        fields: Comma-separated field names, if the parameter was sent.
+
+    Returns:
+        Columns in ``crud.BAGGER_COLUMNS`` order, or None for every column.
+
+    Raises:
+        HTTPException: 422 if a field name is unknown.
+    """
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(crud.BAGGER_COLUMNS)
+    if unknown:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return tuple(
+        column
+        for column in crud.BAGGER_COLUMNS
+        if column == "id" or column in requested
+    )
 
 
 @router.get("/baggers/", response_model=List[schemas.Bagger])
-def read_baggers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_baggers(
+    skip: int = 0,
+    limit: int = 100,
+    after: str | None = None,
+    fields: str | None = None,
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+):
     """Get all baggers with optional pagination.
 
+    Full pages carry an ``X-Next-Cursor`` header; pass it back as ``after`` to
+    fetch the following page with a keyset scan instead of an OFFSET. ``limit``
+    is capped at ``settings.max_page_size``; a capped page still gets a
+    cursor, so a client asking for more than the ceiling can page on. Rows are
+    selected as plain tuples and encoded directly, skipping per-row model
+    validation.
+
+    The ETag is the table's change counter, so a client revalidating with
+    ``If-None-Match`` gets a 304 after one primary-key read.
+
+    ``fields`` (e.g. ``fields=membershipNo``) selects only those columns, plus
+    ``id``, and returns rows with just those keys.
+
+    Args:
+        skip: Number of records to skip. Ignored when ``after`` is set.
+        limit: Maximum number of records to return, capped at
+            ``settings.max_page_size``.
+        after: Opaque cursor from a previous page's ``X-Next-Cursor`` header.
+        fields: Comma-separated fields to return; all fields if omitted.
+        if_none_match: ETag of the client's cached copy.
+        db: Database session dependency.
+
+    Returns:
+        List of bagger objects, or 304 if the client's copy is current.
+
+    Raises:
+        HTTPException: 422 if the cursor or a field name is invalid.
+    """
+    columns = _parse_fields(fields)
+    limit = _page_limit(limit)
+    after_id = None
+    if after is not None:
+        try:
+            (after_id,) = decode_cursor(after)
+        except ValueError:
+            after_id = None
+        if not isinstance(after_id, int):
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+
+    etag = etags.collection_etag(await run_db(db, crud.get_table_version))
+    if etags.none_match(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    rows = await run_db(
+        db,
+        crud.get_bagger_rows,
+        skip=skip,
+        limit=limit,
+        after=after_id,
+        columns=columns or crud.BAGGER_COLUMNS,
+    )
+    headers = {"ETag": etag}
+    if limit > 0 and len(rows) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1]["id"])
+    return BaggerJSONResponse(rows, headers=headers, fields=columns)
+
+
+@router.get("/baggers/search", response_model=List[schemas.Bagger])
+async def search_baggers(
+    q: str,
+    limit: int = 20,
+    after: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """Search baggers by name, email address or phone number.
+
+    Each word in ``q`` is matched as a prefix and results are ranked best
+    match first. Full pages carry an ``X-Next-Cursor`` header to pass back as
+    ``after``.
+
     Args:
-        skip: Number of records to skip.
-        limit: Maximum number of records to return.
+        q: Search text.
+        limit: Maximum number of records to return, capped at
+            ``settings.max_page_size``.
+        after: Opaque cursor from a previous page's ``X-Next-Cursor`` header.
         db: Database session dependency.
 
     Returns:
-        List of bagger objects.
+        List of matching bagger objects.
+
+    Raises:
+        HTTPException: 422 if the cursor is malformed.
     """
-    baggers = crud.get_baggers(db, skip=skip, limit=limit)
-    return baggers
+    limit = _page_limit(limit)
+    keyset = None
+    if after is not None:
+        try:
+            rank, bagger_id = decode_cursor(after)
+            keyset = (float(rank), int(bagger_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+
+    rows = await run_db(db, crud.search_baggers, q=q, limit=limit, after=keyset)
+    headers = {}
+    if limit > 0 and len(rows) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1]["rank"], rows[-1]["id"])
+    return BaggerJSONResponse(
+        [{column: row[column] for column in crud.BAGGER_COLUMNS} for row in rows],
+        headers=headers,
+    )
+
+
+@router.get("/baggers/duplicates", response_model=List[schemas.DuplicateCluster])
+async def read_duplicates(
+    response: Response,
+    by: Literal["email", "phone"] = "email",
+    limit: int = 100,
+    after: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """List groups of baggers sharing an email address or phone number.
+
+    Addresses are compared ignoring case and surrounding whitespace, and
+    phone numbers in E.164 form, so the same member entered twice in
+    different formats is reported. Full pages carry an ``X-Next-Cursor``
+    header to pass back as ``after``.
+
+    Args:
+        response: Response whose headers carry the next-page cursor.
+        by: Compare ``email`` addresses or ``phone`` numbers.
+        limit: Maximum number of clusters to return, capped at
+            ``settings.max_page_size``.
+        after: Opaque cursor from a previous page's ``X-Next-Cursor`` header.
+        db: Database session dependency.
+
+    Returns:
+        Clusters of two or more baggers, each with its normalized key.
+
+    Raises:
+        HTTPException: 422 if the cursor is malformed.
+    """
+    limit = _page_limit(limit)
+    key = None
+    if after is not None:
+        try:
+            (key,) = decode_cursor(after)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+        if not isinstance(key, str):
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+
+    clusters = await run_db(db, crud.get_duplicates, by=by, limit=limit, after=key)
+    if limit > 0 and len(clusters) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(clusters[-1][0])
+    return [schemas.DuplicateCluster(key=key, baggers=rows) for key, rows in clusters]
+
+
+@router.get(
+    "/baggers/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {media_type: {} for media_type in export.MEDIA_TYPES.values()}}
+    },
+)
+async def export_baggers(
+    format: Literal["ndjson", "csv"] = "ndjson", db: Session = Depends(get_db)
+):
+    """Stream the full roster as NDJSON or CSV.
+
+    Rows are read through a server-side cursor and written out in batches,
+    so memory use stays constant regardless of the roster size.
+
+    Args:
+        format: Output format, ``ndjson`` or ``csv``.
+        db: Database session dependency, used to locate the engine.
+
+    Returns:
+        Streaming response with one record per line.
+    """
+    if isinstance(db, AsyncSession):
+        body = export.astream_export(crud.aiter_baggers(db.bind), format)
+    else:
+        body = export.stream_export(crud.iter_baggers(db.get_bind()), format)
+    return StreamingResponse(
+        body,
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="baggers.{format}"'},
+    )
+
+
+def _to_change(row) -> schemas.BaggerChange:
+    """Build a change feed entry from a `crud.get_changes` row."""
+    if row["operation"] == "delete":
+        return schemas.BaggerChange(seq=row["seq"], op="delete", id=row["bagger_id"])
+    return schemas.BaggerChange(
+        seq=row["seq"],
+        op="upsert",
+        id=row["bagger_id"],
+        bagger=schemas.Bagger(
+            id=row["bagger_id"],
+            **{column: row[column] for column in crud.BAGGER_COLUMNS if column != "id"},
+        ),
+    )
+
+
+async def _check_horizon(db, since: int):
+    """Reject a sync position older than the compacted part of the log.
+
+    Raises:
+        HTTPException: 410 if tombstones after ``since`` may have been removed.
+    """
+    if since > 0 and since < await run_db(db, crud.get_change_horizon):
+        raise HTTPException(
+            status_code=410,
+            detail="Change log compacted past this sequence; resync from since=0",
+        )
+
+
+@router.get("/baggers/changes", response_model=schemas.ChangeFeed)
+async def read_changes(
+    since: int = 0, limit: int = 1000, db: Session = Depends(get_db)
+):
+    """Get baggers created, updated or deleted after a change sequence number.
+
+    Each bagger appears at most once, with its latest state or a delete
+    tombstone. Pass ``next`` back as ``since`` to continue; ``since=0`` returns
+    every live bagger.
+
+    Args:
+        since: Sequence number of the last change the client has applied.
+        limit: Maximum number of changes to return, capped at
+            ``settings.max_page_size``.
+        db: Database session dependency.
+
+    Returns:
+        Changes in sequence order, the position to resume from, and whether
+        more changes are waiting.
+
+    Raises:
+        HTTPException: 410 if the log was compacted past ``since``.
+    """
+    await _check_horizon(db, since)
+    limit = _page_limit(limit)
+    rows = await run_db(db, crud.get_changes, since=since, limit=limit)
+    return schemas.ChangeFeed(
+        changes=[_to_change(row) for row in rows],
+        next=rows[-1]["seq"] if rows else since,
+        hasMore=limit > 0 and len(rows) == limit,
+    )
+
+
+@asynccontextmanager
+async def _session(bind):
+    """Open a short-lived sync or async session on ``bind``."""
+    if isinstance(bind, AsyncEngine):
+        async with AsyncSession(bind) as db:
+            yield db
+    else:
+        with Session(bind) as db:
+            yield db
+
+
+async def _stream_changes(request: Request, bind, since: int, batch_size: int = 1000):
+    """Yield Server-Sent Events for changes as they are committed.
+
+    The log is polled every ``settings.change_poll_interval`` seconds with a
+    short-lived session, so the stream holds no connection between polls. A
+    comment line is sent roughly every 15 seconds to keep proxies from
+    closing an idle stream.
+
+    Args:
+        request: Request used to detect client disconnects.
+        bind: Engine or AsyncEngine to read the change log from.
+        since: Sequence number to stream after.
+        batch_size: Maximum number of changes read per poll.
+
+    Yields:
+        Encoded ``change`` events, with the sequence number as the event ID.
+    """
+    idle = 0.0
+    while not await request.is_disconnected():
+        async with _session(bind) as db:
+            rows = await run_db(db, crud.get_changes, since=since, limit=batch_size)
+        for row in rows:
+            since = row["seq"]
+            data = _to_change(row).model_dump_json()
+            yield f"id: {since}\nevent: change\ndata: {data}\n\n"
+        if len(rows) == batch_size:
+            continue
+        await asyncio.sleep(settings.change_poll_interval)
+        idle = 0.0 if rows else idle + settings.change_poll_interval
+        if idle >= 15:
+            idle = 0.0
+            yield ": keepalive\n\n"
+
+
+@router.get(
+    "/baggers/changes/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_baggers_changes(
+    request: Request,
+    since: int = 0,
+    last_event_id: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    """Stream changes as Server-Sent Events as they are committed.
+
+    Reconnecting clients resume from the ``Last-Event-ID`` header, which
+    takes precedence over ``since``.
+
+    Args:
+        request: Incoming request, watched for disconnects.
+        since: Sequence number of the last change the client has applied.
+        last_event_id: ID of the last event received before reconnecting.
+        db: Database session dependency, used to locate the engine.
+
+    Returns:
+        ``text/event-stream`` response of ``change`` events.
+
+    Raises:
+        HTTPException: 410 if the log was compacted past ``since``.
+    """
+    if last_event_id is not None and last_event_id.isdigit():
+        since = int(last_event_id)
+    await _check_horizon(db, since)
+    bind = db.bind if isinstance(db, AsyncSession) else db.get_bind()
+    return StreamingResponse(
+        _stream_changes(request, bind, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/baggers/by-membership/{membershipNo}", response_model=schemas.Bagger)
+async def read_bagger_by_membership(membershipNo: str, db: Session = Depends(get_db)):
+    """Get a single bagger by membership number.
+
+    Args:
+        membershipNo: The AFL membership number to look up.
+        db: Database session dependency.
+
+    Returns:
+        Bagger object.
+
+    Raises:
+        HTTPException: 404 if bagger not found.
+    """
+    db_bagger = await run_db(
+        db, crud.get_bagger_by_membership, membership_no=membershipNo
+    )
+    if db_bagger is None:
+        raise HTTPException(status_code=404, detail="Bagger not found")
+    return db_bagger
+
+
+@router.get("/baggers/by-email/{email}", response_model=List[schemas.Bagger])
+async def read_baggers_by_email(
+    email: str, limit: int = 100, db: Session = Depends(get_db)
+):
+    """Get the baggers with an email address, ignoring case and whitespace.
+
+    Args:
+        email: Email address to look up.
+        limit: Maximum number of records to return, capped at
+            ``settings.max_page_size``.
+        db: Database session dependency.
+
+    Returns:
+        List of matching bagger objects, empty if there are none.
+    """
+    return await run_db(
+        db, crud.get_baggers_by_email, email=email, limit=_page_limit(limit)
+    )
+
+
+@router.get("/baggers/by-phone/{phone}", response_model=List[schemas.Bagger])
+async def read_baggers_by_phone(
+    phone: str, limit: int = 100, db: Session = Depends(get_db)
+):
+    """Get the baggers with a phone number, matched in E.164 form.
+
+    National numbers are read with ``settings.phone_country_code``, so
+    ``0412 345 678`` and ``+61412345678`` find the same baggers.
+
+    Args:
+        phone: Phone number to look up.
+        limit: Maximum number of records to return, capped at
+            ``settings.max_page_size``.
+        db: Database session dependency.
+
+    Returns:
+        List of matching bagger objects, empty if there are none.
+    """
+    return await run_db(
+        db, crud.get_baggers_by_phone, phone=phone, limit=_page_limit(limit)
+    )
+
+
+@router.post("/baggers/lookup", response_model=schemas.BaggerLookupResult)
+async def lookup_baggers(lookup: schemas.BaggerLookup, db: Session = Depends(get_db)):
+    """Look up many baggers by membership number in one request.
+
+    Args:
+        lookup: Membership numbers to resolve (up to 5,000).
+        db: Database session dependency.
+
+    Returns:
+        Baggers found, in request order, and the membership numbers not found.
+    """
+    baggers = await run_db(
+        db, crud.get_baggers_by_membership, membership_nos=lookup.membershipNos
+    )
+    by_membership = {bagger.membershipNo: bagger for bagger in baggers}
+    requested = list(dict.fromkeys(lookup.membershipNos))
+    return schemas.BaggerLookupResult(
+        found=[
+            schemas.Bagger.model_validate(by_membership[membership_no])
+            for membership_no in requested
+            if membership_no in by_membership
+        ],
+        missing=[
+            membership_no
+            for membership_no in requested
+            if membership_no not in by_membership
+        ],
+    )
 
 
 @router.get("/baggers/{bagger_id}", response_model=schemas.Bagger)
-def read_bagger(bagger_id: int, db: Session = Depends(get_db)):
+async def read_bagger(
+    bagger_id: int,
+    response: Response,
+    fields: str | None = None,
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+):
     """Get a single bagger by ID.
 
+    With ``If-None-Match``, only the row version is read; a 304 is returned
+    without loading or serializing the record if the client's copy is current.
+    With ``fields``, only those columns (plus ``id``) are selected and returned.
+
     Args:
         bagger_id: The ID of the bagger to retrieve.
+        response: Response used to set the ETag header.
+        fields: Comma-separated fields to return; all fields if omitted.
+        if_none_match: ETag of the client's cached copy.
         db: Database session dependency.
 
     Returns:
-        Bagger object.
+        Bagger object, or 304 if the client's copy is current.
 
     Raises:
-        HTTPException: 404 if bagger not found.
+        HTTPException: 404 if bagger not found, 422 if a field name is
+            unknown.
     """
-    db_bagger = crud.get_bagger(db, bagger_id=bagger_id)
+    columns = _parse_fields(fields)
+    if if_none_match is not None:
+        version = await run_db(db, crud.get_bagger_version, bagger_id=bagger_id)
+        etag = etags.bagger_etag(bagger_id, version)
+        if version is not None and etags.none_match(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+    if columns is not None:
+        row = await run_db(
+            db, crud.get_bagger_fields, bagger_id=bagger_id, columns=columns
+        )
+        if row is None:
+            raise HTTPException(status_code=404, detail="Bagger not found")
+        etag = etags.bagger_etag(bagger_id, row.pop("version"))
+        return BaggerJSONResponse(row, headers={"ETag": etag}, fields=columns)
+
+    db_bagger = await run_db(db, crud.get_bagger, bagger_id=bagger_id)
     if db_bagger is None:
         raise HTTPException(status_code=404, detail="Bagger not found")
+    response.headers["ETag"] = etags.bagger_etag(db_bagger.id, db_bagger.version)
     return db_bagger
 
 
+async def _check_precondition(db, bagger_id: int, if_match: str | None):
+    """Explain why a write, conditional or not, matched no row.
+
+    ``If-Match: *`` only holds if the bagger exists (RFC 9110 §13.1.1), so it
+    failing means the bagger is missing, which is a 412 rather than a 404.
+
+    Args:
+        db: Session or AsyncSession.
+        bagger_id: ID of the bagger the write targeted.
+        if_match: ``If-Match`` header value, if sent.
+
+    Raises:
+        HTTPException: 412 if ``If-Match`` is ``*``, or the bagger exists but
+            ``If-Match`` did not match; otherwise 404.
+    """
+    if if_match is not None:
+        if etags.match_versions(if_match, bagger_id) is None:
+            raise HTTPException(status_code=412, detail="Bagger not found")
+        if await run_db(db, crud.get_bagger_version, bagger_id=bagger_id) is not None:
+            raise HTTPException(status_code=412, detail="Bagger has been modified")
+    raise HTTPException(status_code=404, detail="Bagger not found")
+
+
+def _if_match_versions(if_match: str | None, bagger_id: int) -> list[int] | None:
+    """Translate an ``If-Match`` header into the versions a write may replace."""
+    if if_match is None:
+        return None
+    return etags.match_versions(if_match, bagger_id)
+
+
 @router.put("/baggers/{bagger_id}", response_model=schemas.Bagger)
-def update_bagger(
-    bagger_id: int, bagger: schemas.BaggerCreate, db: Session = Depends(get_db)
+async def update_bagger(
+    bagger_id: int,
+    bagger: schemas.BaggerCreate,
+    response: Response,
+    if_match: str | None = Header(default=None),
+    idempotency_key: str | None = Header(default=None, max_length=255),
+    db: Session = Depends(get_db),
 ):
     """Update an existing bagger.
 
+    With ``If-Match``, the update only applies if the bagger still has the
+    version named by the ETag; the check is part of the ``UPDATE`` itself, so
+    there is no window between reading and writing. With
+    ``Idempotency-Key``, a retry of a request that already succeeded gets the
+    original response back, rather than a 412 for the version it bumped.
+
     Args:
         bagger_id: The ID of the bagger to update.
         bagger: Updated bagger data.
+        response: Response used to set the ETag header.
+        if_match: ETag the client last saw, or ``*``.
+        idempotency_key: Client-chosen key identifying this request.
         db: Database session dependency.
 
     Returns:
         Updated bagger object.
 
     Raises:
-        HTTPException: 404 if bagger not found, 422 if membership number conflicts.
+        HTTPException: 404 if bagger not found, 412 if ``If-Match`` does not
+            match (including ``*`` for a missing bagger), 422 if membership
+            number conflicts or the idempotency key was used for a different
+            request.
     """
-    db_bagger = crud.get_bagger(db, bagger_id=bagger_id)
-    if db_bagger is None:
-        raise HTTPException(status_code=404, detail="Bagger not found")
-
+    versions = _if_match_versions(if_match, bagger_id)
+    fingerprint = idempotency.fingerprint(
+        "PUT", f"/baggers/{bagger_id}", bagger.model_dump_json().encode()
+    )
     try:
-        return crud.update_bagger(db=db, bagger_id=bagger_id, bagger=bagger)
+        db_bagger = await _idempotent_write(
+            db,
+            idempotency_key,
+            fingerprint,
+            crud.update_bagger,
+            bagger_id=bagger_id,
+            bagger=bagger,
+            versions=versions,
+        )
     except IntegrityError:
-        db.rollback()
+        await run_db(db, Session.rollback)
         raise HTTPException(
             status_code=422, detail="Membership number already registered"
         )
+    if isinstance(db_bagger, Response):
+        return db_bagger
+    if db_bagger is None:
+        await _check_precondition(db, bagger_id, if_match)
+    response.headers["ETag"] = etags.bagger_etag(db_bagger.id, db_bagger.version)
+    return db_bagger
 
 
 @router.delete("/baggers/{bagger_id}", response_model=schemas.Bagger)
-def delete_bagger(bagger_id: int, db: Session = Depends(get_db)):
+async def delete_bagger(
+    bagger_id: int,
+    if_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+):
     """Delete a bagger by ID.
 
+    With ``If-Match``, the delete only applies if the bagger still has the
+    version named by the ETag.
+
     Args:
         bagger_id: The ID of the bagger to delete.
+        if_match: ETag the client last saw, or ``*``.
         db: Database session dependency.
 
     Returns:
         Deleted bagger object.
 
     Raises:
-        HTTPException: 404 if bagger not found.
+        HTTPException: 404 if bagger not found, 412 if ``If-Match`` does not
+            match (including ``*`` for a missing bagger).
     """
-    db_bagger = crud.get_bagger(db, bagger_id=bagger_id)
+    versions = _if_match_versions(if_match, bagger_id)
+    db_bagger = await run_db(
+        db, crud.delete_bagger, bagger_id=bagger_id, versions=versions
+    )
     if db_bagger is None:
-        raise HTTPException(status_code=404, detail="Bagger not found")
+        await _check_precondition(db, bagger_id, if_match)
+    return db_bagger
+
+
+@router.get("/cache/stats", response_model=schemas.CacheStats)
+async def read_cache_stats():
+    """Get lookup cache counters.
 
-    return crud.delete_bagger(db=db, bagger_id=bagger_id)
+    Returns:
+        Hit, miss, eviction and expiration counts for the active backend.
+    """
+    return cache.get_cache().stats()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """Get request, SQL and pool timings in Prometheus text format.
+
+    Returns:
+        Prometheus exposition text.
+    """
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+from functools import lru_cache
+from typing import List, Literal, TypedDict
+
+from pydantic import BaseModel, Field
 
 
 class BaggerBase(BaseModel):
@@ -17,3 +20,80 @@ class Bagger(BaggerBase):
 
     class Config:
         from_attributes = True
+
+
+class BaggerRow(TypedDict):
+    id: int
+    name: str
+    membershipNo: str
+    emailAddress: str | None
+    phoneNumber: str | None
+
+
+@lru_cache(maxsize=None)
+def bagger_projection(fields: tuple[str, ...]) -> type:
+    """Build a ``BaggerRow`` trimmed to ``fields``.
+
+    There are only a handful of possible projections, so each is built once.
+
+    Args:
+        fields: Keys of ``BaggerRow`` to keep, in ``BaggerRow`` order.
+
+    Returns:
+        TypedDict class with just those keys.
+    """
+    annotations = BaggerRow.__annotations__
+    return TypedDict(
+        f"BaggerRow_{'_'.join(fields)}", {field: annotations[field] for field in fields}
+    )
+
+
+class BaggerLookup(BaseModel):
+    membershipNos: List[str] = Field(max_length=5000)
+
+
+class BaggerLookupResult(BaseModel):
+    found: List[Bagger]
+    missing: List[str]
+
+
+class DuplicateCluster(BaseModel):
+    key: str
+    baggers: List[Bagger]
+
+
+class BulkResult(BaseModel):
+    index: int
+    status: Literal["created", "updated", "rejected"]
+    id: int | None = None
+    membershipNo: str | None = None
+    detail: str | None = None
+
+
+class BulkResponse(BaseModel):
+    created: int
+    updated: int
+    rejected: int
+    results: List[BulkResult]
+
+
+class BaggerChange(BaseModel):
+    seq: int
+    op: Literal["upsert", "delete"]
+    id: int
+    bagger: Bagger | None = None
+
+
+class ChangeFeed(BaseModel):
+    changes: List[BaggerChange]
+    next: int
+    hasMore: bool
+
+
+class CacheStats(BaseModel):
+    backend: str
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    entries: int
@@ -0,0 +1,76 @@
+import re
+
+from sqlalchemy import text
+
+FTS_TABLE = "baggers_fts"
+FTS_COLUMNS = ("name", "emailAddress", "phoneNumber")
+
+_columns = ", ".join(FTS_COLUMNS)
+_new = ", ".join(f"new.{column}" for column in FTS_COLUMNS)
+_old = ", ".join(f"old.{column}" for column in FTS_COLUMNS)
+
+# External-content FTS5 index over the baggers table, kept in sync by triggers
+# so every write path (ORM, bulk upserts, raw SQL) updates it.
+CREATE_STATEMENTS = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{_columns}, content='baggers', content_rowid='id')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON baggers BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON baggers BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) "
+    f"VALUES ('delete', old.id, {_old}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_columns} "
+    f"ON baggers BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) "
+    f"VALUES ('delete', old.id, {_old}); "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new}); END",
+)
+
+DROP_STATEMENT = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+# Disable the triggers for a bulk load; `rebuild` restores them afterwards.
+DROP_TRIGGER_STATEMENTS = tuple(
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}" for suffix in ("ai", "ad", "au")
+)
+REBUILD_STATEMENT = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+
+def terms(q: str) -> list[str]:
+    """Split search text into the words matched as prefixes.
+
+    Args:
+        q: Search text supplied by the client.
+
+    Returns:
+        Words in ``q``, in order.
+    """
+    return re.findall(r"\w+", q)
+
+
+def build_match_query(q: str) -> str:
+    """Turn free text into an FTS5 prefix query.
+
+    Every word becomes a quoted prefix term, so ``smi jo`` matches names such
+    as "Jo Smith" and user input can never inject FTS5 query syntax.
+
+    Args:
+        q: Search text supplied by the client.
+
+    Returns:
+        FTS5 MATCH expression, or an empty string if ``q`` has no words.
+    """
+    return " ".join(f'"{term}"*' for term in terms(q))
+
+
+def rebuild(bind):
+    """Create the search index if missing and repopulate it from ``baggers``.
+
+    Use this on databases created before search existed, or after loading
+    rows with the triggers disabled.
+
+    Args:
+        bind: Engine to rebuild the index on.
+    """
+    with bind.begin() as conn:
+        for statement in CREATE_STATEMENTS:
+            conn.execute(text(statement))
+        conn.execute(text(REBUILD_STATEMENT))
@@ -0,0 +1,135 @@
+"""Production server entry point: uvicorn with multiple worker processes.
+
+Several processes sharing one SQLite file need a little care. The journal
+mode switch and any pending migrations run once in the parent, before the
+workers start. Otherwise workers race to take the exclusive lock each needs
+and fail with ``database is locked``. The per-connection page cache is split
+between the workers so memory stays within the configured budget.
+"""
+
+import importlib.util
+import os
+
+import uvicorn
+from sqlalchemy.engine import make_url
+
+from . import migrations
+from .config import Settings
+from .database import create_db_engine
+
+APP = "baggers.main:app"
+
+
+def worker_count(requested: int) -> int:
+    """Resolve the number of worker processes.
+
+    Args:
+        requested: Configured worker count; 0 means one per CPU.
+
+    Returns:
+        Number of workers to start.
+    """
+    return requested or os.cpu_count() or 1
+
+
+def worker_settings(config: Settings, workers: int) -> dict[str, str]:
+    """Build the ``BAGGERS_*`` overrides each worker process starts with.
+
+    Workers are separate processes, each with its own pool and SQLite page
+    caches, so a negative (KiB) ``sqlite_cache_size`` is treated as the
+    total budget and divided between them.
+
+    Args:
+        config: Settings the server was started with.
+        workers: Number of worker processes.
+
+    Returns:
+        Environment variables to set before the workers are spawned.
+    """
+    overrides = {}
+    is_sqlite = make_url(config.database_url).get_backend_name() == "sqlite"
+    if is_sqlite and config.sqlite_cache_size < 0:
+        per_worker = max(1, -config.sqlite_cache_size // workers)
+        overrides["BAGGERS_SQLITE_CACHE_SIZE"] = str(-per_worker)
+    return overrides
+
+
+def prepare_database(config: Settings, migrate: bool = False):
+    """Check the schema and set the journal mode before any worker starts.
+
+    Args:
+        config: Settings the server was started with.
+        migrate: Apply pending migrations instead of refusing to start.
+
+    Raises:
+        SystemExit: If migrations are pending and ``migrate`` is false.
+    """
+    engine = create_db_engine(config.database_url, config)
+    try:
+        if migrate:
+            migrations.upgrade(engine, log=print)
+        applied = migrations.applied_versions(engine)
+        pending = [m for m in migrations.MIGRATIONS if m.version not in applied]
+        if pending:
+            raise SystemExit(
+                f"{len(pending)} migration(s) pending; run `baggers migrate` first"
+            )
+        # Connecting applies the journal mode PRAGMA, which persists in the file.
+        with engine.connect():
+            pass
+    finally:
+        engine.dispose()
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def serve(
+    config: Settings,
+    host: str | None = None,
+    port: int | None = None,
+    workers: int | None = None,
+    migrate: bool = False,
+):
+    """Run the app under uvicorn with ``workers`` processes.
+
+    Uses uvloop and httptools when they are installed (the
+    ``uvicorn[standard]`` dependency brings both).
+
+    Args:
+        config: Settings supplying the server defaults.
+        host: Interface to bind; defaults to ``config.server_host``.
+        port: Port to bind; defaults to ``config.server_port``.
+        workers: Worker processes; defaults to ``config.workers``, or to 1
+            with in-memory serving.
+        migrate: Apply pending migrations before starting.
+
+    Raises:
+        SystemExit: If in-memory serving is on with more than one worker.
+    """
+    requested = config.workers if workers is None else workers
+    if config.sqlite_memory:
+        # Each worker would serve, and write back, its own copy.
+        if requested > 1:
+            raise SystemExit("BAGGERS_SQLITE_MEMORY needs a single worker")
+        requested = 1
+    workers = worker_count(requested)
+    prepare_database(config, migrate=migrate)
+    os.environ.update(worker_settings(config, workers))
+    # Import the app once in the parent so configuration errors surface
+    # before any worker is spawned.
+    importlib.import_module(APP.partition(":")[0])
+    uvicorn.run(
+        APP,
+        host=host or config.server_host,
+        port=port or config.server_port,
+        workers=workers,
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        backlog=config.server_backlog,
+        timeout_keep_alive=config.server_keep_alive,
+        timeout_graceful_shutdown=config.server_graceful_timeout,
+        access_log=config.server_access_log,
+        proxy_headers=True,
+    )
@@ -0,0 +1,429 @@
+"""Bulk import and export of baggers as CSV, NDJSON or Parquet files.
+
+Imports are built for files of millions of rows:
+
+* Records are parsed and validated with ``schemas.BaggerCreate`` in a pool of
+  worker processes, while the parent process writes.
+* Rows are written with ``crud.bulk_upsert_baggers``, one large transaction
+  per batch.
+* Secondary indexes and the search index triggers are dropped for the load,
+  then rebuilt in one pass at the end. The unique membership number index
+  stays, as conflicts are detected against it.
+* Each batch commits together with an ``import_checkpoints`` row. Rerunning
+  an interrupted import of an unchanged file resumes after the last
+  committed batch.
+
+Parquet needs the ``parquet`` extra (pyarrow).
+"""
+
+import csv
+import json
+import os
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import crud, export, models, schemas, search
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - depends on the optional "parquet" extra
+    pyarrow = None
+
+FORMATS = ("csv", "ndjson", "parquet")
+SUFFIXES = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".parquet": "parquet",
+}
+
+# CSV has no null, so empty optional fields are read as missing.
+OPTIONAL_FIELDS = ("emailAddress", "phoneNumber")
+
+# Records handed to a worker process at a time.
+CHUNK_SIZE = 5000
+
+
+@dataclass
+class ImportSummary:
+    """Running totals of an import, reported after every batch."""
+
+    source: str
+    position: int = 0
+    created: int = 0
+    updated: int = 0
+    rejected: int = 0
+    resumed_from: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        """Records processed per second in this run."""
+        done = self.position - self.resumed_from
+        return done / self.seconds if self.seconds else 0.0
+
+
+def detect_format(path: str, format: str | None = None) -> str:
+    """Resolve a file's format from ``format`` or its suffix.
+
+    Args:
+        path: File path.
+        format: Explicit format, one of ``FORMATS``.
+
+    Returns:
+        Format name.
+
+    Raises:
+        ValueError: If the format is unknown or cannot be inferred.
+    """
+    format = format or SUFFIXES.get(os.path.splitext(path)[1].lower())
+    if format not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}; pass --format")
+    if format == "parquet" and pyarrow is None:
+        raise ValueError("Parquet files need the parquet extra (pyarrow)")
+    return format
+
+
+def _error_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def validate_chunk(format: str, columns: list[str] | None, start: int, records):
+    """Parse and validate a chunk of raw records.
+
+    Runs in a worker process, so it only takes and returns plain values.
+
+    Args:
+        format: Source format.
+        columns: CSV header; unused for other formats.
+        start: Position of the first record in the source.
+        records: Raw records: CSV rows, NDJSON lines or Parquet row dicts.
+
+    Returns:
+        Tuple of (valid, rejected): ``(position, fields)`` pairs for valid
+        records and ``(position, detail)`` pairs for the others.
+    """
+    valid, rejected = [], []
+    for position, record in enumerate(records, start):
+        try:
+            if format == "ndjson":
+                record = json.loads(record)
+            elif format == "csv":
+                record = dict(zip(columns, record))
+                for field in OPTIONAL_FIELDS:
+                    if record.get(field) == "":
+                        record[field] = None
+            bagger = schemas.BaggerCreate.model_validate(record)
+        except ValidationError as exc:
+            rejected.append((position, _error_detail(exc)))
+        except ValueError:
+            rejected.append((position, "Invalid JSON"))
+        else:
+            valid.append((position, bagger.model_dump()))
+    return valid, rejected
+
+
+@contextmanager
+def _read_records(path: str, format: str):
+    """Open a source file.
+
+    Yields:
+        Tuple of (CSV header or None, iterator of raw records). Blank lines
+        are skipped, so record positions do not depend on them.
+    """
+    if format == "parquet":
+        parquet = pyarrow.parquet.ParquetFile(path)
+        batches = parquet.iter_batches(batch_size=CHUNK_SIZE)
+        yield None, (row for batch in batches for row in batch.to_pylist())
+        return
+    with open(path, newline="" if format == "csv" else None, encoding="utf-8") as f:
+        if format == "csv":
+            reader = csv.reader(f)
+            yield next(reader, []), (row for row in reader if row)
+        else:
+            yield None, (line for line in f if line.strip())
+
+
+def _chunks(records: Iterator, start: int, size: int) -> Iterator[tuple[int, list]]:
+    position = start
+    while chunk := list(islice(records, size)):
+        yield position, chunk
+        position += len(chunk)
+
+
+def _validated(chunks, format: str, columns, workers: int):
+    """Validate chunks in order, ``workers`` processes at a time.
+
+    At most two chunks per worker are in flight, so memory stays bounded
+    however large the file is.
+    """
+    if workers <= 1:
+        for start, chunk in chunks:
+            yield start + len(chunk), validate_chunk(format, columns, start, chunk)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for start, chunk in chunks:
+            future = pool.submit(validate_chunk, format, columns, start, chunk)
+            pending.append((start + len(chunk), future))
+            if len(pending) >= 2 * workers:
+                end, future = pending.popleft()
+                yield end, future.result()
+        while pending:
+            end, future = pending.popleft()
+            yield end, future.result()
+
+
+def drop_deferred_indexes(bind):
+    """Drop the indexes and triggers an import rebuilds afterwards.
+
+    Args:
+        bind: Engine to drop them on.
+    """
+    with bind.begin() as conn:
+        for index in models.Bagger.__table__.indexes:
+            if not index.unique:
+                index.drop(conn, checkfirst=True)
+        if conn.dialect.name == "sqlite":
+            for statement in search.DROP_TRIGGER_STATEMENTS:
+                conn.execute(text(statement))
+
+
+def restore_deferred_indexes(bind):
+    """Recreate the indexes and triggers dropped by `drop_deferred_indexes`.
+
+    Safe to run when they already exist. The search index is repopulated,
+    since its triggers did not fire during the load.
+
+    Args:
+        bind: Engine to restore them on.
+    """
+    with bind.begin() as conn:
+        for index in models.Bagger.__table__.indexes:
+            if not index.unique:
+                index.create(conn, checkfirst=True)
+    if bind.dialect.name == "sqlite":
+        search.rebuild(bind)
+
+
+def _fingerprint(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def import_file(
+    bind,
+    path: str,
+    format: str | None = None,
+    upsert: bool = False,
+    batch_size: int = 50_000,
+    workers: int | None = None,
+    defer_indexes: bool = True,
+    restart: bool = False,
+    rejects: str | None = None,
+    progress: Callable[[ImportSummary], None] | None = None,
+) -> ImportSummary:
+    """Load baggers from a file, resuming an interrupted import of it.
+
+    Args:
+        bind: Engine to load into.
+        path: Source file.
+        format: Source format; inferred from the suffix if omitted.
+        upsert: Update baggers whose membership number exists instead of
+            rejecting them.
+        batch_size: Records committed per transaction.
+        workers: Validation processes; defaults to one per CPU. 1 validates
+            in this process.
+        defer_indexes: Drop secondary indexes during the load and rebuild
+            them at the end, including when the load is interrupted.
+        restart: Discard any checkpoint and start from the first record.
+        rejects: File to append rejected records to, as NDJSON.
+        progress: Called with the running totals after every batch.
+
+    Returns:
+        Totals for the whole import, including batches from earlier runs.
+
+    Raises:
+        ValueError: If the format is unknown, or the file changed since the
+            checkpoint was written and ``restart`` is false.
+    """
+    format = detect_format(path, format)
+    source = os.path.abspath(path)
+    fingerprint = _fingerprint(path)
+    workers = workers or os.cpu_count() or 1
+
+    with Session(bind) as db:
+        checkpoint = db.get(models.ImportCheckpoint, source)
+        if checkpoint is not None and restart:
+            db.delete(checkpoint)
+            db.commit()
+            checkpoint = None
+        if checkpoint is None:
+            checkpoint = models.ImportCheckpoint(
+                source=source,
+                fingerprint=fingerprint,
+                position=0,
+                created=0,
+                updated=0,
+                rejected=0,
+            )
+        elif checkpoint.fingerprint != fingerprint:
+            raise ValueError(
+                f"{path} changed since its import was interrupted; pass --restart"
+            )
+        summary = ImportSummary(
+            source=source,
+            position=checkpoint.position,
+            created=checkpoint.created,
+            updated=checkpoint.updated,
+            rejected=checkpoint.rejected,
+            resumed_from=checkpoint.position,
+        )
+
+    if defer_indexes:
+        drop_deferred_indexes(bind)
+    reject_file = open(rejects, "a", encoding="utf-8") if rejects else None
+    start = time.perf_counter()
+    try:
+        with _read_records(path, format) as (columns, records):
+            records = islice(records, summary.position, None)
+            chunks = _chunks(records, summary.position, min(CHUNK_SIZE, batch_size))
+            batch, refused, end = [], [], summary.position
+            for end, (valid, rejected) in _validated(chunks, format, columns, workers):
+                batch.extend(valid)
+                refused.extend(rejected)
+                if len(batch) + len(refused) >= batch_size:
+                    _write_batch(bind, checkpoint, summary, batch, refused, end, upsert)
+                    _report(reject_file, refused)
+                    batch, refused = [], []
+                    summary.seconds = time.perf_counter() - start
+                    if progress is not None:
+                        progress(summary)
+            if end != summary.position:
+                _write_batch(bind, checkpoint, summary, batch, refused, end, upsert)
+                _report(reject_file, refused)
+    finally:
+        if reject_file is not None:
+            reject_file.close()
+        if defer_indexes:
+            restore_deferred_indexes(bind)
+
+    with Session(bind) as db:
+        db.query(models.ImportCheckpoint).filter_by(source=source).delete()
+        db.commit()
+    summary.seconds = time.perf_counter() - start
+    if progress is not None:
+        progress(summary)
+    return summary
+
+
+def _write_batch(bind, checkpoint, summary, batch, refused, end: int, upsert: bool):
+    """Write one batch and advance the checkpoint in the same transaction."""
+    with Session(bind) as db:
+        results = crud.bulk_upsert_baggers(
+            db,
+            [schemas.BaggerCreate.model_construct(**fields) for _, fields in batch],
+            upsert=upsert,
+            commit=False,
+        )
+        for (position, fields), result in zip(batch, results):
+            if result.status == "rejected":
+                refused.append((position, result.detail))
+        summary.created += sum(result.status == "created" for result in results)
+        summary.updated += sum(result.status == "updated" for result in results)
+        summary.rejected += len(refused)
+        summary.position = end
+        checkpoint.position = end
+        checkpoint.created = summary.created
+        checkpoint.updated = summary.updated
+        checkpoint.rejected = summary.rejected
+        db.merge(checkpoint)
+        db.commit()
+    crud.invalidate(*(result for result in results if result.id is not None))
+
+
+def _report(reject_file, refused: list[tuple[int, str]]):
+    if reject_file is None:
+        return
+    for position, detail in sorted(refused):
+        reject_file.write(json.dumps({"record": position, "detail": detail}) + "\n")
+
+
+PARQUET_SCHEMA = (
+    ("id", "int64"),
+    ("name", "string"),
+    ("membershipNo", "string"),
+    ("emailAddress", "string"),
+    ("phoneNumber", "string"),
+)
+
+
+def export_file(
+    bind,
+    path: str,
+    format: str | None = None,
+    batch_size: int = 50_000,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """Write every bagger to a file.
+
+    The file is written under a temporary name and renamed into place when
+    complete, so an interrupted export never leaves a truncated file behind.
+
+    Args:
+        bind: Engine to read from.
+        path: Destination file.
+        format: Destination format; inferred from the suffix if omitted.
+        batch_size: Rows written at a time.
+        progress: Called with the number of rows written after every batch.
+
+    Returns:
+        Number of rows written.
+    """
+    format = detect_format(path, format)
+    partial = f"{path}.partial"
+    written = 0
+
+    def counted(rows):
+        nonlocal written
+        for written, row in enumerate(rows, 1):
+            yield row
+
+    rows = crud.iter_baggers(bind, batch_size=batch_size)
+    try:
+        if format == "parquet":
+            schema = pyarrow.schema(
+                [(name, getattr(pyarrow, kind)()) for name, kind in PARQUET_SCHEMA]
+            )
+            with pyarrow.parquet.ParquetWriter(partial, schema) as writer:
+                while batch := list(islice(rows, batch_size)):
+                    columns = dict(zip(crud.BAGGER_COLUMNS, zip(*batch)))
+                    writer.write_table(pyarrow.table(columns, schema=schema))
+                    written += len(batch)
+                    if progress is not None:
+                        progress(written)
+        else:
+            with open(partial, "wb") as destination:
+                for chunk in export.stream_export(counted(rows), format, batch_size):
+                    destination.write(chunk)
+                    if progress is not None and written:
+                        progress(written)
+        os.replace(partial, path)
+    finally:
+        rows.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+    return written
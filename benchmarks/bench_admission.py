@@ -0,0 +1,103 @@
+"""Measure well-behaved clients' latency while an abusive client is active.
+
+Well-behaved clients make single reads and small list pages from 127.0.0.1.
+The abusive client, on 127.0.0.2 so it is rate limited separately, requests
+``GET /baggers/?limit=100000`` as fast as it can, ignoring ``Retry-After``.
+Each scenario runs in a fresh uvicorn process:
+
+* ``baseline``: no abusive client.
+* ``unprotected``: abusive client, with no page-size ceiling, concurrency
+  cap or rate limit.
+* ``protected``: abusive client, with admission control on.
+
+Usage:
+    python -m benchmarks.bench_admission --rows 100000 --requests 2000
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import tempfile
+
+import httpx
+
+from .common import drive, seed_database, serve
+
+UNPROTECTED = {"BAGGERS_MAX_PAGE_SIZE": "0", "BAGGERS_MAX_CONCURRENT_REQUESTS": "0"}
+PROTECTED = {
+    "BAGGERS_MAX_PAGE_SIZE": "1000",
+    "BAGGERS_RATE_LIMIT_PER_SECOND": "200",
+    "BAGGERS_RATE_LIMIT_BURST": "200",
+    "BAGGERS_RATE_LIMIT_ROUTES": "GET /baggers/=20:20",
+}
+SCENARIOS = {
+    "baseline": (UNPROTECTED, False),
+    "unprotected": (UNPROTECTED, True),
+    "protected": (PROTECTED, True),
+}
+
+
+async def abuse(base_url: str, concurrency: int, stop: asyncio.Event) -> dict:
+    """Request huge pages from 127.0.0.2 until ``stop`` is set.
+
+    Returns:
+        Count of responses by status code.
+    """
+    statuses = collections.Counter()
+    transport = httpx.AsyncHTTPTransport(local_address="127.0.0.2")
+    async with httpx.AsyncClient(
+        base_url=base_url, transport=transport, timeout=120
+    ) as client:
+
+        async def worker():
+            while not stop.is_set():
+                try:
+                    response = await client.get("/baggers/", params={"limit": 100000})
+                    statuses[response.status_code] += 1
+                except httpx.HTTPError:
+                    statuses["error"] += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return dict(statuses)
+
+
+async def run(base_url: str, args, abusive: bool) -> dict:
+    async def polite(client, rng):
+        if rng.random() < 0.9:
+            return await client.get(f"/baggers/{rng.randint(1, args.rows)}")
+        return await client.get("/baggers/", params={"limit": 20})
+
+    stop = asyncio.Event()
+    abuser = None
+    if abusive:
+        abuser = asyncio.create_task(abuse(base_url, args.abusers, stop))
+        await asyncio.sleep(1)
+    result = await drive(base_url, polite, args.requests, args.concurrency)
+    stop.set()
+    if abuser is not None:
+        result["abusive_statuses"] = await abuser
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--abusers", type=int, default=8)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        seed_database(os.path.join(workdir, "baggers.db"), args.rows)
+        for scenario in args.scenarios.split(","):
+            env, abusive = SCENARIOS[scenario]
+            with serve(workdir, env) as (base_url, _):
+                result = asyncio.run(run(base_url, args, abusive))
+            print(json.dumps({"scenario": scenario, **result}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Compare p50/p99 latency of the sync and async database modes under load.
+
+Starts uvicorn once per mode and drives it with many concurrent clients
+reading single baggers and list pages.
+
+Usage:
+    python -m benchmarks.bench_async --concurrency 500 --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+
+from .common import drive, seed_database, serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    async def make_request(client, rng):
+        if rng.random() < 0.8:
+            return await client.get(f"/baggers/{rng.randint(1, args.rows)}")
+        return await client.get("/baggers/", params={"limit": 20})
+
+    with tempfile.TemporaryDirectory() as workdir:
+        seed_database(os.path.join(workdir, "baggers.db"), args.rows)
+        for mode in ("sync", "async"):
+            env = {"BAGGERS_ASYNC_MODE": "1" if mode == "async" else "0"}
+            with serve(workdir, env) as (base_url, _):
+                result = asyncio.run(
+                    drive(base_url, make_request, args.requests, args.concurrency)
+                )
+            print(json.dumps({"mode": mode, **result}))
+
+
+if __name__ == "__main__":
+    main()
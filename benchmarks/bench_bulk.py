@@ -0,0 +1,52 @@
+"""Compare POST /baggers/bulk against looping POST /baggers/.
+
+Usage:
+    python -m benchmarks.bench_bulk --rows 5000
+"""
+
+import argparse
+import os
+import time
+
+from .common import make_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="bench_bulk.db")
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    rows = [
+        {
+            "name": f"Member {i}",
+            "membershipNo": f"AFL{i:08d}",
+            "emailAddress": f"member{i}@example.com",
+        }
+        for i in range(args.rows)
+    ]
+
+    timings = {}
+    for mode in ("loop", "bulk", "bulk-upsert"):
+        if os.path.exists(args.db):
+            os.remove(args.db)
+        client = make_client(args.db)
+        start = time.perf_counter()
+        if mode == "loop":
+            for row in rows:
+                client.post("/baggers/", json=row)
+        else:
+            client.post("/baggers/bulk", json=rows, params={"upsert": mode != "bulk"})
+        timings[mode] = time.perf_counter() - start
+
+    for mode, seconds in timings.items():
+        speedup = timings["loop"] / seconds
+        print(
+            f"{mode:>12}: {args.rows / seconds:>10.0f} rows/s"
+            f"  ({speedup:.1f}x vs loop)"
+        )
+    os.remove(args.db)
+
+
+if __name__ == "__main__":
+    main()
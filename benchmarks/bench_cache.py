@@ -0,0 +1,53 @@
+"""Measure membership lookups over a hot set with and without the LRU cache.
+
+Usage:
+    python -m benchmarks.bench_cache --rows 1000000 --hot 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from baggers import cache, crud
+
+from .common import make_engine, seed_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--hot", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    hot = [f"AFL{rng.randrange(args.rows):08d}" for _ in range(args.hot)]
+    lookups = [rng.choice(hot) for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "baggers.db")
+        seed_database(path, args.rows)
+        _, SessionLocal = make_engine(path)
+        for backend in (cache.NullCache(), cache.LRUCache(max_entries=args.hot * 2)):
+            cache.configure_cache(backend)
+            with SessionLocal() as db:
+                start = time.perf_counter()
+                for membership_no in lookups:
+                    crud.get_bagger_by_membership(db, membership_no)
+                elapsed = time.perf_counter() - start
+            print(
+                json.dumps(
+                    {
+                        "backend": backend.name,
+                        "lookups_per_s": round(args.lookups / elapsed),
+                        **backend.stats(),
+                    }
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
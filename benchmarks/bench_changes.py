@@ -0,0 +1,93 @@
+"""Compare a full roster re-download with a change-feed delta sync.
+
+Seeds ``--rows`` baggers, records the change log position, applies
+``--churn`` updates and deletes, then syncs both ways through the API.
+
+Usage:
+    python -m benchmarks.bench_changes --rows 100000 --churn 100
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from .common import make_client, member_name, seed_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--churn", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "baggers.db")
+        seed_database(path, args.rows)
+        client = make_client(path)
+        rng = random.Random(0)
+
+        since = 0
+        while True:
+            feed = client.get(f"/baggers/changes?since={since}&limit=10000").json()
+            since = feed["next"]
+            if not feed["hasMore"]:
+                break
+
+        for bagger_id in rng.sample(range(1, args.rows + 1), args.churn):
+            if rng.random() < 0.1:
+                client.delete(f"/baggers/{bagger_id}")
+            else:
+                client.put(
+                    f"/baggers/{bagger_id}",
+                    json={
+                        "name": member_name(rng.randrange(args.rows)),
+                        "membershipNo": f"AFL{bagger_id - 1:08d}",
+                    },
+                )
+
+        start = time.perf_counter()
+        full_bytes, after = 0, None
+        while True:
+            params = {"limit": args.limit, **({"after": after} if after else {})}
+            response = client.get("/baggers/", params=params)
+            full_bytes += len(response.content)
+            after = response.headers.get("x-next-cursor")
+            if after is None:
+                break
+        full_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        delta_bytes, changes = 0, 0
+        while True:
+            response = client.get(
+                "/baggers/changes", params={"since": since, "limit": args.limit}
+            )
+            delta_bytes += len(response.content)
+            feed = response.json()
+            changes += len(feed["changes"])
+            since = feed["next"]
+            if not feed["hasMore"]:
+                break
+        delta_s = time.perf_counter() - start
+
+        print(
+            json.dumps(
+                {
+                    "rows": args.rows,
+                    "churn": args.churn,
+                    "full_ms": round(full_s * 1000, 1),
+                    "full_bytes": full_bytes,
+                    "delta_ms": round(delta_s * 1000, 1),
+                    "delta_bytes": delta_bytes,
+                    "delta_changes": changes,
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
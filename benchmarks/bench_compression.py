@@ -0,0 +1,64 @@
+"""Measure compressed size and compression time per coding and level.
+
+List pages of each size are encoded the way ``GET /baggers/`` encodes them,
+then compressed with every installed coding at each level. Compression runs
+on one thread, so its wall-clock time is also its CPU cost.
+
+Usage:
+    python -m benchmarks.bench_compression --sizes 100,10000,100000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from baggers import compression, crud
+from baggers.responses import BaggerJSONResponse
+
+from .common import make_engine, seed_database, time_call
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 11), "zstd": (1, 3, 9)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,10000,100000")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "baggers.db")
+        seed_database(path, max(sizes))
+        _, SessionLocal = make_engine(path)
+        for rows in sizes:
+            with SessionLocal() as db:
+                body = BaggerJSONResponse(crud.get_bagger_rows(db, limit=rows)).body
+            for coding in compression.ENCODERS:
+                for level in LEVELS[coding]:
+                    compressed = compression.compress(body, coding, level)
+                    timing = time_call(
+                        lambda: compression.compress(body, coding, level),
+                        repeat=args.repeat,
+                    )
+                    print(
+                        json.dumps(
+                            {
+                                "rows": rows,
+                                "coding": coding,
+                                "level": level,
+                                "bytes": len(body),
+                                "compressed_bytes": len(compressed),
+                                "ratio": round(len(body) / len(compressed), 2),
+                                "median_ms": timing["median_ms"],
+                                "mb_per_s": round(
+                                    len(body) / 1000 / timing["median_ms"], 1
+                                ),
+                            }
+                        )
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Time duplicate detection and contact lookups on a large roster.
+
+Seeds ``--rows`` members, then rewrites every ``--every``-th member's email
+address and phone number as another member's, in a different letter case or
+format, so each such pair is a duplicate cluster. Reports:
+
+* ``duplicates``: walking every cluster through ``crud.get_duplicates``, one
+  page of ``--page`` clusters at a time, using the normalized column indexes.
+* ``unindexed``: the same report from a single ``GROUP BY lower(...)`` over
+  the raw column, as a client or ad hoc query without the shadow columns
+  would run it.
+* ``lookup``: single lookups by email address and phone number.
+
+Usage:
+    python -m benchmarks.bench_duplicates --rows 5000000
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from baggers import contacts, crud
+
+from .common import make_engine, seed_database, time_call
+
+
+def add_duplicates(path: str, every: int):
+    """Copy contact details between members and fill the normalized columns."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.create_function(
+            "normalize_email", 1, contacts.normalize_email, deterministic=True
+        )
+        conn.create_function(
+            "normalize_phone", 1, contacts.normalize_phone, deterministic=True
+        )
+        conn.execute(
+            "UPDATE baggers SET \"emailAddress\" = upper('member' || (id - 2) || "
+            "'@example.com'), \"phoneNumber\" = '+61 4' || "
+            "substr(printf('%08d', id - 2), 1, 4) || ' ' || "
+            "substr(printf('%08d', id - 2), 5) WHERE id % ? = 0 AND id > 1",
+            (every,),
+        )
+        conn.execute(
+            'UPDATE baggers SET email_normalized = normalize_email("emailAddress"), '
+            'phone_normalized = normalize_phone("phoneNumber")'
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--every", type=int, default=100)
+    parser.add_argument("--page", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "baggers.db")
+        seed_database(path, args.rows)
+        add_duplicates(path, args.every)
+        engine = make_engine(path)[0]
+        with Session(engine) as db:
+            for by in ("email", "phone"):
+                start = time.perf_counter()
+                clusters, members, after = 0, 0, None
+                while page := crud.get_duplicates(
+                    db, by=by, limit=args.page, after=after
+                ):
+                    clusters += len(page)
+                    members += sum(len(rows) for _, rows in page)
+                    after = page[-1][0]
+                seconds = time.perf_counter() - start
+                first = time_call(
+                    lambda: crud.get_duplicates(db, by=by, limit=args.page), repeat=5
+                )
+                print(
+                    json.dumps(
+                        {
+                            "mode": "duplicates",
+                            "by": by,
+                            "rows": args.rows,
+                            "clusters": clusters,
+                            "members": members,
+                            "seconds": round(seconds, 2),
+                            "first_page_median_ms": first["median_ms"],
+                        }
+                    )
+                )
+
+            start = time.perf_counter()
+            unindexed = db.execute(
+                text(
+                    'SELECT lower(trim("emailAddress")) AS email, count(*) '
+                    'FROM baggers WHERE "emailAddress" IS NOT NULL '
+                    "GROUP BY email HAVING count(*) > 1"
+                )
+            ).all()
+            print(
+                json.dumps(
+                    {
+                        "mode": "unindexed",
+                        "by": "email",
+                        "rows": args.rows,
+                        "clusters": len(unindexed),
+                        "seconds": round(time.perf_counter() - start, 2),
+                    }
+                )
+            )
+
+            rng = random.Random(0)
+            for by, lookup, value in (
+                ("email", crud.get_baggers_by_email, "MEMBER{}@Example.com"),
+                ("phone", crud.get_baggers_by_phone, "04{:08d}"),
+            ):
+                timing = time_call(
+                    lambda: lookup(db, value.format(rng.randrange(args.rows))),
+                    repeat=2000,
+                )
+                print(json.dumps({"mode": "lookup", "by": by, **timing}))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compare server peak memory of GET /baggers/export and a large list page.
+
+Each scenario gets a fresh uvicorn process whose peak RSS (VmHWM) is read
+after the response has been consumed. SQLite memory-mapping is disabled so
+mapped database pages do not count towards the figure.
+
+Usage:
+    python -m benchmarks.bench_export --sizes 10000,1000000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import httpx
+
+from .common import peak_rss_mb, seed_database, serve
+
+SCENARIOS = {
+    "export-ndjson": ("/baggers/export", {"format": "ndjson"}),
+    "export-csv": ("/baggers/export", {"format": "csv"}),
+    "list": ("/baggers/", None),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,1000000")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument(
+        "--env",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("NAME", "VALUE"),
+        help="Extra server environment, e.g. --env BAGGERS_SQLITE_CACHE_SIZE -2000",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "baggers.db")
+        for rows in (int(size) for size in args.sizes.split(",")):
+            seed_database(path, rows)
+            for scenario in args.scenarios.split(","):
+                url, params = SCENARIOS[scenario]
+                env = {
+                    "BAGGERS_SQLITE_MMAP_SIZE": "0",
+                    "BAGGERS_MAX_PAGE_SIZE": "0",
+                    **dict(args.env),
+                }
+                with serve(workdir, env) as (base_url, process):
+                    idle_mb = peak_rss_mb(process.pid)
+                    start = time.perf_counter()
+                    received = 0
+                    with httpx.stream(
+                        "GET",
+                        base_url + url,
+                        params=params or {"limit": rows},
+                        timeout=None,
+                    ) as response:
+                        for chunk in response.iter_raw():
+                            received += len(chunk)
+                    result = {
+                        "scenario": scenario,
+                        "rows": rows,
+                        "seconds": round(time.perf_counter() - start, 2),
+                        "bytes": received,
+                        "idle_rss_mb": idle_mb,
+                        "peak_rss_mb": peak_rss_mb(process.pid),
+                    }
+                print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare write throughput with and without group commit.
+
+Starts uvicorn once per combination of group commit on/off and
+``PRAGMA synchronous`` (``normal`` and ``full``, which fsyncs every commit),
+then drives it with 1, 16 and 128 concurrent writers. Each writer sends
+creates and updates in equal measure.
+
+Usage:
+    python -m benchmarks.bench_group_commit --writers 1 16 128
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import uuid
+
+from .common import drive, member_name, seed_database, serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 16, 128])
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--synchronous", nargs="+", default=["normal", "full"])
+    args = parser.parse_args()
+
+    async def write(client, rng):
+        name = member_name(rng.randrange(1000))
+        if rng.random() < 0.5:
+            return await client.post(
+                "/baggers/", json={"name": name, "membershipNo": uuid.uuid4().hex}
+            )
+        i = rng.randint(1, args.rows)
+        return await client.put(
+            f"/baggers/{i}", json={"name": name, "membershipNo": f"AFL{i - 1:08d}"}
+        )
+
+    with tempfile.TemporaryDirectory() as workdir:
+        seed_database(os.path.join(workdir, "baggers.db"), args.rows)
+        for synchronous in args.synchronous:
+            for mode in ("off", "on"):
+                env = {
+                    "BAGGERS_SQLITE_SYNCHRONOUS": synchronous,
+                    "BAGGERS_GROUP_COMMIT": "1" if mode == "on" else "0",
+                }
+                with serve(workdir, env) as (base_url, _):
+                    for writers in args.writers:
+                        result = asyncio.run(
+                            drive(base_url, write, args.requests, writers)
+                        )
+                        print(
+                            json.dumps(
+                                {
+                                    "synchronous": synchronous,
+                                    "group_commit": mode,
+                                    "writers": writers,
+                                    **result,
+                                }
+                            )
+                        )
+
+
+if __name__ == "__main__":
+    main()
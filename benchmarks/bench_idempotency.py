@@ -0,0 +1,100 @@
+"""Measure the cost of a retry storm with and without idempotency keys.
+
+Runs uvicorn against a seeded database, then for each mode (``no-keys`` and
+``keys``):
+
+* ``first-write``: creates ``--members`` baggers, with an ``Idempotency-Key``
+  each in ``keys`` mode, to show what storing the response costs.
+* ``create-retry``: resends those creates ``--requests`` times in total, as
+  clients do after a timeout. Without keys each retry is a failed insert and
+  a 422; with keys it is replayed from ``idempotency_keys``.
+* ``update-retry``: resends one update per member the same way. Without keys
+  each retry rewrites the row and bumps its version.
+
+``rows_written`` counts the bagger writes each phase committed, read from the
+growth of the change log.
+
+Usage:
+    python -m benchmarks.bench_idempotency --requests 5000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+
+from .common import drive, member_name, seed_database, serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--members", type=int, default=1_000)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    def body(mode: str, i: int) -> dict:
+        return {"name": member_name(i), "membershipNo": f"{mode}-{i}"}
+
+    def headers(mode: str, kind: str, i: int) -> dict:
+        return {"Idempotency-Key": f"{kind}-{i}"} if mode == "keys" else {}
+
+    def writes(path: str) -> int:
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute("SELECT max(seq) FROM bagger_changes").fetchone()[0]
+        finally:
+            conn.close()
+
+    async def run(base_url: str, path: str, mode: str) -> dict:
+        created = itertools.count()
+        ids = {}
+
+        async def first_write(client, rng):
+            i = next(created)
+            response = await client.post(
+                "/baggers/", json=body(mode, i), headers=headers(mode, "create", i)
+            )
+            ids[i] = response.json()["id"]
+            return response
+
+        async def create_retry(client, rng):
+            i = rng.randrange(args.members)
+            return await client.post(
+                "/baggers/", json=body(mode, i), headers=headers(mode, "create", i)
+            )
+
+        async def update_retry(client, rng):
+            i = rng.randrange(args.members)
+            return await client.put(
+                f"/baggers/{ids[i]}",
+                json={**body(mode, i), "name": f"{member_name(i)} Jr"},
+                headers=headers(mode, "update", i),
+            )
+
+        results = {}
+        for phase, make_request, total in (
+            ("first-write", first_write, args.members),
+            ("create-retry", create_retry, args.requests),
+            ("update-retry", update_retry, args.requests),
+        ):
+            before = writes(path)
+            result = await drive(base_url, make_request, total, args.concurrency)
+            results[phase] = {**result, "rows_written": writes(path) - before}
+        return results
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "baggers.db")
+        seed_database(path, args.rows)
+        with serve(workdir) as (base_url, _):
+            for mode in ("no-keys", "keys"):
+                for phase, result in asyncio.run(run(base_url, path, mode)).items():
+                    print(json.dumps({"mode": mode, "phase": phase, **result}))
+
+
+if __name__ == "__main__":
+    main()
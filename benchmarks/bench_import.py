@@ -0,0 +1,96 @@
+"""Compare bulk import throughput with creating baggers one at a time.
+
+Seeds a database, exports it to a file, then loads that file into empty
+databases:
+
+* ``per-row``: ``crud.create_bagger`` for each record, committing each one,
+  as the API does for ``POST /baggers/``. Only the first ``--per-row-rows``
+  records are loaded, since this path is slow.
+* ``import``: ``baggers import`` with the given workers, with indexes kept
+  or deferred.
+
+Usage:
+    python -m benchmarks.bench_import --rows 1000000 --format csv
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from itertools import islice
+
+from baggers import crud, schemas, transfer
+
+from .common import make_engine, seed_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--per-row-rows", type=int, default=20_000)
+    parser.add_argument("--format", choices=transfer.FORMATS, default="csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        seeded = os.path.join(workdir, "seed.db")
+        seed_database(seeded, args.rows)
+        seeded_engine = make_engine(seeded)[0]
+        source = os.path.join(workdir, f"baggers.{args.format}")
+        transfer.export_file(seeded_engine, source)
+        file_mb = round(os.path.getsize(source) / 2**20, 1)
+
+        engine, SessionLocal = make_engine(os.path.join(workdir, "per-row.db"))
+        rows = crud.iter_baggers(seeded_engine)
+        start = time.perf_counter()
+        with SessionLocal() as db:
+            for _, name, membership_no, email, phone in islice(rows, args.per_row_rows):
+                crud.create_bagger(
+                    db,
+                    schemas.BaggerCreate(
+                        name=name,
+                        membershipNo=membership_no,
+                        emailAddress=email,
+                        phoneNumber=phone,
+                    ),
+                )
+        seconds = time.perf_counter() - start
+        rows.close()
+        seeded_engine.dispose()
+        engine.dispose()
+        print(
+            json.dumps(
+                {
+                    "mode": "per-row",
+                    "rows": args.per_row_rows,
+                    "seconds": round(seconds, 2),
+                    "rows_per_second": round(args.per_row_rows / seconds),
+                }
+            )
+        )
+
+        for workers, defer in ((1, False), (1, True), (args.workers, True)):
+            name = f"import-{workers}w-{'deferred' if defer else 'indexed'}"
+            engine = make_engine(os.path.join(workdir, f"{name}.db"))[0]
+            summary = transfer.import_file(
+                engine, source, workers=workers, defer_indexes=defer
+            )
+            engine.dispose()
+            print(
+                json.dumps(
+                    {
+                        "mode": name,
+                        "format": args.format,
+                        "file_mb": file_mb,
+                        "rows": summary.created,
+                        "rejected": summary.rejected,
+                        "seconds": round(summary.seconds, 2),
+                        "rows_per_second": round(summary.rows_per_second),
+                    }
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Compare POST /baggers/lookup against N single membership lookups.
+
+Usage:
+    python -m benchmarks.bench_lookup --rows 1000000 --batch 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from .common import make_client, seed_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # Roughly one in ten requested numbers is not registered.
+    membership_nos = [
+        f"AFL{rng.randrange(int(args.rows * 1.1)):08d}" for _ in range(args.batch)
+    ]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "baggers.db")
+        seed_database(path, args.rows)
+        client = make_client(path)
+
+        start = time.perf_counter()
+        for membership_no in membership_nos:
+            client.get(f"/baggers/by-membership/{membership_no}")
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        client.post("/baggers/lookup", json={"membershipNos": membership_nos})
+        batch = time.perf_counter() - start
+
+    print(
+        json.dumps(
+            {
+                "lookups": args.batch,
+                "single_seconds": round(single, 3),
+                "batch_seconds": round(batch, 3),
+                "speedup": round(single / batch, 1),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Compare the file-backed engine with in-memory serving.
+
+Reports, for each mode, the time to the first answered query (for in-memory
+serving, the restore of the file into memory), single-read and list-page
+latency, and the latency of a committed write. With synchronous write-back,
+a write includes copying the whole database back to the file.
+
+Usage:
+    python -m benchmarks.bench_memory --rows 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from sqlalchemy.orm import sessionmaker
+
+from baggers import crud, schemas
+from baggers.database import MemoryDatabase, create_db_engine
+
+from .common import make_engine, member_name, seed_database, time_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "baggers.db")
+        seed_database(path, args.rows)
+        make_engine(path)[0].dispose()
+        url = f"sqlite:///{path}"
+        for mode in ("file", "memory", "memory-lag"):
+            start = time.perf_counter()
+            memory = None
+            if mode != "file":
+                memory = MemoryDatabase(path, 0.0 if mode == "memory" else 5.0)
+            engine = create_db_engine(url, creator=memory and memory.connect)
+            SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            rng = random.Random(0)
+            with SessionLocal() as db:
+                crud.get_bagger(db, 1)
+                startup = time.perf_counter() - start
+                single = time_call(
+                    lambda: crud.get_bagger(db, rng.randint(1, args.rows)),
+                    repeat=args.repeat,
+                )
+                page = time_call(
+                    lambda: crud.get_bagger_rows(
+                        db, after=rng.randint(1, args.rows), limit=100
+                    ),
+                    repeat=args.repeat // 10,
+                )
+                write = time_call(
+                    lambda: crud.create_bagger(
+                        db,
+                        schemas.BaggerCreate(
+                            name=member_name(rng.randrange(1000)),
+                            membershipNo=uuid.uuid4().hex,
+                        ),
+                    ),
+                    repeat=5,
+                )
+            engine.dispose()
+            if memory is not None:
+                memory.close()
+            print(
+                json.dumps(
+                    {
+                        "mode": mode,
+                        "rows": args.rows,
+                        "database_mb": round(os.path.getsize(path) / 2**20, 1),
+                        "startup_s": round(startup, 3),
+                        "single_read_median_ms": single["median_ms"],
+                        "single_read_p95_ms": single["p95_ms"],
+                        "page_median_ms": page["median_ms"],
+                        "write_median_ms": write["median_ms"],
+                    }
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
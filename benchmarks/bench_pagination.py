@@ -0,0 +1,40 @@
+"""Compare OFFSET and keyset pagination of ``crud.get_baggers``.
+
+Usage:
+    python -m benchmarks.bench_pagination --rows 1000000
+"""
+
+import argparse
+
+from baggers import crud
+
+from .common import make_engine, seed_database, time_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="bench_baggers.db")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", default="1,10,100,1000,10000")
+    args = parser.parse_args()
+
+    seed_database(args.db, args.rows)
+    _, SessionLocal = make_engine(args.db)
+
+    print(f"{'page':>8} {'offset median ms':>18} {'cursor median ms':>18}")
+    with SessionLocal() as db:
+        for page in (int(p) for p in args.pages.split(",")):
+            skip = (page - 1) * args.limit
+            # Seeded IDs are dense, so the cursor for page N is the last ID of N-1.
+            offset = time_call(
+                lambda: crud.get_baggers(db, skip=skip, limit=args.limit)
+            )
+            cursor = time_call(
+                lambda: crud.get_baggers(db, after=skip, limit=args.limit)
+            )
+            print(f"{page:>8} {offset['median_ms']:>18} {cursor['median_ms']:>18}")
+
+
+if __name__ == "__main__":
+    main()
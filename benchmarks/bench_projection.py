@@ -0,0 +1,73 @@
+"""Compare full list pages with ``fields=`` projections.
+
+For each projection, reports the response size, the time to query a page from
+the middle of the table and to serve it through the API, and the SQLite query
+plan, which shows whether the page is read from a covering index.
+
+Usage:
+    python -m benchmarks.bench_projection --rows 1000000 --limit 1000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from baggers import crud, models
+from baggers.pagination import encode_cursor
+
+from .common import make_client, make_engine, seed_database, time_call
+
+PROJECTIONS = (None, "membershipNo", "name")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "baggers.db")
+        seed_database(path, args.rows)
+        engine, SessionLocal = make_engine(path)
+        after = args.rows // 2
+        with make_client(path) as client, SessionLocal() as db:
+            for fields in PROJECTIONS:
+                params = {"limit": args.limit, "after": encode_cursor(after)}
+                columns = crud.BAGGER_COLUMNS
+                if fields is not None:
+                    params["fields"] = fields
+                    columns = ("id", fields)
+                query = crud._rows_query(columns).where(models.Bagger.id > after)
+                compiled = query.limit(args.limit).compile(
+                    engine, compile_kwargs={"literal_binds": True}
+                )
+                with engine.connect() as conn:
+                    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+                body = client.get("/baggers/", params=params).content
+                query_timing = time_call(
+                    lambda: crud.get_bagger_rows(
+                        db, after=after, limit=args.limit, columns=columns
+                    ),
+                    repeat=50,
+                )
+                request_timing = time_call(
+                    lambda: client.get("/baggers/", params=params), repeat=50
+                )
+                print(
+                    json.dumps(
+                        {
+                            "fields": fields or "all",
+                            "bytes": len(body),
+                            "query_median_ms": query_timing["median_ms"],
+                            "request_median_ms": request_timing["median_ms"],
+                            "request_p95_ms": request_timing["p95_ms"],
+                            "plan": plan[-1][-1],
+                        }
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
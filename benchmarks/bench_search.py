@@ -0,0 +1,72 @@
+"""Compare FTS5 search against a LIKE '%...%' scan.
+
+Usage:
+    python -m benchmarks.bench_search --rows 1000000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import or_
+
+from baggers import crud, models, search
+
+from .common import make_engine, seed_database, time_call
+
+QUERIES = ("smith", "harri", "jack nguyen", "member4242", "0400012")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "baggers.db")
+        start = time.perf_counter()
+        seed_database(path, args.rows)
+        print(json.dumps({"seed_seconds": round(time.perf_counter() - start, 2)}))
+
+        engine, SessionLocal = make_engine(path)
+        start = time.perf_counter()
+        search.rebuild(engine)
+        print(json.dumps({"rebuild_seconds": round(time.perf_counter() - start, 2)}))
+
+        with SessionLocal() as db:
+            for q in QUERIES:
+                fts = time_call(
+                    lambda: crud.search_baggers(db, q=q, limit=args.limit), repeat=5
+                )
+                like = time_call(
+                    lambda: db.query(models.Bagger)
+                    .filter(
+                        *(
+                            or_(
+                                models.Bagger.name.like(f"%{word}%"),
+                                models.Bagger.emailAddress.like(f"%{word}%"),
+                                models.Bagger.phoneNumber.like(f"%{word}%"),
+                            )
+                            for word in q.split()
+                        )
+                    )
+                    .limit(args.limit)
+                    .all(),
+                    repeat=5,
+                )
+                print(
+                    json.dumps(
+                        {
+                            "q": q,
+                            "fts_median_ms": fts["median_ms"],
+                            "like_median_ms": like["median_ms"],
+                        }
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Measure rows/sec serialised by the list endpoint's old and new paths.
+
+"orm" loads ORM objects and validates them through ``List[schemas.Bagger]``
+before JSON encoding, as FastAPI does for a ``response_model``. "rows"
+selects plain rows and encodes them with ``BaggerJSONResponse``.
+
+Usage:
+    python -m benchmarks.bench_serialization --sizes 100,1000,10000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from baggers import crud, responses, schemas
+
+from .common import make_engine, seed_database, time_call
+
+adapter = TypeAdapter(List[schemas.Bagger])
+
+
+def orm_path(db, limit):
+    baggers = crud.get_baggers(db, limit=limit)
+    content = adapter.dump_python(
+        adapter.validate_python(baggers, from_attributes=True), mode="json"
+    )
+    return JSONResponse(content).body
+
+
+def rows_path(db, limit):
+    return responses.BaggerJSONResponse(crud.get_bagger_rows(db, limit=limit)).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "baggers.db")
+        seed_database(path, max(sizes))
+        _, SessionLocal = make_engine(path)
+        with SessionLocal() as db:
+            for size in sizes:
+                result = {"rows": size, "orjson": responses.orjson is not None}
+                for name, path_fn in (("orm", orm_path), ("rows", rows_path)):
+                    timing = time_call(lambda: path_fn(db, size), repeat=10)
+                    result[f"{name}_rows_per_s"] = round(
+                        size / timing["median_ms"] * 1000
+                    )
+                print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Measure reader latency while writers commit, with and without tuning.
+
+Writers are throttled to a fixed rate so both profiles do the same write
+work. The "default" profile is SQLite's rollback journal with synchronous=FULL;
+"tuned" is the engine factory's WAL profile from ``baggers.config``.
+
+Usage:
+    python -m benchmarks.bench_sqlite_tuning --seconds 10
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from baggers import crud, schemas
+from baggers.config import settings
+
+from .common import make_engine, percentiles, seed_database
+
+PROFILES = {
+    "default": dataclasses.replace(
+        settings,
+        sqlite_journal_mode="delete",
+        sqlite_synchronous="full",
+        sqlite_cache_size=-2000,
+        sqlite_mmap_size=0,
+        sqlite_temp_store="default",
+    ),
+    "tuned": settings,
+}
+
+
+def run_profile(path: str, config, args) -> dict:
+    """Run concurrent readers and writers against one database profile."""
+    engine, SessionLocal = make_engine(path, config)
+    stop = threading.Event()
+    read_latencies, writes = [], [0]
+
+    def reader(seed):
+        rng = random.Random(seed)
+        with SessionLocal() as db:
+            while not stop.is_set():
+                start = time.perf_counter()
+                crud.get_bagger(db, bagger_id=rng.randint(1, args.rows))
+                read_latencies.append(time.perf_counter() - start)
+                db.rollback()
+
+    def writer(seed):
+        rng = random.Random(seed)
+        with SessionLocal() as db:
+            while not stop.is_set():
+                if rng.random() < 0.5:
+                    crud.create_bagger(
+                        db,
+                        schemas.BaggerCreate(
+                            name="Writer",
+                            membershipNo=f"W{seed}-{writes[0]}-{rng.random()}",
+                        ),
+                    )
+                else:
+                    crud.update_bagger(
+                        db,
+                        bagger_id=rng.randint(1, args.rows),
+                        bagger=schemas.BaggerCreate(
+                            name="Updated", membershipNo=f"U{seed}-{rng.random()}"
+                        ),
+                    )
+                writes[0] += 1
+                time.sleep(1 / args.write_rate)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [
+        threading.Thread(target=writer, args=(100 + i,)) for i in range(args.writers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        "reads_per_s": round(len(read_latencies) / args.seconds, 1),
+        "writes_per_s": round(writes[0] / args.seconds, 1),
+        **{f"read_{k}": v for k, v in percentiles(read_latencies).items()},
+        "read_max_ms": round(max(read_latencies) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--readers", type=int, default=1)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument(
+        "--write-rate", type=float, default=50, help="Writes per second per writer"
+    )
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    # Keep GIL hand-offs short so latencies reflect SQLite locking, not threads.
+    sys.setswitchinterval(0.0005)
+
+    for profile, config in PROFILES.items():
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "baggers.db")
+            seed_database(path, args.rows)
+            print(json.dumps({"profile": profile, **run_profile(path, config, args)}))
+
+
+if __name__ == "__main__":
+    main()
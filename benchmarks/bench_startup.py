@@ -0,0 +1,101 @@
+"""Measure worker startup time with and without import-time schema creation.
+
+For each worker count, starts that many processes at once, each importing
+``baggers.main`` against the same migrated database, and reports the slowest
+import. The ``create_all`` rows add the metadata check every worker used to
+run at import, for comparison. Finally times ``uvicorn --workers N`` from
+launch to its first successful response.
+
+Usage:
+    python -m benchmarks.bench_startup --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .common import seed_database, serve
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import baggers.main
+if {create_all}:
+    from baggers import database, models
+    models.Base.metadata.create_all(bind=database.engine)
+print(time.perf_counter() - start)
+"""
+
+
+def time_imports(workdir: str, workers: int, create_all: bool) -> float:
+    """Import the app in ``workers`` concurrent processes.
+
+    Args:
+        workdir: Directory holding ``baggers.db``.
+        workers: Number of processes started together.
+        create_all: Also run ``create_all`` after the import.
+
+    Returns:
+        Slowest process's import time in milliseconds.
+    """
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = IMPORT_SCRIPT.format(create_all=create_all)
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", script],
+            cwd=workdir,
+            env={**os.environ, "PYTHONPATH": repo_root},
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(workers)
+    ]
+    elapsed = [float(process.communicate()[0]) for process in processes]
+    return round(max(elapsed) * 1000, 1)
+
+
+def time_to_first_response(workdir: str, workers: int) -> float:
+    """Time ``uvicorn --workers N`` from launch to its first response.
+
+    Args:
+        workdir: Directory holding ``baggers.db``.
+        workers: Number of uvicorn worker processes.
+
+    Returns:
+        Milliseconds until ``GET /baggers/1`` first succeeded.
+    """
+    start = time.perf_counter()
+    with serve(workdir, args=("--workers", str(workers))) as (base_url, _):
+        httpx.get(f"{base_url}/baggers/1").raise_for_status()
+        return round((time.perf_counter() - start) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        seed_database(os.path.join(workdir, "baggers.db"), args.rows)
+        for workers in args.workers:
+            print(
+                json.dumps(
+                    {
+                        "workers": workers,
+                        "import_ms": time_imports(workdir, workers, False),
+                        "import_create_all_ms": time_imports(workdir, workers, True),
+                        "first_response_ms": time_to_first_response(workdir, workers),
+                    }
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Measure throughput of ``baggers serve`` at 1, 2, 4 and 8 worker processes.
+
+Each worker count is driven with a read-heavy mix (90% single reads, 10% list
+pages) and a write-heavy mix (50% updates, 30% creates, 20% reads) against
+the same SQLite file. Errors include any ``database is locked`` failures.
+
+Usage:
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import uuid
+
+from .common import drive, member_name, seed_database, serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5_000)
+    args = parser.parse_args()
+
+    async def read_heavy(client, rng):
+        if rng.random() < 0.9:
+            return await client.get(f"/baggers/{rng.randint(1, args.rows)}")
+        return await client.get("/baggers/", params={"limit": 20})
+
+    async def write_heavy(client, rng):
+        roll = rng.random()
+        if roll < 0.5:
+            i = rng.randint(1, args.rows)
+            return await client.put(
+                f"/baggers/{i}",
+                json={
+                    "name": member_name(rng.randrange(1000)),
+                    "membershipNo": f"AFL{i - 1:08d}",
+                },
+            )
+        if roll < 0.8:
+            return await client.post(
+                "/baggers/",
+                json={
+                    "name": member_name(rng.randrange(1000)),
+                    "membershipNo": uuid.uuid4().hex,
+                },
+            )
+        return await client.get(f"/baggers/{rng.randint(1, args.rows)}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        seed_database(os.path.join(workdir, "baggers.db"), args.rows)
+        for workers in args.workers:
+            command = ("-m", "baggers.cli", "serve", "--workers", str(workers))
+            with serve(workdir, command=command) as (base_url, _):
+                for mix, make_request in (
+                    ("read", read_heavy),
+                    ("write", write_heavy),
+                ):
+                    result = asyncio.run(
+                        drive(base_url, make_request, args.requests, args.concurrency)
+                    )
+                    print(json.dumps({"workers": workers, "mix": mix, **result}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import asyncio
+import contextlib
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from baggers import contacts, migrations
+from baggers.config import settings
+from baggers.database import create_db_engine, get_db
+
+GIVEN_NAMES = (
+    "Jack Olivia Noah Charlotte William Amelia Oliver Isla Leo Mia Henry Ava "
+    "Thomas Grace James Chloe Lucas Zoe Harrison Ruby Archie Sophie Hudson Ella Max"
+).split()
+SURNAMES = (
+    "Smith Jones Williams Brown Wilson Taylor Johnson White Martin Anderson "
+    "Thompson Nguyen Thomas Walker Harris Lee Ryan Robinson Kelly King Davis "
+    "Wright Evans Roberts Green Hall Wood Jackson Clarke Patel Khan Lewis James "
+    "Phillips Mitchell Turner Campbell Murphy Edwards Baker Hughes Cooper Morris "
+    "Collins Ward Stewart Morgan Bell Kennedy Reid"
+).split()
+
+
+def member_name(i: int) -> str:
+    """Return a deterministic synthetic full name for member ``i``."""
+    return f"{GIVEN_NAMES[i % len(GIVEN_NAMES)]} {SURNAMES[i // 7 % len(SURNAMES)]}"
+
+
+def make_engine(path: str, config=settings):
+    """Create an engine and session factory for a migrated benchmark database.
+
+    Args:
+        path: Filesystem path of the SQLite database.
+        config: Settings passed to the engine factory.
+
+    Returns:
+        Tuple of (engine, session factory).
+    """
+    engine = create_db_engine(f"sqlite:///{path}", config)
+    migrations.upgrade(engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def bind_app(path: str):
+    """Point the Baggers app's database dependency at a benchmark file.
+
+    Args:
+        path: Filesystem path of the SQLite database.
+
+    Returns:
+        Tuple of (app, engine).
+    """
+    from baggers.main import app
+
+    engine, SessionLocal = make_engine(path)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app, engine
+
+
+def make_client(path: str) -> TestClient:
+    """Create an in-process API client bound to a benchmark database file.
+
+    Args:
+        path: Filesystem path of the SQLite database.
+
+    Returns:
+        TestClient for the Baggers app.
+    """
+    return TestClient(bind_app(path)[0])
+
+
+def _seed_row(i: int) -> tuple:
+    email, phone = f"member{i}@example.com", f"04{i % 100_000_000:08d}"
+    return (
+        member_name(i),
+        f"AFL{i:08d}",
+        email,
+        phone,
+        contacts.normalize_email(email),
+        contacts.normalize_phone(phone),
+    )
+
+
+def seed_database(path: str, rows: int, chunk: int = 50_000):
+    """Fill the baggers table with synthetic members.
+
+    Rows are written with raw ``executemany`` so seeding millions of rows
+    takes seconds rather than minutes. Existing rows are kept, so reseeding
+    an already populated file is a no-op.
+
+    Args:
+        path: Filesystem path of the SQLite database.
+        rows: Total number of baggers the table should contain.
+        chunk: Number of rows inserted per ``executemany`` call.
+    """
+    make_engine(path)[0].dispose()
+    conn = sqlite3.connect(path)
+    try:
+        (existing,) = conn.execute("SELECT COUNT(*) FROM baggers").fetchone()
+        for start in range(existing, rows, chunk):
+            stop = min(start + chunk, rows)
+            conn.executemany(
+                "INSERT INTO baggers (name, membershipNo, emailAddress, phoneNumber,"
+                " email_normalized, phone_normalized) VALUES (?, ?, ?, ?, ?, ?)",
+                (_seed_row(i) for i in range(start, stop)),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def time_call(fn, repeat: int = 20) -> dict:
+    """Time repeated calls of ``fn`` and summarise the latencies.
+
+    Args:
+        fn: Zero-argument callable to measure.
+        repeat: Number of timed calls.
+
+    Returns:
+        Dictionary with median and p95 latency in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Summarise latency samples given in seconds.
+
+    Args:
+        samples: Latency samples in seconds.
+
+    Returns:
+        Dictionary with p50, p95 and p99 latency in milliseconds.
+    """
+    ordered = sorted(samples)
+    return {
+        f"p{p}_ms": round(
+            ordered[min(len(ordered) - 1, len(ordered) * p // 100)] * 1000, 3
+        )
+        for p in (50, 95, 99)
+    }
+
+
+@contextlib.contextmanager
+def serve(workdir: str, env: dict | None = None, args: tuple = (), command: tuple = ()):
+    """Run the Baggers app under uvicorn in a subprocess.
+
+    The database file is resolved relative to ``workdir``.
+
+    Args:
+        workdir: Working directory for the server process.
+        env: Extra environment variables, e.g. ``BAGGERS_*`` settings.
+        args: Extra uvicorn command line arguments.
+        command: Server command to run instead of plain uvicorn, e.g.
+            ``("-m", "baggers.cli", "serve")``; it must accept ``--port``.
+
+    Yields:
+        Tuple of (base URL, server process).
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if not command:
+        command = ("-m", "uvicorn", "baggers.main:app", "--log-level", "warning")
+    process = subprocess.Popen(
+        [sys.executable, *command, "--port", str(port), *args],
+        cwd=workdir,
+        env={**os.environ, "PYTHONPATH": repo_root, **(env or {})},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(300):
+            try:
+                httpx.get(f"{base_url}/docs", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        yield base_url, process
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def peak_rss_mb(pid: int) -> float:
+    """Read a process's peak resident set size from ``/proc`` (Linux only).
+
+    Args:
+        pid: Process ID.
+
+    Returns:
+        Peak RSS in MiB.
+    """
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    raise RuntimeError("VmHWM not reported")
+
+
+async def drive(
+    base_url: str, make_request, total: int, concurrency: int, transport=None
+) -> dict:
+    """Send ``total`` requests from ``concurrency`` concurrent clients.
+
+    Args:
+        base_url: Server base URL.
+        make_request: Callable taking an ``httpx.AsyncClient`` and a
+            ``random.Random`` and returning an awaitable response.
+        total: Total number of requests to send.
+        concurrency: Number of concurrent clients.
+        transport: Optional httpx transport, e.g. ``httpx.ASGITransport`` to
+            call the app in-process instead of over a socket.
+
+    Returns:
+        Dictionary with request rate, error count and latency percentiles.
+    """
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60, transport=transport
+    ) as client:
+
+        async def worker(seed):
+            nonlocal errors
+            rng = random.Random(seed)
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    response = await make_request(client, rng)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "req_per_s": round(total / elapsed, 1),
+        **percentiles(latencies),
+    }
@@ -0,0 +1,360 @@
+"""Load-test every Baggers route and compare the results against a baseline.
+
+Seeds (or reuses) a database in ``--workdir``, then drives each scenario
+either in-process through ``httpx.ASGITransport`` or over a local uvicorn
+server, and prints one JSON document with req/s, p50/p95/p99 latency and,
+in-process, SQL statements per request.
+
+Usage:
+    python -m benchmarks.suite --rows 100000 --output results.json
+    python -m benchmarks.suite --mode uvicorn --baseline results.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import sys
+import time
+
+import httpx
+from sqlalchemy import event
+
+from baggers.pagination import encode_cursor
+
+from .common import SURNAMES, bind_app, drive, member_name, seed_database, serve
+
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "statements_per_request")
+
+
+def _payload(membership_no: str, i: int) -> dict:
+    return {
+        "name": member_name(i),
+        "membershipNo": membership_no,
+        "emailAddress": f"member{i}@example.com",
+        "phoneNumber": f"04{i % 100_000_000:08d}",
+    }
+
+
+def build_scenarios(rows: int, run_id: str) -> dict:
+    """Build the request factories for each benchmark scenario.
+
+    Reads and updates target the seeded rows, whose IDs are ``1..rows`` and
+    whose membership numbers are ``AFL{id - 1:08d}``. Creates use membership
+    numbers unique to this run, and deletes only remove rows this run created.
+
+    Args:
+        rows: Number of seeded baggers.
+        run_id: Tag making created membership numbers unique per run.
+
+    Returns:
+        Mapping of scenario name to a ``drive`` request factory.
+    """
+    counter = itertools.count()
+    created: list[int] = []
+    etags: dict[str, str] = {}
+
+    def seeded_id(rng):
+        return rng.randrange(1, rows + 1)
+
+    async def read_by_id(client, rng):
+        return await client.get(f"/baggers/{seeded_id(rng)}")
+
+    async def read_by_membership(client, rng):
+        return await client.get(f"/baggers/by-membership/AFL{seeded_id(rng) - 1:08d}")
+
+    async def list_first_page(client, rng):
+        return await client.get("/baggers/", params={"limit": 100})
+
+    async def list_cursor(client, rng):
+        cursor = encode_cursor(seeded_id(rng))
+        return await client.get("/baggers/", params={"limit": 100, "after": cursor})
+
+    async def list_fields(client, rng):
+        cursor = encode_cursor(seeded_id(rng))
+        return await client.get(
+            "/baggers/",
+            params={"limit": 100, "after": cursor, "fields": "id,membershipNo"},
+        )
+
+    async def read_fields(client, rng):
+        return await client.get(
+            f"/baggers/{seeded_id(rng)}", params={"fields": "name,phoneNumber"}
+        )
+
+    async def revalidate(client, rng, url):
+        headers = {}
+        if url in etags:
+            headers["If-None-Match"] = etags[url]
+        response = await client.get(url, headers=headers)
+        if "etag" in response.headers:
+            etags[url] = response.headers["etag"]
+        return response
+
+    async def read_revalidate(client, rng):
+        return await revalidate(client, rng, f"/baggers/{rng.randrange(1, 101)}")
+
+    async def list_revalidate(client, rng):
+        return await revalidate(client, rng, "/baggers/?limit=100")
+
+    async def search(client, rng):
+        return await client.get(
+            "/baggers/search", params={"q": rng.choice(SURNAMES)[:3]}
+        )
+
+    async def by_email(client, rng):
+        email = f"Member{seeded_id(rng) - 1}@Example.com"
+        return await client.get(f"/baggers/by-email/{email}")
+
+    async def by_phone(client, rng):
+        phone = f"04{seeded_id(rng) - 1:08d}"
+        return await client.get(f"/baggers/by-phone/{phone[:4]} {phone[4:]}")
+
+    async def duplicates(client, rng):
+        return await client.get("/baggers/duplicates", params={"limit": 100})
+
+    async def lookup(client, rng):
+        nos = [f"AFL{seeded_id(rng) - 1:08d}" for _ in range(100)]
+        return await client.post("/baggers/lookup", json={"membershipNos": nos})
+
+    async def changes(client, rng):
+        since = seeded_id(rng) - 1
+        return await client.get(
+            "/baggers/changes", params={"since": since, "limit": 100}
+        )
+
+    async def changes_stream(client, rng):
+        # Time to the first event; the stream itself never ends.
+        since = seeded_id(rng) - 1
+        async with client.stream(
+            "GET", "/baggers/changes/stream", params={"since": since}
+        ) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    break
+        return response
+
+    async def create(client, rng):
+        n = next(counter)
+        response = await client.post(
+            "/baggers/", json=_payload(f"BENCH-{run_id}-{n}", n)
+        )
+        if response.status_code == 200:
+            created.append(response.json()["id"])
+        return response
+
+    async def update(client, rng):
+        bagger_id = seeded_id(rng)
+        payload = _payload(f"AFL{bagger_id - 1:08d}", bagger_id - 1)
+        payload["name"] = member_name(rng.randrange(rows))
+        return await client.put(f"/baggers/{bagger_id}", json=payload)
+
+    async def delete(client, rng):
+        if created:
+            return await client.delete(f"/baggers/{created.pop()}")
+        return await create(client, rng)
+
+    async def bulk(client, rng):
+        start = next(counter) * 100
+        body = [_payload(f"BULK-{run_id}-{start + i}", start + i) for i in range(100)]
+        return await client.post("/baggers/bulk", json=body)
+
+    async def export(client, rng):
+        return await client.get("/baggers/export", params={"format": "ndjson"})
+
+    async def export_csv(client, rng):
+        return await client.get("/baggers/export", params={"format": "csv"})
+
+    async def cache_stats(client, rng):
+        return await client.get("/cache/stats")
+
+    async def metrics(client, rng):
+        return await client.get("/metrics")
+
+    async def mixed(client, rng):
+        roll = rng.random()
+        if roll < 0.80:
+            return await read_by_id(client, rng)
+        if roll < 0.90:
+            return await list_cursor(client, rng)
+        if roll < 0.95:
+            return await create(client, rng)
+        return await update(client, rng)
+
+    return {
+        "read_by_id": read_by_id,
+        "read_by_membership": read_by_membership,
+        "list_first_page": list_first_page,
+        "list_cursor": list_cursor,
+        "list_fields": list_fields,
+        "read_fields": read_fields,
+        "read_revalidate": read_revalidate,
+        "list_revalidate": list_revalidate,
+        "search": search,
+        "lookup": lookup,
+        "by_email": by_email,
+        "by_phone": by_phone,
+        "duplicates": duplicates,
+        "changes": changes,
+        "changes_stream": changes_stream,
+        "create": create,
+        "update": update,
+        "delete": delete,
+        "bulk": bulk,
+        "export": export,
+        "export_csv": export_csv,
+        "cache_stats": cache_stats,
+        "metrics": metrics,
+        "mixed": mixed,
+    }
+
+
+# httpx.ASGITransport buffers whole responses, so endless streams can only be
+# measured against a real server.
+UVICORN_ONLY = frozenset({"changes_stream"})
+
+# Whole-roster scenarios are far slower per request; scale their count down.
+REQUEST_SCALE = {"export": 0.01, "export_csv": 0.01, "bulk": 0.1, "lookup": 0.1}
+
+
+def run_scenarios(args, base_url, transport=None, engine=None) -> dict:
+    """Run the selected scenarios one after another.
+
+    Args:
+        args: Parsed command line arguments.
+        base_url: Server base URL.
+        transport: Optional in-process httpx transport.
+        engine: Engine to count statements on; ``None`` skips counting.
+
+    Returns:
+        Mapping of scenario name to its measurements.
+    """
+    scenarios = build_scenarios(args.rows, args.run_id)
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    if engine is not None:
+        event.listen(engine, "before_cursor_execute", count)
+
+    results = {}
+    try:
+        for name in args.scenarios or scenarios:
+            if transport is not None and name in UVICORN_ONLY:
+                print(f"skipping {name}: needs --mode uvicorn", file=sys.stderr)
+                continue
+            total = max(1, int(args.requests * REQUEST_SCALE.get(name, 1)))
+            statements = 0
+            result = asyncio.run(
+                drive(base_url, scenarios[name], total, args.concurrency, transport)
+            )
+            result["statements_per_request"] = (
+                round(statements / total, 2) if engine is not None else None
+            )
+            results[name] = result
+            print(json.dumps({"scenario": name, **result}), file=sys.stderr)
+    finally:
+        if engine is not None:
+            event.remove(engine, "before_cursor_execute", count)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """List regressions of ``results`` against a stored baseline.
+
+    A scenario regresses when its req/s drops, or its latency or statement
+    count rises, by more than ``threshold`` (a fraction, e.g. ``0.1``).
+
+    Args:
+        results: Scenario measurements from this run.
+        baseline: Scenario measurements from a previous run.
+        threshold: Allowed relative change before flagging a regression.
+
+    Returns:
+        Human-readable regression descriptions; empty if none.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["req_per_s"] < previous["req_per_s"] * (1 - threshold):
+            regressions.append(
+                f"{name}: req_per_s {previous['req_per_s']} -> {current['req_per_s']}"
+            )
+        for metric in LOWER_IS_BETTER:
+            before, after = previous.get(metric), current.get(metric)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + threshold):
+                regressions.append(f"{name}: {metric} {before} -> {after}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--workdir", default="bench-data")
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenarios", nargs="*")
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Extra BAGGERS_* setting for the uvicorn server.",
+    )
+    args = parser.parse_args()
+    args.run_id = format(time.time_ns(), "x")
+
+    os.makedirs(args.workdir, exist_ok=True)
+    path = os.path.join(os.path.abspath(args.workdir), "baggers.db")
+    seed_database(path, args.rows)
+
+    if args.mode == "uvicorn":
+        env = dict(item.split("=", 1) for item in args.env)
+        with serve(args.workdir, env) as (base_url, _):
+            results = run_scenarios(args, base_url)
+    else:
+        app, engine = bind_app(path)
+        transport = httpx.ASGITransport(app=app)
+        results = run_scenarios(args, "http://bench", transport, engine)
+        engine.dispose()
+
+    report = {
+        "meta": {
+            "rows": args.rows,
+            "mode": args.mode,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as stored:
+            regressions = compare(results, json.load(stored)["results"], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,40 @@ import os
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
-from baggers.database import Base, get_db
+from baggers import metrics
+from baggers.database import Base, get_db, to_async_url
 from baggers.main import app
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_baggers.db"
+# Point at a throwaway PostgreSQL database to run the suite against Postgres.
+SQLALCHEMY_DATABASE_URL = os.environ.get(
+    "BAGGERS_TEST_DATABASE_URL", "sqlite:///./test_baggers.db"
+)
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args=(
+        {"check_same_thread": False}
+        if SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+        else {}
+    ),
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Each TestClient runs its own event loop, so async connections are not pooled.
+async_engine = create_async_engine(
+    to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool
+)
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+AsyncTestingSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 def override_get_db():
     """Override database dependency for testing.
@@ -29,6 +50,24 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    """Override database dependency with an async session for testing.
+
+    Yields:
+        AsyncSession: Test database async session.
+    """
+    async with AsyncTestingSessionLocal() as db:
+        yield db
+
+
+sqlite_only = pytest.mark.skipif(
+    engine.dialect.name != "sqlite", reason="SQLite-specific behaviour"
+)
+postgresql_only = pytest.mark.skipif(
+    engine.dialect.name != "postgresql", reason="PostgreSQL-specific behaviour"
+)
+
+
 @pytest.fixture
 def db():
     """Create a fresh database for each test.
@@ -46,21 +85,81 @@ def db():
 
 
 @pytest.fixture
-def client(db):
+def empty_database(tmp_path):
+    """Provide empty databases for tests that migrate or import into one.
+
+    Each call of the returned function gives the URL of a new SQLite file.
+    When ``BAGGERS_TEST_DATABASE_URL`` points at PostgreSQL, it empties the
+    test database instead and returns its URL, so migrations and PostgreSQL
+    DDL are exercised there too.
+
+    Yields:
+        Callable returning a database URL.
+    """
+    files = iter(range(1000))
+
+    def reset():
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA public CASCADE"))
+            conn.execute(text("CREATE SCHEMA public"))
+
+    def empty():
+        if engine.dialect.name == "sqlite":
+            return f"sqlite:///{tmp_path / f'empty{next(files)}.db'}"
+        reset()
+        return SQLALCHEMY_DATABASE_URL
+
+    yield empty
+    if engine.dialect.name != "sqlite":
+        reset()
+
+
+@pytest.fixture(params=["sync", "async"])
+def client(request, db):
     """Create a test client with database dependency override.
 
+    Every API test runs once against sync sessions and once against async
+    sessions.
+
     Args:
+        request: Pytest request selecting the session mode.
         db: Database session fixture.
 
     Yields:
         TestClient: FastAPI test client with test database.
     """
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_db] = (
+        override_get_async_db if request.param == "async" else override_get_db
+    )
     with TestClient(app) as c:
         yield c
     app.dependency_overrides = {}
 
 
+@pytest.fixture
+def queries():
+    """Record SQL statements executed against the test database.
+
+    Covers both the sync and async test engines, so statement counts can be
+    asserted for either client mode. Clear the list after test setup to count
+    only the statements of the request under test.
+
+    Yields:
+        list[str]: Executed SQL statements, in order.
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    targets = (engine, async_engine.sync_engine)
+    for target in targets:
+        event.listen(target, "before_cursor_execute", record)
+    yield statements
+    for target in targets:
+        event.remove(target, "before_cursor_execute", record)
+
+
 @pytest.fixture(scope="session", autouse=True)
 def cleanup_test_db():
     """Clean up test database file after all tests.
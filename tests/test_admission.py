@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from baggers import admission
+from baggers.config import Settings
+from baggers.database import get_db
+from baggers.router import router
+from tests.conftest import override_get_db
+
+
+def test_parse_route_limits():
+    """Test per-route limits parse with and without an explicit burst"""
+    limits = admission.parse_route_limits(
+        "GET /baggers/export=0.5:2, post /baggers/bulk=2.5"
+    )
+
+    assert limits == {"GET /baggers/export": (0.5, 2), "POST /baggers/bulk": (2.5, 3)}
+    with pytest.raises(ValueError):
+        admission.parse_route_limits("/baggers/=1")
+
+
+def test_rate_limiter_buckets():
+    """Test each client and route drains its own bucket and refills over time"""
+    limiter = admission.RateLimiter(
+        rate=1, burst=2, routes={"GET /baggers/export": (0.5, 1)}
+    )
+
+    assert [limiter.acquire("a", "GET /baggers/", now=0) for _ in range(3)] == [
+        0,
+        0,
+        1.0,
+    ]
+    assert limiter.acquire("b", "GET /baggers/", now=0) == 0
+    assert limiter.acquire("a", "GET /baggers/", now=1) == 0
+    assert limiter.acquire("a", "GET /baggers/export", now=1) == 0
+    assert limiter.acquire("a", "GET /baggers/export", now=1) == 2.0
+
+
+def test_rate_limiter_forgets_idle_clients():
+    """Test the number of buckets kept is bounded"""
+    limiter = admission.RateLimiter(rate=1, burst=1, max_clients=2)
+
+    for client in "abc":
+        limiter.acquire(client, "GET /baggers/", now=0)
+
+    assert len(limiter._buckets) == 2
+    assert limiter.acquire("a", "GET /baggers/", now=0) == 0
+
+
+def test_concurrency_limiter_queue():
+    """Test requests queue in order, and are shed when the queue is full"""
+
+    async def scenario():
+        limiter = admission.ConcurrencyLimiter(limit=1, queue_size=1, timeout=1)
+        assert await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        rejected = await limiter.acquire()
+        limiter.release()
+        admitted = await queued
+        return rejected, admitted, limiter.active, limiter.waiting
+
+    assert asyncio.run(scenario()) == (False, True, 1, 0)
+
+
+def test_concurrency_limiter_timeout():
+    """Test a request gives up its place once it has waited too long"""
+
+    async def scenario():
+        limiter = admission.ConcurrencyLimiter(limit=1, queue_size=5, timeout=0.01)
+        await limiter.acquire()
+        timed_out = await limiter.acquire()
+        limiter.release()
+        return timed_out, limiter.active, limiter.waiting
+
+    assert asyncio.run(scenario()) == (False, 0, 0)
+
+
+@pytest.fixture
+def limited(db):
+    """Create a client for an app with a low rate limit.
+
+    Yields:
+        TestClient: Client allowed two requests to each route at once.
+    """
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(
+        admission.AdmissionMiddleware,
+        routes=router.routes,
+        config=Settings(rate_limit_per_second=0.01, rate_limit_burst=2),
+    )
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as client:
+        yield client
+
+
+def test_rate_limit_response(limited):
+    """Test a client over its rate gets a 429 with Retry-After"""
+    statuses = [limited.get("/baggers/").status_code for _ in range(3)]
+    response = limited.get("/baggers/")
+
+    assert statuses == [200, 200, 429]
+    assert response.json() == {"detail": "Too many requests"}
+    assert 0 < int(response.headers["retry-after"]) <= 100
+    assert limited.get("/baggers/1").status_code == 404
+    assert limited.get("/no-such-route").status_code == 404
+
+
+def test_streams_limited_to_their_share_of_slots():
+    """Test long exports cannot take every slot from other requests"""
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = admission.AdmissionMiddleware(
+        app,
+        routes=router.routes,
+        config=Settings(max_concurrent_requests=3, max_concurrent_streams=2),
+    )
+
+    async def request(path):
+        statuses = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+        }
+        await middleware(scope, None, send)
+        return statuses[0]
+
+    async def scenario():
+        exports = [asyncio.create_task(request("/baggers/export")) for _ in range(3)]
+        await asyncio.sleep(0)
+        listing = asyncio.create_task(request("/baggers/"))
+        await asyncio.sleep(0)
+        active = middleware.concurrency.active
+        release.set()
+        return sorted(await asyncio.gather(*exports)), await listing, active
+
+    assert asyncio.run(scenario()) == ([200, 200, 503], 200, 3)
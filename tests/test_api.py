@@ -1,3 +1,15 @@
+import asyncio
+import csv
+import dataclasses
+import io
+import json
+from datetime import datetime
+
+from baggers import crud, router
+from baggers.config import settings
+from tests.conftest import engine
+
+
 def test_create_bagger_success(client):
     """Test successful bagger creation via POST /baggers/"""
     bagger_data = {
@@ -54,6 +66,62 @@ def test_create_bagger_invalid_data(client):
     assert response.status_code == 422
 
 
+def test_bulk_create_baggers(client):
+    """Test POST /baggers/bulk reports per-row results"""
+    client.post("/baggers/", json={"name": "Existing", "membershipNo": "AFL1"})
+    rows = [
+        {"name": "New", "membershipNo": "AFL2"},
+        {"name": "Clash", "membershipNo": "AFL1"},
+        {"membershipNo": "AFL3"},
+    ]
+
+    response = client.post("/baggers/bulk", json=rows)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["updated"], data["rejected"]) == (1, 0, 2)
+    assert [r["status"] for r in data["results"]] == [
+        "created",
+        "rejected",
+        "rejected",
+    ]
+    assert "already registered" in data["results"][1]["detail"]
+    assert len(client.get("/baggers/").json()) == 2
+
+
+def test_bulk_upsert_baggers_ndjson(client):
+    """Test POST /baggers/bulk?upsert=true with an NDJSON body"""
+    created = client.post(
+        "/baggers/", json={"name": "Old Name", "membershipNo": "AFL1"}
+    ).json()
+    body = "\n".join(
+        [
+            '{"name": "New Name", "membershipNo": "AFL1"}',
+            '{"name": "Fresh", "membershipNo": "AFL2"}',
+            "{not json",
+        ]
+    )
+
+    response = client.post(
+        "/baggers/bulk",
+        params={"upsert": True},
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["updated", "created", "rejected"]
+    assert results[0]["id"] == created["id"]
+    assert client.get(f"/baggers/{created['id']}").json()["name"] == "New Name"
+
+
+def test_bulk_create_baggers_not_array(client):
+    """Test POST /baggers/bulk with a non-array JSON body returns 422"""
+    response = client.post("/baggers/bulk", json={"name": "Solo"})
+
+    assert response.status_code == 422
+
+
 def test_get_baggers_empty(client):
     """Test GET /baggers/ with no baggers"""
     response = client.get("/baggers/")
@@ -79,6 +147,128 @@ def test_get_baggers_with_data(client):
     assert data[1]["name"] == "User 2"
 
 
+def test_get_baggers_cursor_pagination(client):
+    """Test walking GET /baggers/ with the X-Next-Cursor header"""
+    for i in range(5):
+        client.post("/baggers/", json={"name": f"User {i}", "membershipNo": f"AFL{i}"})
+
+    first = client.get("/baggers/", params={"limit": 2})
+    assert [b["name"] for b in first.json()] == ["User 0", "User 1"]
+
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/baggers/", params={"limit": 2, "after": cursor})
+    assert [b["name"] for b in second.json()] == ["User 2", "User 3"]
+
+    cursor = second.headers["X-Next-Cursor"]
+    last = client.get("/baggers/", params={"limit": 2, "after": cursor})
+    assert [b["name"] for b in last.json()] == ["User 4"]
+    assert "X-Next-Cursor" not in last.headers
+
+
+def test_get_baggers_invalid_cursor(client):
+    """Test GET /baggers/ with a malformed cursor returns 422"""
+    response = client.get("/baggers/", params={"after": "not-a-cursor"})
+
+    assert response.status_code == 422
+    assert "Invalid cursor" in response.json()["detail"]
+
+
+def test_search_baggers(client):
+    """Test GET /baggers/search matches name, email and phone prefixes"""
+    client.post(
+        "/baggers/",
+        json={"name": "John Smith", "membershipNo": "AFL1", "phoneNumber": "0412"},
+    )
+    client.post(
+        "/baggers/",
+        json={
+            "name": "Jane Doe",
+            "membershipNo": "AFL2",
+            "emailAddress": "jane@smithfamily.com",
+        },
+    )
+    client.post("/baggers/", json={"name": "Al Jones", "membershipNo": "AFL3"})
+
+    smiths = client.get("/baggers/search", params={"q": "smi"}).json()
+    assert {b["membershipNo"] for b in smiths} == {"AFL1", "AFL2"}
+
+    phone = client.get("/baggers/search", params={"q": "041"}).json()
+    assert [b["membershipNo"] for b in phone] == ["AFL1"]
+
+    both = client.get("/baggers/search", params={"q": "jo smith"}).json()
+    assert [b["membershipNo"] for b in both] == ["AFL1"]
+
+
+def test_search_baggers_follows_updates(client):
+    """Test the search index follows updates and deletes"""
+    created = client.post(
+        "/baggers/", json={"name": "Old Name", "membershipNo": "AFL1"}
+    ).json()
+    client.put(
+        f"/baggers/{created['id']}", json={"name": "New Name", "membershipNo": "AFL1"}
+    )
+
+    assert client.get("/baggers/search", params={"q": "old"}).json() == []
+    assert len(client.get("/baggers/search", params={"q": "new"}).json()) == 1
+
+    client.delete(f"/baggers/{created['id']}")
+    assert client.get("/baggers/search", params={"q": "new"}).json() == []
+
+
+def test_search_baggers_cursor_pagination(client):
+    """Test paging through search results with X-Next-Cursor"""
+    for i in range(5):
+        client.post("/baggers/", json={"name": f"Smith {i}", "membershipNo": f"AFL{i}"})
+
+    seen = []
+    params = {"q": "smith", "limit": 2}
+    while True:
+        response = client.get("/baggers/search", params=params)
+        seen.extend(b["membershipNo"] for b in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after"] = response.headers["X-Next-Cursor"]
+
+    assert sorted(seen) == [f"AFL{i}" for i in range(5)]
+
+
+def test_export_baggers_ndjson(client):
+    """Test GET /baggers/export streams NDJSON by default"""
+    client.post("/baggers/", json={"name": "User 1", "membershipNo": "AFL001"})
+    client.post("/baggers/", json={"name": "User 2", "membershipNo": "AFL002"})
+
+    response = client.get("/baggers/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["membershipNo"] for line in lines] == ["AFL001", "AFL002"]
+    assert lines[0]["emailAddress"] is None
+
+
+def test_export_baggers_csv(client):
+    """Test GET /baggers/export?format=csv streams a CSV with a header row"""
+    client.post(
+        "/baggers/",
+        json={"name": "Smith, Jo", "membershipNo": "AFL001", "phoneNumber": "0400"},
+    )
+
+    response = client.get("/baggers/export", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "name", "membershipNo", "emailAddress", "phoneNumber"]
+    assert rows[1][1:] == ["Smith, Jo", "AFL001", "", "0400"]
+
+
+def test_export_baggers_invalid_format(client):
+    """Test GET /baggers/export with an unknown format returns 422"""
+    response = client.get("/baggers/export", params={"format": "xml"})
+
+    assert response.status_code == 422
+
+
 def test_get_bagger_by_id_success(client):
     """Test GET /baggers/{id} with valid ID"""
     bagger_data = {"name": "Test User", "membershipNo": "AFL123"}
@@ -102,6 +292,87 @@ def test_get_bagger_by_id_not_found(client):
     assert "Bagger not found" in response.json()["detail"]
 
 
+def test_get_bagger_by_membership(client):
+    """Test GET /baggers/by-membership/{membershipNo}"""
+    client.post("/baggers/", json={"name": "Gate User", "membershipNo": "AFL321"})
+
+    response = client.get("/baggers/by-membership/AFL321")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Gate User"
+
+    missing = client.get("/baggers/by-membership/AFL000")
+    assert missing.status_code == 404
+
+
+def test_read_duplicates(client):
+    """Test GET /baggers/duplicates pages through clusters of shared contacts"""
+    for i, email in enumerate(["a@x.com", "A@X.com", "b@x.com", " B@x.com", "c@x"]):
+        client.post(
+            "/baggers/",
+            json={
+                "name": f"User {i}",
+                "membershipNo": f"AFL{i}",
+                "emailAddress": email,
+            },
+        )
+
+    response = client.get("/baggers/duplicates", params={"limit": 1})
+    assert response.status_code == 200
+    assert [
+        (c["key"], [b["membershipNo"] for b in c["baggers"]]) for c in response.json()
+    ] == [("a@x.com", ["AFL0", "AFL1"])]
+
+    after = response.headers["X-Next-Cursor"]
+    response = client.get("/baggers/duplicates", params={"limit": 1, "after": after})
+    assert [c["key"] for c in response.json()] == ["b@x.com"]
+    assert client.get("/baggers/duplicates", params={"by": "phone"}).json() == []
+    assert client.get("/baggers/duplicates", params={"after": "!"}).status_code == 422
+
+
+def test_read_baggers_by_contact(client):
+    """Test lookups by email address and phone number match any format"""
+    client.post(
+        "/baggers/",
+        json={
+            "name": "Gate User",
+            "membershipNo": "AFL321",
+            "emailAddress": "Gate@Example.com",
+            "phoneNumber": "0412 345 678",
+        },
+    )
+
+    by_email = client.get("/baggers/by-email/gate@example.COM")
+    by_phone = client.get("/baggers/by-phone/+61412345678")
+    assert [b["membershipNo"] for b in by_email.json()] == ["AFL321"]
+    assert [b["membershipNo"] for b in by_phone.json()] == ["AFL321"]
+    assert client.get("/baggers/by-phone/0499999999").json() == []
+
+
+def test_lookup_baggers(client):
+    """Test POST /baggers/lookup returns found records and misses"""
+    client.post("/baggers/", json={"name": "User 1", "membershipNo": "AFL001"})
+    client.post("/baggers/", json={"name": "User 2", "membershipNo": "AFL002"})
+
+    response = client.post(
+        "/baggers/lookup",
+        json={"membershipNos": ["AFL002", "AFL404", "AFL001", "AFL002"]},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [b["membershipNo"] for b in data["found"]] == ["AFL002", "AFL001"]
+    assert data["missing"] == ["AFL404"]
+
+
+def test_lookup_baggers_too_many(client):
+    """Test POST /baggers/lookup rejects oversized batches with 422"""
+    response = client.post(
+        "/baggers/lookup", json={"membershipNos": [f"AFL{i}" for i in range(5001)]}
+    )
+
+    assert response.status_code == 422
+
+
 def test_update_bagger_success(client):
     """Test PUT /baggers/{id} with valid data"""
     original_data = {"name": "Original Name", "membershipNo": "AFL456"}
@@ -195,6 +466,263 @@ def test_delete_bagger_not_found(client):
     assert "Bagger not found" in response.json()["detail"]
 
 
+def test_statements_per_request(client, queries):
+    """Test each single-record route issues exactly one SQL statement"""
+    bagger = {"name": "Counted", "membershipNo": "AFL100"}
+
+    queries.clear()
+    created = client.post("/baggers/", json=bagger).json()
+    assert len(queries) == 1
+
+    for method, status in (("get", 200), ("put", 200), ("delete", 200), ("put", 404)):
+        queries.clear()
+        response = client.request(method, f"/baggers/{created['id']}", json=bagger)
+        assert response.status_code == status
+        assert len(queries) == 1, (method, queries)
+
+
+def test_read_bagger_etag(client, queries):
+    """Test GET /baggers/{id} revalidates with If-None-Match without loading the row"""
+    created = client.post(
+        "/baggers/", json={"name": "John Doe", "membershipNo": "AFL12345"}
+    ).json()
+    response = client.get(f"/baggers/{created['id']}")
+    etag = response.headers["etag"]
+    assert etag == f'"{created["id"]}.1"'
+
+    queries.clear()
+    response = client.get(f"/baggers/{created['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+    assert len(queries) == 1
+    assert "name" not in queries[0]
+
+    client.put(
+        f"/baggers/{created['id']}",
+        json={"name": "John Smith", "membershipNo": "AFL12345"},
+    )
+    response = client.get(f"/baggers/{created['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'"{created["id"]}.2"'
+    assert response.json()["name"] == "John Smith"
+
+
+def test_read_baggers_etag(client):
+    """Test GET /baggers/ returns 304 until any bagger changes"""
+    client.post("/baggers/", json={"name": "John Doe", "membershipNo": "AFL12345"})
+    etag = client.get("/baggers/").headers["etag"]
+
+    response = client.get("/baggers/?limit=5", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.post("/baggers/", json={"name": "Jane Doe", "membershipNo": "AFL67890"})
+    response = client.get("/baggers/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_read_baggers_limit_ceiling(client, monkeypatch):
+    """Test page sizes above the ceiling are capped and can still page on"""
+    monkeypatch.setattr(
+        router, "settings", dataclasses.replace(settings, max_page_size=2)
+    )
+    for i in range(3):
+        client.post("/baggers/", json={"name": f"User {i}", "membershipNo": f"AFL{i}"})
+
+    response = client.get("/baggers/", params={"limit": 100000})
+    assert len(response.json()) == 2
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get("/baggers/", params={"limit": -1, "after": cursor})
+    assert [row["membershipNo"] for row in response.json()] == ["AFL2"]
+
+
+def test_read_baggers_fields(client, queries):
+    """Test fields= selects and returns only the requested columns plus id"""
+    for i in range(3):
+        client.post(
+            "/baggers/",
+            json={"name": f"User {i}", "membershipNo": f"AFL{i}", "phoneNumber": "04"},
+        )
+
+    queries.clear()
+    response = client.get("/baggers/?fields=membershipNo&limit=2")
+    assert response.json() == [
+        {"id": 1, "membershipNo": "AFL0"},
+        {"id": 2, "membershipNo": "AFL1"},
+    ]
+    assert "phoneNumber" not in queries[-1]
+
+    cursor = response.headers["x-next-cursor"]
+    response = client.get(f"/baggers/?fields=name,id&after={cursor}")
+    assert response.json() == [{"id": 3, "name": "User 2"}]
+
+    response = client.get("/baggers/?fields=name,password")
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Unknown fields: password"
+
+
+def test_read_bagger_fields(client, queries):
+    """Test fields= on a single bagger keeps the ETag and one-statement read"""
+    created = client.post(
+        "/baggers/", json={"name": "John Doe", "membershipNo": "AFL12345"}
+    )
+
+    queries.clear()
+    response = client.get(f"/baggers/{created.json()['id']}?fields=name")
+    assert response.json() == {"id": created.json()["id"], "name": "John Doe"}
+    assert response.headers["etag"] == created.headers["etag"]
+    assert len(queries) == 1
+    assert "membershipNo" not in queries[0]
+
+    assert client.get("/baggers/999?fields=name").status_code == 404
+
+
+def test_update_bagger_if_match(client):
+    """Test PUT /baggers/{id} with If-Match applies only to the expected version"""
+    created = client.post(
+        "/baggers/", json={"name": "John Doe", "membershipNo": "AFL12345"}
+    )
+    etag = created.headers["etag"]
+    url = f"/baggers/{created.json()['id']}"
+    update = {"name": "John Smith", "membershipNo": "AFL12345"}
+
+    response = client.put(url, json=update, headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+    response = client.put(url, json=update, headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert client.get(url).json()["name"] == "John Smith"
+
+    response = client.put("/baggers/999", json=update, headers={"If-Match": '"999.1"'})
+    assert response.status_code == 404
+
+
+def test_if_match_any_on_missing_bagger(client):
+    """Test If-Match: * fails with 412 rather than 404 when the bagger is missing"""
+    update = {"name": "John Smith", "membershipNo": "AFL12345"}
+    headers = {"If-Match": "*"}
+
+    assert client.put("/baggers/999", json=update, headers=headers).status_code == 412
+    assert client.delete("/baggers/999", headers=headers).status_code == 412
+    assert client.put("/baggers/999", json=update).status_code == 404
+
+    created = client.post("/baggers/", json=update).json()
+    url = f"/baggers/{created['id']}"
+    assert client.put(url, json=update, headers=headers).status_code == 200
+    assert client.delete(url, headers=headers).status_code == 200
+
+
+def test_delete_bagger_if_match(client):
+    """Test DELETE /baggers/{id} with a stale If-Match is refused"""
+    bagger_id = client.post(
+        "/baggers/", json={"name": "John Doe", "membershipNo": "AFL12345"}
+    ).json()["id"]
+    url = f"/baggers/{bagger_id}"
+    stale = client.get(url).headers["etag"]
+    client.put(url, json={"name": "John Smith", "membershipNo": "AFL12345"})
+
+    assert client.delete(url, headers={"If-Match": stale}).status_code == 412
+    current = client.get(url).headers["etag"]
+    assert client.delete(url, headers={"If-Match": current}).status_code == 200
+    assert client.get(url).status_code == 404
+
+
+def test_read_changes(client):
+    """Test GET /baggers/changes returns each bagger's latest state or tombstone"""
+    first = client.post("/baggers/", json={"name": "John", "membershipNo": "AFL1"})
+    second = client.post("/baggers/", json={"name": "Jane", "membershipNo": "AFL2"})
+    first_id, second_id = first.json()["id"], second.json()["id"]
+    client.put(f"/baggers/{first_id}", json={"name": "Johnny", "membershipNo": "AFL1"})
+
+    feed = client.get("/baggers/changes").json()
+    assert [(c["id"], c["op"]) for c in feed["changes"]] == [
+        (second_id, "upsert"),
+        (first_id, "upsert"),
+    ]
+    assert feed["changes"][1]["bagger"]["name"] == "Johnny"
+    assert feed["hasMore"] is False
+
+    client.delete(f"/baggers/{second_id}")
+    feed = client.get(f"/baggers/changes?since={feed['next']}").json()
+    assert feed["changes"] == [
+        {"seq": feed["next"], "op": "delete", "id": second_id, "bagger": None}
+    ]
+
+    assert client.get(f"/baggers/changes?since={feed['next']}").json() == {
+        "changes": [],
+        "next": feed["next"],
+        "hasMore": False,
+    }
+
+
+def test_read_changes_paged(client):
+    """Test the change feed pages with next/hasMore"""
+    for i in range(3):
+        client.post("/baggers/", json={"name": "Member", "membershipNo": f"AFL{i}"})
+
+    seen, since = [], 0
+    while True:
+        feed = client.get(f"/baggers/changes?since={since}&limit=2").json()
+        seen.extend(change["bagger"]["membershipNo"] for change in feed["changes"])
+        since = feed["next"]
+        if not feed["hasMore"]:
+            break
+    assert seen == ["AFL0", "AFL1", "AFL2"]
+
+
+def test_read_changes_after_compaction(client, db):
+    """Test syncing from before the compaction horizon returns 410"""
+    bagger_id = client.post(
+        "/baggers/", json={"name": "John", "membershipNo": "AFL1"}
+    ).json()["id"]
+    client.post("/baggers/", json={"name": "Jane", "membershipNo": "AFL2"})
+    client.delete(f"/baggers/{bagger_id}")
+    crud.compact_changes(db, before=datetime(9999, 1, 1))
+
+    assert client.get("/baggers/changes?since=1").status_code == 410
+    feed = client.get("/baggers/changes?since=0").json()
+    assert [change["bagger"]["membershipNo"] for change in feed["changes"]] == ["AFL2"]
+
+
+class _DisconnectAfter:
+    """Request stand-in that reports a disconnect after ``polls`` checks."""
+
+    def __init__(self, polls):
+        self.polls = polls
+
+    async def is_disconnected(self):
+        self.polls -= 1
+        return self.polls < 0
+
+
+def test_stream_changes(client, monkeypatch):
+    """Test the SSE stream emits committed changes with their sequence as ID"""
+    monkeypatch.setattr(
+        router, "settings", dataclasses.replace(settings, change_poll_interval=0)
+    )
+    bagger_id = client.post(
+        "/baggers/", json={"name": "John", "membershipNo": "AFL1"}
+    ).json()["id"]
+
+    async def collect():
+        return [
+            event
+            async for event in router._stream_changes(_DisconnectAfter(2), engine, 0)
+        ]
+
+    events = asyncio.run(collect())
+    assert len(events) == 1
+    lines = events[0].splitlines()
+    assert lines[1] == "event: change"
+    change = json.loads(lines[2].removeprefix("data: "))
+    assert lines[0] == f"id: {change['seq']}"
+    assert change["id"] == bagger_id
+    assert change["op"] == "upsert"
+
+
 def test_api_workflow(client):
     """Test complete CRUD workflow"""
     create_data = {
@@ -0,0 +1,205 @@
+import asyncio
+
+import pytest
+from sqlalchemy.util.concurrency import greenlet_spawn
+
+from baggers import cache, crud, schemas
+from tests.conftest import TestingSessionLocal
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for a Redis client."""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value.encode()
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, b"0")) + 1).encode()
+
+    def expire(self, key, seconds):
+        pass
+
+
+class FakeAsyncRedis:
+    """Async wrapper around `FakeRedis` that records the calls it serves."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        async def call(*args, **kwargs):
+            self.calls.append(name)
+            return method(*args, **kwargs)
+
+        return call
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    """Install a cache backend for the duration of a test.
+
+    Yields:
+        NullCache: The active LRU or fake-Redis backend.
+    """
+    if request.param == "memory":
+        backend = cache.LRUCache(max_entries=100, ttl=60)
+    else:
+        backend = cache.RedisCache(FakeRedis())
+    cache.configure_cache(backend)
+    yield backend
+    cache.configure_cache(cache.NullCache())
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Test the LRU cache evicts the oldest entry once full"""
+    lru = cache.LRUCache(max_entries=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    stats = lru.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+
+
+def test_lru_cache_expires_entries():
+    """Test entries past their TTL are treated as misses"""
+    lru = cache.LRUCache(max_entries=2, ttl=0)
+    lru.set("a", 1)
+
+    assert lru.get("a") is None
+    assert lru.stats()["expirations"] == 1
+
+
+def test_get_bagger_is_cached(db, backend):
+    """Test repeated lookups by ID are served from the cache"""
+    created = crud.create_bagger(
+        db=db, bagger=schemas.BaggerCreate(name="Cached", membershipNo="AFL1")
+    )
+
+    crud.get_bagger(db=db, bagger_id=created.id)
+    cached = crud.get_bagger(db=db, bagger_id=created.id)
+
+    assert cached.name == "Cached"
+    assert backend.stats()["hits"] == 1
+
+
+def test_update_invalidates_membership_lookup(db, backend):
+    """Test changing a membership number hides the old cached lookup"""
+    created = crud.create_bagger(
+        db=db, bagger=schemas.BaggerCreate(name="Mover", membershipNo="AFL1")
+    )
+    assert crud.get_bagger_by_membership(db=db, membership_no="AFL1") is not None
+
+    crud.update_bagger(
+        db=db,
+        bagger_id=created.id,
+        bagger=schemas.BaggerCreate(name="Mover", membershipNo="AFL2"),
+    )
+
+    assert crud.get_bagger_by_membership(db=db, membership_no="AFL1") is None
+    assert crud.get_bagger(db=db, bagger_id=created.id).membershipNo == "AFL2"
+
+
+def test_delete_invalidates_cache(db, backend):
+    """Test deleted baggers are no longer served from the cache"""
+    created = crud.create_bagger(
+        db=db, bagger=schemas.BaggerCreate(name="Gone", membershipNo="AFL1")
+    )
+    crud.get_bagger(db=db, bagger_id=created.id)
+
+    crud.delete_bagger(db=db, bagger_id=created.id)
+
+    assert crud.get_bagger(db=db, bagger_id=created.id) is None
+
+
+def test_bulk_upsert_invalidates_cache(db, backend):
+    """Test bulk upserts drop cached copies of the rows they touch"""
+    created = crud.create_bagger(
+        db=db, bagger=schemas.BaggerCreate(name="Before", membershipNo="AFL1")
+    )
+    crud.get_bagger(db=db, bagger_id=created.id)
+
+    crud.bulk_upsert_baggers(
+        db=db,
+        baggers=[schemas.BaggerCreate(name="After", membershipNo="AFL1")],
+        upsert=True,
+    )
+
+    assert crud.get_bagger(db=db, bagger_id=created.id).name == "After"
+
+
+def test_read_cache_stats(client, backend):
+    """Test GET /cache/stats reports the active backend's counters"""
+    response = client.get("/cache/stats")
+
+    assert response.status_code == 200
+    assert response.json()["backend"] == backend.name
+
+
+def test_lookup_racing_a_write_does_not_cache_old_row(db, backend, monkeypatch):
+    """Test a write committed between a miss's query and its fill wins"""
+    created = crud.create_bagger(
+        db=db, bagger=schemas.BaggerCreate(name="Before", membershipNo="AFL1")
+    )
+    fill = backend.set
+
+    def set_after_concurrent_write(key, value, lease=None):
+        with TestingSessionLocal() as other:
+            crud.update_bagger(
+                db=other,
+                bagger_id=created.id,
+                bagger=schemas.BaggerCreate(name="After", membershipNo="AFL1"),
+            )
+        fill(key, value, lease)
+
+    monkeypatch.setattr(backend, "set", set_after_concurrent_write)
+    assert crud.get_bagger(db=db, bagger_id=created.id).name == "Before"
+    monkeypatch.setattr(backend, "set", fill)
+
+    db.expire_all()
+    assert crud.get_bagger(db=db, bagger_id=created.id).name == "After"
+
+
+def test_lru_cache_refuses_leases_older_than_forgotten_invalidations():
+    """Test a lease is refused once its key's invalidation may be forgotten"""
+    lru = cache.LRUCache(max_entries=1, ttl=60)
+    lease = lru.lease("a")
+    lru.delete("a")
+    lru.delete("b")
+
+    lru.set("a", 1, lease)
+
+    assert lru.get("a") is None
+
+
+def test_redis_cache_uses_async_client_inside_greenlet():
+    """Test calls made from async-mode sessions do not block the event loop"""
+    sync_client = FakeRedis()
+    async_client = FakeAsyncRedis(sync_client)
+    redis_cache = cache.RedisCache(sync_client, async_client=async_client)
+
+    def fill():
+        redis_cache.set("a", 1, redis_cache.lease("a"))
+        return redis_cache.get("a")
+
+    assert asyncio.run(greenlet_spawn(fill)) == 1
+    assert async_client.calls == ["get", "set", "get", "get"]
+
+    assert redis_cache.get("a") == 1
+    assert len(async_client.calls) == 4
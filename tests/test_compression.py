@@ -0,0 +1,133 @@
+import gzip
+
+import pytest
+
+from baggers import compression
+from baggers.main import app
+
+
+def _seed(client, count=40):
+    rows = [
+        {"name": f"User {i}", "membershipNo": f"AFL{i:04d}", "phoneNumber": "0400"}
+        for i in range(count)
+    ]
+    assert client.post("/baggers/bulk", json=rows).status_code == 200
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip, zstd", "zstd"),
+        ("zstd;q=0.5, gzip", "gzip"),
+        ("*", "zstd"),
+        ("identity", None),
+        ("gzip;q=0, *;q=0", None),
+    ],
+)
+def test_negotiate(header, expected):
+    """Test the highest quality wins and ties go to the server's order"""
+    assert compression.negotiate(header, ("zstd", "gzip")) == expected
+
+
+def test_compressed_list_response(client):
+    """Test a large page is gzipped with a weak ETag that still revalidates"""
+    _seed(client)
+
+    response = client.get("/baggers/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"].startswith('W/"')
+    assert len(response.json()) == 40
+    response = client.get(
+        "/baggers/",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 304
+
+
+def test_uncompressed_responses(client):
+    """Test small bodies and clients without a shared coding get plain bodies"""
+    client.post("/baggers/", json={"name": "John Doe", "membershipNo": "AFL1"})
+
+    small = client.get("/baggers/", headers={"Accept-Encoding": "gzip"})
+    _seed(client)
+    identity = client.get("/baggers/", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["vary"] == "Accept-Encoding"
+    assert not identity.headers["etag"].startswith("W/")
+
+
+def test_compressed_export_streams(client):
+    """Test the export is compressed as it streams and decodes intact"""
+    _seed(client, count=200)
+
+    plain = client.get("/baggers/export", headers={"Accept-Encoding": "identity"})
+    with client.stream(
+        "GET", "/baggers/export", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+
+    assert gzip.decompress(raw) == plain.content
+    assert len(raw) < len(plain.content)
+    assert len(plain.text.splitlines()) == 200
+
+
+def test_compressed_body_cache(client, monkeypatch):
+    """Test an unchanged page is compressed once, a changed one again"""
+    calls = []
+    original = compression.compress
+
+    def counting(body, coding, level):
+        calls.append(coding)
+        return original(body, coding, level)
+
+    _seed(client)
+    monkeypatch.setattr(compression, "compress", counting)
+    # Rebuild the middleware stack for an empty cache of compressed bodies.
+    monkeypatch.setattr(app, "middleware_stack", None)
+    headers = {"Accept-Encoding": "gzip"}
+
+    first = client.get("/baggers/", headers=headers)
+    second = client.get("/baggers/", headers=headers)
+    client.post("/baggers/", json={"name": "Jane Doe", "membershipNo": "AFL9999"})
+    third = client.get("/baggers/", headers=headers)
+
+    assert calls == ["gzip", "gzip"]
+    assert first.content == second.content
+    assert len(third.json()) == 41
+
+
+def test_body_cache_eviction():
+    """Test the cache stays within its byte budget and checks the content"""
+    cache = compression.BodyCache(max_bytes=10)
+
+    cache.set(("a",), 1, b"aaaa")
+    cache.set(("b",), 2, b"bbbb")
+    assert cache.get(("a",), 1) == b"aaaa"
+    cache.set(("c",), 3, b"cccc")
+
+    assert cache.get(("b",), 2) is None
+    assert cache.get(("a",), 1) == b"aaaa"
+    assert cache.get(("a",), 9) is None
+    assert cache.size == 8
+
+
+def test_event_stream_not_compressed():
+    """Test Server-Sent Events are passed through so events are not delayed"""
+    middleware = compression.CompressionMiddleware(app)
+    start = {
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream; charset=utf-8")],
+    }
+
+    assert not middleware._compressible(start)
+    assert middleware._compressible(
+        {**start, "headers": [(b"content-type", b"application/json")]}
+    )
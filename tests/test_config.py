@@ -0,0 +1,30 @@
+from baggers.config import Settings
+
+
+def test_settings_defaults():
+    """Test settings fall back to defaults without environment overrides"""
+    settings = Settings.from_env({})
+
+    assert settings.async_mode is False
+    assert settings.database_url == "sqlite:///./baggers.db"
+    assert settings.replica_urls == ""
+
+
+def test_settings_from_env():
+    """Test BAGGERS_* environment variables override settings"""
+    settings = Settings.from_env({"BAGGERS_ASYNC_MODE": "true"})
+
+    assert settings.async_mode is True
+
+
+def test_settings_database_url_from_env():
+    """Test the database URL and replicas are configurable"""
+    settings = Settings.from_env(
+        {
+            "BAGGERS_DATABASE_URL": "postgresql+psycopg://db/baggers",
+            "BAGGERS_REPLICA_URLS": "postgresql+psycopg://replica/baggers",
+        }
+    )
+
+    assert settings.database_url == "postgresql+psycopg://db/baggers"
+    assert settings.replica_urls == "postgresql+psycopg://replica/baggers"
@@ -0,0 +1,48 @@
+import pytest
+
+from baggers import contacts
+
+
+@pytest.mark.parametrize(
+    "phone, expected",
+    [
+        ("0412 345 678", "+61412345678"),
+        ("(04) 1234-5678", "+61412345678"),
+        ("+61 412 345 678", "+61412345678"),
+        ("0061412345678", "+61412345678"),
+        ("412345678", "+61412345678"),
+        ("+44 20 7946 0958", "+442079460958"),
+        ("", None),
+        ("n/a", None),
+        ("+1234567890123456", None),
+        (None, None),
+    ],
+)
+def test_normalize_phone(phone, expected):
+    """Test phone numbers in common formats map to one E.164 form"""
+    assert contacts.normalize_phone(phone) == expected
+
+
+def test_normalize_phone_country_code():
+    """Test national numbers take the given country code"""
+    assert contacts.normalize_phone("020 7946 0958", "44") == "+442079460958"
+
+
+@pytest.mark.parametrize(
+    "email, expected",
+    [
+        (" John.Smith@Example.COM ", "john.smith@example.com"),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_normalize_email(email, expected):
+    """Test email addresses compare ignoring case and whitespace"""
+    assert contacts.normalize_email(email) == expected
+
+
+def test_normalized_columns_partial():
+    """Test only the contact details present are normalized"""
+    assert contacts.normalized_columns({"name": "X", "phoneNumber": "0412"}) == {
+        "phone_normalized": "+61412"
+    }
@@ -1,7 +1,11 @@
+from datetime import datetime
+
 import pytest
+from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 
-from baggers import crud, schemas
+from baggers import crud, schemas, search
+from tests.conftest import TestingSessionLocal, postgresql_only, sqlite_only
 
 
 def test_create_bagger(db):
@@ -66,6 +70,20 @@ def test_get_baggers(db):
     assert baggers[1].name == "User 2"
 
 
+def test_get_baggers_after(db):
+    """Test keyset pagination of baggers by ID"""
+    created = [
+        crud.create_bagger(
+            db=db, bagger=schemas.BaggerCreate(name=f"User {i}", membershipNo=f"AFL{i}")
+        )
+        for i in range(3)
+    ]
+
+    baggers = crud.get_baggers(db=db, after=created[0].id, limit=1)
+
+    assert [b.id for b in baggers] == [created[1].id]
+
+
 def test_get_bagger_by_membership(db):
     """Test retrieving a bagger by membership number"""
     bagger_data = schemas.BaggerCreate(name="Member Test", membershipNo="AFL99999")
@@ -78,6 +96,100 @@ def test_get_bagger_by_membership(db):
     assert retrieved_bagger.membershipNo == "AFL99999"
 
 
+def test_bulk_upsert_baggers_duplicates_in_batch(db):
+    """Test repeated membership numbers within one bulk batch"""
+    baggers = [
+        schemas.BaggerCreate(name="First", membershipNo="AFL1"),
+        schemas.BaggerCreate(name="Second", membershipNo="AFL1"),
+    ]
+
+    rejected = crud.bulk_upsert_baggers(db=db, baggers=baggers)
+    assert [r.status for r in rejected] == ["created", "rejected"]
+
+    upserted = crud.bulk_upsert_baggers(db=db, baggers=baggers, upsert=True)
+    assert [r.status for r in upserted] == ["updated", "updated"]
+    assert crud.get_bagger_by_membership(db=db, membership_no="AFL1").name == "Second"
+
+
+def test_get_baggers_by_membership(db):
+    """Test batch lookup of baggers by membership number"""
+    for i in range(3):
+        crud.create_bagger(
+            db=db, bagger=schemas.BaggerCreate(name=f"User {i}", membershipNo=f"AFL{i}")
+        )
+
+    baggers = crud.get_baggers_by_membership(
+        db=db, membership_nos=["AFL0", "AFL2", "AFL9"], chunk_size=1
+    )
+
+    assert sorted(b.membershipNo for b in baggers) == ["AFL0", "AFL2"]
+
+
+def test_normalized_contacts_follow_writes(db):
+    """Test every write path keeps the normalized contact columns current"""
+    created = crud.create_bagger(
+        db=db,
+        bagger=schemas.BaggerCreate(
+            name="A", membershipNo="AFL1", emailAddress="A@X.com", phoneNumber="0412"
+        ),
+    )
+    assert (created.email_normalized, created.phone_normalized) == ("a@x.com", "+61412")
+
+    updated = crud.update_bagger(
+        db=db,
+        bagger_id=created.id,
+        bagger=schemas.BaggerCreate(name="A", membershipNo="AFL1", phoneNumber="+1 5"),
+    )
+    assert (updated.email_normalized, updated.phone_normalized) == ("a@x.com", "+15")
+
+    crud.bulk_upsert_baggers(
+        db=db,
+        baggers=[
+            schemas.BaggerCreate(name="A", membershipNo="AFL1", emailAddress="B@X"),
+            schemas.BaggerCreate(name="C", membershipNo="AFL2", emailAddress="c@X"),
+        ],
+        upsert=True,
+    )
+    assert [b.email_normalized for b in crud.get_baggers(db=db)] == ["b@x", "c@x"]
+
+
+def test_get_duplicates(db):
+    """Test baggers sharing a normalized contact are clustered, page by page"""
+    for i, (email, phone) in enumerate(
+        [
+            ("Pat@x.com", "0400 000 001"),
+            ("pat@X.com ", "+61400000001"),
+            ("sam@x.com", "0400000002"),
+            ("Sam@x.com", None),
+            ("lee@x.com", None),
+        ]
+    ):
+        crud.create_bagger(
+            db=db,
+            bagger=schemas.BaggerCreate(
+                name=f"M{i}",
+                membershipNo=f"AFL{i}",
+                emailAddress=email,
+                phoneNumber=phone,
+            ),
+        )
+
+    first = crud.get_duplicates(db=db, by="email", limit=1)
+    assert [(key, [r["id"] for r in rows]) for key, rows in first] == [
+        ("pat@x.com", [1, 2])
+    ]
+    rest = crud.get_duplicates(db=db, by="email", after="pat@x.com")
+    assert [(key, [r["id"] for r in rows]) for key, rows in rest] == [
+        ("sam@x.com", [3, 4])
+    ]
+    assert [key for key, _ in crud.get_duplicates(db=db, by="phone")] == [
+        "+61400000001"
+    ]
+    assert [b.id for b in crud.get_baggers_by_phone(db=db, phone="0400-000-002")] == [3]
+    assert [b.id for b in crud.get_baggers_by_email(db=db, email="LEE@x.com")] == [5]
+    assert crud.get_baggers_by_phone(db=db, phone="none") == []
+
+
 def test_update_bagger(db):
     """Test updating an existing bagger"""
     original_data = schemas.BaggerCreate(name="Original Name", membershipNo="AFL555")
@@ -135,3 +247,130 @@ def test_unique_membership_constraint(db):
 
     with pytest.raises(IntegrityError):
         crud.create_bagger(db=db, bagger=bagger2)
+
+
+@sqlite_only
+def test_rebuild_search_index(db):
+    """Test rebuilding the search index from existing rows"""
+    crud.create_bagger(
+        db=db, bagger=schemas.BaggerCreate(name="Indexed User", membershipNo="AFL1")
+    )
+    db.execute(text("DROP TABLE baggers_fts"))
+    db.commit()
+
+    search.rebuild(db.get_bind())
+
+    results = crud.search_baggers(db=db, q="index")
+    assert [row["membershipNo"] for row in results] == ["AFL1"]
+
+
+def test_update_bagger_bumps_version(db):
+    """Test updates bump the row version and the table change counter"""
+    created = crud.create_bagger(
+        db, schemas.BaggerCreate(name="John Doe", membershipNo="AFL12345")
+    )
+    assert created.version == 1
+    before = crud.get_table_version(db)
+
+    updated = crud.update_bagger(
+        db, created.id, schemas.BaggerCreate(name="John Smith", membershipNo="AFL12345")
+    )
+    assert updated.version == 2
+    assert crud.get_bagger_version(db, created.id) == 2
+    assert crud.get_table_version(db) == before + 1
+
+
+def test_update_bagger_version_mismatch(db):
+    """Test a conditional update leaves the row alone if the version moved on"""
+    created = crud.create_bagger(
+        db, schemas.BaggerCreate(name="John Doe", membershipNo="AFL12345")
+    )
+    update = schemas.BaggerCreate(name="John Smith", membershipNo="AFL12345")
+
+    assert crud.update_bagger(db, created.id, update, versions=[2]) is None
+    assert crud.update_bagger(db, created.id, update, versions=[1]).version == 2
+    assert crud.delete_bagger(db, created.id, versions=[1]) is None
+    assert crud.get_bagger(db, created.id).name == "John Smith"
+
+
+def test_changes_logged_in_write_transaction(db):
+    """Test writes append to the change log, with a tombstone for deletes"""
+    created = crud.create_bagger(
+        db, schemas.BaggerCreate(name="John Doe", membershipNo="AFL12345")
+    )
+    crud.update_bagger(
+        db, created.id, schemas.BaggerCreate(name="John Smith", membershipNo="AFL12345")
+    )
+    crud.delete_bagger(db, created.id)
+
+    log = db.execute(
+        text("SELECT bagger_id, operation FROM bagger_changes ORDER BY seq")
+    ).all()
+    assert log == [
+        (created.id, "create"),
+        (created.id, "update"),
+        (created.id, "delete"),
+    ]
+    (change,) = crud.get_changes(db)
+    assert change["operation"] == "delete"
+    assert change["name"] is None
+
+
+@postgresql_only
+def test_changes_wait_for_earlier_writers(db):
+    """Test concurrent writers proceed, and the feed never skips an open one"""
+    with TestingSessionLocal() as first, TestingSessionLocal() as second:
+        early = crud.create_bagger(
+            first, schemas.BaggerCreate(name="Early", membershipNo="A1"), commit=False
+        )
+        second.execute(text("SET lock_timeout = '5s'"))
+        late = crud.create_bagger(
+            second, schemas.BaggerCreate(name="Late", membershipNo="A2")
+        )
+
+        assert crud.get_changes(db) == []
+        first.commit()
+        assert [row["bagger_id"] for row in crud.get_changes(db)] == [
+            early.id,
+            late.id,
+        ]
+
+
+def test_compact_changes(db):
+    """Test compaction drops superseded entries and old tombstones only"""
+    kept = crud.create_bagger(db, schemas.BaggerCreate(name="Kept", membershipNo="A1"))
+    crud.update_bagger(
+        db, kept.id, schemas.BaggerCreate(name="Kept", membershipNo="A1")
+    )
+    gone = crud.create_bagger(db, schemas.BaggerCreate(name="Gone", membershipNo="A2"))
+    crud.delete_bagger(db, gone.id)
+    delete_seq = crud.get_changes(db)[-1]["seq"]
+
+    assert crud.compact_changes(db, before=datetime(2000, 1, 1)) == 2
+    assert crud.get_change_horizon(db) == 0
+    assert [row["operation"] for row in crud.get_changes(db)] == ["update", "delete"]
+
+    assert crud.compact_changes(db, before=datetime(9999, 1, 1)) == 1
+    assert crud.get_change_horizon(db) == delete_seq
+    assert [row["bagger_id"] for row in crud.get_changes(db)] == [kept.id]
+
+
+def test_search_baggers_portable_fallback(db):
+    """Test the regular expression search used without FTS5 matches word starts"""
+    for bagger in (
+        schemas.BaggerCreate(name="John Smith", membershipNo="AFL1"),
+        schemas.BaggerCreate(
+            name="Jane Doe", membershipNo="AFL2", emailAddress="jane@smithfamily.com"
+        ),
+        schemas.BaggerCreate(name="Al Jones", membershipNo="AFL3"),
+    ):
+        crud.create_bagger(db, bagger)
+
+    def search(q, after=None):
+        rows = crud._search_baggers_regexp(db, q, limit=20, after=after)
+        return [row["membershipNo"] for row in rows]
+
+    assert search("SMI") == ["AFL1", "AFL2"]
+    assert search("jo smith") == ["AFL1"]
+    assert search("ones") == []
+    assert search("smi", after=(0.0, 1)) == ["AFL2"]
@@ -0,0 +1,225 @@
+import dataclasses
+import sqlite3
+
+import pytest
+from fastapi import Request, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session, sessionmaker
+
+from baggers import cache, crud, migrations, schemas
+from baggers.config import settings
+from baggers.database import (
+    Base,
+    MemoryDatabase,
+    ReplicaRouter,
+    _engine_options,
+    create_db_engine,
+    get_db,
+    to_async_url,
+)
+from baggers.main import app
+
+
+def test_engine_applies_pragmas(tmp_path):
+    """Test the engine factory applies the SQLite tuning PRAGMAs"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    assert engine.pool.size() == settings.pool_size
+    engine.dispose()
+
+
+def test_engine_respects_settings(tmp_path):
+    """Test PRAGMA values come from the supplied settings"""
+    config = dataclasses.replace(
+        settings, sqlite_journal_mode="delete", sqlite_busy_timeout=250
+    )
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'plain.db'}", config)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 250
+    engine.dispose()
+
+
+def test_engine_in_memory():
+    """Test the engine factory supports in-memory databases"""
+    engine = create_db_engine("sqlite://")
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+    engine.dispose()
+
+
+def test_engine_options_by_dialect():
+    """Test SQLite-only connect arguments are not passed to other dialects"""
+    sqlite_options = _engine_options("sqlite:///./baggers.db", settings)
+    postgres_options = _engine_options("postgresql+psycopg://db/baggers", settings)
+
+    assert sqlite_options["connect_args"] == {"check_same_thread": False}
+    assert "connect_args" not in postgres_options
+    assert postgres_options["pool_size"] == settings.pool_size
+
+
+def test_to_async_url():
+    """Test sync database URLs map to their async drivers"""
+    assert to_async_url("sqlite:///./b.db") == "sqlite+aiosqlite:///./b.db"
+    assert (
+        to_async_url("postgresql+psycopg://u:secret@db/baggers")
+        == "postgresql+asyncpg://u:secret@db/baggers"
+    )
+    assert to_async_url("postgresql+asyncpg://db/b") == "postgresql+asyncpg://db/b"
+
+
+def _on_disk(path) -> list[str]:
+    """Read membership numbers straight from the database file."""
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute('SELECT "membershipNo" FROM baggers')]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def memory_engine(tmp_path):
+    """Create a migrated database file holding one bagger.
+
+    Yields:
+        Callable taking a write-back interval and returning (engine, memory
+        database) serving that file from memory.
+    """
+    path = tmp_path / "kiosk.db"
+    disk = create_db_engine(f"sqlite:///{path}")
+    migrations.upgrade(disk)
+    with Session(disk) as db:
+        crud.create_bagger(db, schemas.BaggerCreate(name="Jo", membershipNo="AFL1"))
+    disk.dispose()
+    opened = []
+
+    def open_memory(persist_seconds):
+        memory = MemoryDatabase(str(path), persist_seconds)
+        engine = create_db_engine(f"sqlite:///{path}", creator=memory.connect)
+        opened.append((engine, memory))
+        return engine, memory
+
+    yield open_memory
+    for engine, memory in opened:
+        engine.dispose()
+        memory.close()
+
+
+def test_memory_database_writes_through(memory_engine, tmp_path):
+    """Test a synchronous write-back puts each committed write on disk"""
+    engine, memory = memory_engine(0)
+
+    with Session(engine) as db:
+        assert crud.get_bagger(db, 1).name == "Jo"
+        db.commit()
+        assert memory.write_backs == 0
+        crud.create_bagger(db, schemas.BaggerCreate(name="Al", membershipNo="AFL2"))
+
+    assert memory.load_seconds is not None
+    assert memory.write_backs == 1
+    assert _on_disk(tmp_path / "kiosk.db") == ["AFL1", "AFL2"]
+
+
+def test_memory_database_bounded_lag(memory_engine, tmp_path):
+    """Test deferred write-backs reach the disk at the latest on close"""
+    engine, memory = memory_engine(60)
+
+    with Session(engine) as db:
+        crud.create_bagger(db, schemas.BaggerCreate(name="Al", membershipNo="AFL2"))
+        assert [b.membershipNo for b in crud.get_baggers(db)] == ["AFL1", "AFL2"]
+    assert _on_disk(tmp_path / "kiosk.db") == ["AFL1"]
+
+    engine.dispose()
+    memory.close()
+    assert memory.write_backs == 1
+    assert _on_disk(tmp_path / "kiosk.db") == ["AFL1", "AFL2"]
+
+
+def test_memory_database_needs_a_file():
+    """Test in-memory serving is refused for databases that are not files"""
+    with pytest.raises(ValueError):
+        MemoryDatabase.from_url("sqlite://", settings)
+    with pytest.raises(ValueError):
+        MemoryDatabase.from_url("postgresql+psycopg://db/baggers", settings)
+
+
+@pytest.fixture
+def replica_router(tmp_path):
+    """Route between a primary database and an empty, separate replica.
+
+    Yields:
+        ReplicaRouter: Router over the two SQLite databases.
+    """
+    primary = create_db_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_db_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for bind in (primary, replica):
+        Base.metadata.create_all(bind=bind)
+    yield ReplicaRouter(primary, [replica], sticky_seconds=60)
+    primary.dispose()
+    replica.dispose()
+
+
+@pytest.fixture
+def replica_client(replica_router):
+    """Serve the app from the primary and replica of ``replica_router``.
+
+    Yields:
+        Callable creating a TestClient with its own cookie jar.
+    """
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+    def override_get_db(request: Request, response: Response):
+        db = SessionLocal(bind=replica_router.bind_for(request, response))
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield lambda: TestClient(app)
+    app.dependency_overrides = {}
+
+
+def test_replica_router(replica_client):
+    """Test reads go to replicas except the change feed and clients that just wrote"""
+    writer, reader = replica_client(), replica_client()
+    bagger = {"name": "John Doe", "membershipNo": "AFL12345"}
+
+    created = writer.post("/baggers/", json=bagger)
+    assert ReplicaRouter.COOKIE in created.cookies
+
+    assert writer.get(f"/baggers/{created.json()['id']}").status_code == 200
+    assert reader.get(f"/baggers/{created.json()['id']}").status_code == 404
+    assert reader.get("/baggers/").json() == []
+    assert [c["id"] for c in reader.get("/baggers/changes").json()["changes"]] == [
+        created.json()["id"]
+    ]
+
+
+def test_replica_reads_do_not_fill_cache(replica_client, replica_router):
+    """Test a lagging replica's rows never reach the cache the primary reads"""
+    cache.configure_cache(cache.LRUCache(max_entries=100, ttl=60))
+    try:
+        writer, reader = replica_client(), replica_client()
+        bagger = {"name": "John Doe", "membershipNo": "AFL12345"}
+        created = writer.post("/baggers/", json=bagger).json()
+        with Session(replica_router.replicas[0]) as replica:
+            crud.create_bagger(db=replica, bagger=schemas.BaggerCreate(**bagger))
+
+        writer.put(f"/baggers/{created['id']}", json={**bagger, "name": "Jane Doe"})
+        assert reader.get(f"/baggers/{created['id']}").json()["name"] == "John Doe"
+        assert reader.get("/baggers/by-membership/AFL12345").status_code == 200
+
+        assert writer.get(f"/baggers/{created['id']}").json()["name"] == "Jane Doe"
+        by_membership = writer.get("/baggers/by-membership/AFL12345")
+        assert by_membership.json()["name"] == "Jane Doe"
+    finally:
+        cache.configure_cache(cache.NullCache())
@@ -0,0 +1,21 @@
+from baggers import etags
+
+
+def test_none_match():
+    """Test If-None-Match uses weak comparison and accepts lists and *"""
+    assert etags.none_match('"1.2"', '"1.2"')
+    assert etags.none_match('W/"1.2"', '"1.2"')
+    assert etags.none_match('"1.1", "1.2"', '"1.2"')
+    assert etags.none_match("*", '"1.2"')
+    assert not etags.none_match('"1.1"', '"1.2"')
+    assert not etags.none_match(None, '"1.2"')
+
+
+def test_match_versions():
+    """Test If-Match yields the strong versions for the targeted bagger only"""
+    assert etags.match_versions('"7.3"', 7) == [3]
+    assert etags.match_versions('"7.3", "7.4"', 7) == [3, 4]
+    assert etags.match_versions('W/"7.3"', 7) == []
+    assert etags.match_versions('"8.3"', 7) == []
+    assert etags.match_versions('"7.x"', 7) == []
+    assert etags.match_versions("*", 7) is None
@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from baggers import crud, group_commit, schemas
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def committer(db):
+    """Route single-record API writes through a group committer.
+
+    Yields:
+        GroupCommitter: Committer writing to the test database.
+    """
+    committer = group_commit.GroupCommitter(
+        TestingSessionLocal, max_batch=10, max_wait=0.05
+    )
+    group_commit.configure_committer(committer)
+    yield committer
+    committer.close()
+    group_commit.configure_committer(None)
+
+
+def test_batch_commits_writes_together(committer, db):
+    """Test queued writes share one transaction but fail individually"""
+    futures = [
+        committer.submit(
+            crud.create_bagger,
+            bagger=schemas.BaggerCreate(name=f"User {i}", membershipNo=no),
+        )
+        for i, no in enumerate(["AFL1", "AFL2", "AFL1", "AFL3"])
+    ]
+
+    created = [future.result(timeout=5) for future in futures if not future.exception()]
+    assert isinstance(futures[2].exception(), IntegrityError)
+    assert [bagger.membershipNo for bagger in created] == ["AFL1", "AFL2", "AFL3"]
+    assert committer.batches == 1
+    assert [bagger.id for bagger in crud.get_baggers(db)] == [
+        bagger.id for bagger in created
+    ]
+
+
+def test_write_submitted_during_close_is_committed(committer, monkeypatch):
+    """Test a close racing a submit cannot stop the writer ahead of the write"""
+    put = committer._queue.put
+
+    def put_while_closing(item):
+        if item is not None:
+            closer = threading.Thread(target=committer.close)
+            closer.start()
+            closer.join(timeout=0.2)
+        put(item)
+
+    monkeypatch.setattr(committer._queue, "put", put_while_closing)
+    future = committer.submit(
+        crud.create_bagger, bagger=schemas.BaggerCreate(name="Late", membershipNo="L1")
+    )
+    monkeypatch.setattr(committer._queue, "put", put)
+
+    assert future.result(timeout=5).membershipNo == "L1"
+
+
+def test_api_writes_through_group_commit(committer, client):
+    """Test POST and PUT results, including the 422 mapping, under group commit"""
+    created = client.post("/baggers/", json={"name": "John", "membershipNo": "AFL1"})
+    duplicate = client.post("/baggers/", json={"name": "Jane", "membershipNo": "AFL1"})
+    updated = client.put(
+        f"/baggers/{created.json()['id']}",
+        json={"name": "John Smith", "membershipNo": "AFL1"},
+        headers={"If-Match": created.headers["ETag"]},
+    )
+    missing = client.put("/baggers/999", json={"name": "Nobody", "membershipNo": "X"})
+
+    assert created.status_code == 200
+    assert duplicate.status_code == 422
+    assert updated.json()["name"] == "John Smith"
+    assert updated.headers["ETag"] == f'"{created.json()["id"]}.2"'
+    assert missing.status_code == 404
+    assert committer.writes == 4
+
+
+def test_idempotent_writes_through_group_commit(committer, client):
+    """Test keyed writes store their response in the batch transaction"""
+    headers = {"Idempotency-Key": "create-1"}
+    body = {"name": "John", "membershipNo": "AFL1"}
+
+    first = client.post("/baggers/", json=body, headers=headers)
+    retry = client.post("/baggers/", json=body, headers=headers)
+
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert committer.writes == 1
@@ -0,0 +1,132 @@
+import dataclasses
+
+from baggers import idempotency, models
+from baggers.config import settings
+
+
+def test_retried_create_is_replayed(client, queries):
+    """Test a retry with the same key returns the first response unchanged"""
+    headers = {"Idempotency-Key": "create-1"}
+    body = {"name": "John", "membershipNo": "AFL1"}
+    first = client.post("/baggers/", json=body, headers=headers)
+    queries.clear()
+
+    retry = client.post("/baggers/", json=body, headers=headers)
+
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["ETag"] == first.headers["ETag"]
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert not any("baggers " in statement for statement in queries)
+    assert len(client.get("/baggers/").json()) == 1
+
+
+def test_reused_key_is_rejected(client):
+    """Test a key cannot be reused for a different request"""
+    headers = {"Idempotency-Key": "create-1"}
+    client.post(
+        "/baggers/", json={"name": "John", "membershipNo": "AFL1"}, headers=headers
+    )
+
+    reused = client.post(
+        "/baggers/", json={"name": "Jane", "membershipNo": "AFL2"}, headers=headers
+    )
+    elsewhere = client.put(
+        "/baggers/1", json={"name": "John", "membershipNo": "AFL1"}, headers=headers
+    )
+
+    assert reused.status_code == 422
+    assert "different request" in reused.json()["detail"]
+    assert elsewhere.status_code == 422
+
+
+def test_retried_update_is_replayed(client):
+    """Test a retried conditional update is replayed rather than failing its If-Match"""
+    created = client.post("/baggers/", json={"name": "John", "membershipNo": "AFL1"})
+    headers = {"If-Match": created.headers["ETag"], "Idempotency-Key": "update-1"}
+    body = {"name": "John Smith", "membershipNo": "AFL1"}
+
+    first = client.put("/baggers/1", json=body, headers=headers)
+    retry = client.put("/baggers/1", json=body, headers=headers)
+    unkeyed = client.put(
+        "/baggers/1", json=body, headers={"If-Match": headers["If-Match"]}
+    )
+
+    assert first.headers["ETag"] == '"1.2"'
+    assert (retry.status_code, retry.json()) == (200, first.json())
+    assert retry.headers["ETag"] == '"1.2"'
+    assert unkeyed.status_code == 412
+
+
+def test_failed_write_is_not_stored(client):
+    """Test a key whose write failed can be retried once the failure is fixed"""
+    client.post("/baggers/", json={"name": "John", "membershipNo": "AFL1"})
+    headers = {"Idempotency-Key": "update-2"}
+    body = {"name": "Jane", "membershipNo": "AFL2"}
+
+    missing = client.put("/baggers/2", json=body, headers=headers)
+    client.post("/baggers/", json={"name": "Someone", "membershipNo": "AFL9"})
+    retry = client.put("/baggers/2", json=body, headers=headers)
+
+    assert missing.status_code == 404
+    assert retry.status_code == 200
+    assert "Idempotent-Replayed" not in retry.headers
+
+
+def test_concurrent_retry_replays_winner(client, monkeypatch):
+    """Test a request that loses a race for its key replays the winner's response"""
+    headers = {"Idempotency-Key": "create-1"}
+    body = {"name": "John", "membershipNo": "AFL1"}
+    first = client.post("/baggers/", json=body, headers=headers)
+    client.put("/baggers/1", json=body, headers={"Idempotency-Key": "update-1"})
+    get_response = idempotency.get_response
+    lookups = []
+
+    def racing(db, key):
+        # The first lookup runs before the winner has committed.
+        lookups.append(key)
+        return None if len(lookups) == 1 else get_response(db, key)
+
+    monkeypatch.setattr(idempotency, "get_response", racing)
+    create = client.post("/baggers/", json=body, headers=headers)
+    lookups.clear()
+    update = client.put(
+        "/baggers/1", json=body, headers={"Idempotency-Key": "update-1"}
+    )
+
+    assert create.json() == first.json()
+    assert create.headers["Idempotent-Replayed"] == "true"
+    assert update.headers["ETag"] == '"1.2"'
+    assert client.get("/baggers/1").headers["ETag"] == '"1.2"'
+
+
+def test_expired_keys_are_evicted(client, db, monkeypatch):
+    """Test expired keys are not replayed and are removed by later writes"""
+    expired = dataclasses.replace(settings, idempotency_ttl=-1)
+    monkeypatch.setattr(idempotency, "settings", expired)
+    for i in range(3):
+        client.post(
+            "/baggers/",
+            json={"name": f"User {i}", "membershipNo": f"AFL{i}"},
+            headers={"Idempotency-Key": f"key-{i}"},
+        )
+
+    retry = client.post(
+        "/baggers/",
+        json={"name": "User 0", "membershipNo": "AFL0"},
+        headers={"Idempotency-Key": "key-0"},
+    )
+
+    assert retry.status_code == 422
+    assert [row.key for row in db.query(models.IdempotencyKey)] == ["key-2"]
+
+
+def test_fingerprint_separates_requests():
+    """Test fingerprints differ by method, path and body"""
+    base = idempotency.fingerprint("POST", "/baggers/", b"{}")
+
+    assert len(base) == 16
+    assert base == idempotency.fingerprint("POST", "/baggers/", b"{}")
+    assert base != idempotency.fingerprint("PUT", "/baggers/", b"{}")
+    assert base != idempotency.fingerprint("POST", "/baggers/1", b"{}")
+    assert base != idempotency.fingerprint("POST", "/baggers/", b"{ }")
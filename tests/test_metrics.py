@@ -0,0 +1,109 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from baggers import metrics
+from baggers.database import create_db_engine
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test histograms render cumulative buckets, count and sum per label set"""
+    histogram = metrics.Histogram("test_seconds", "Test.", ("route",), (0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+
+    lines = histogram.render()
+    assert "# TYPE test_seconds histogram" in lines
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+    assert 'test_seconds_sum{route="/a"} 5.55' in lines
+
+
+def test_server_timing_header(client):
+    """Test responses carry a Server-Timing breakdown with the statement count"""
+    bagger_id = client.post(
+        "/baggers/", json={"name": "John Doe", "membershipNo": "AFL12345"}
+    ).json()["id"]
+
+    response = client.get(f"/baggers/{bagger_id}")
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    assert 'desc="1 queries"' in timing
+    for name in ("db;dur=", "pool;dur=", "queue;dur=", "app;dur="):
+        assert name in timing
+
+
+def test_metrics_endpoint(client):
+    """Test /metrics exposes per-route histograms labelled by path template"""
+    client.get("/baggers/999")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert (
+        'baggers_request_duration_seconds_count{method="GET",'
+        'route="/baggers/{bagger_id}",status="404"}'
+    ) in body
+    assert 'baggers_request_statements_bucket{method="GET"' in body
+    assert "baggers_threadpool_wait_seconds_count" in body
+    assert "baggers_slow_queries_total" in body
+
+
+def test_slow_query_log(caplog):
+    """Test statements over the threshold are logged and counted"""
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine, slow_query_ms=1e-9)
+    before = metrics.SLOW_QUERIES.value
+
+    with caplog.at_level(logging.WARNING, logger="baggers.slow_query"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    assert metrics.SLOW_QUERIES.value == before + 1
+    assert "SELECT 1" in caplog.text
+
+
+def test_slow_query_log_disabled(caplog):
+    """Test a zero threshold disables the slow-query log"""
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine, slow_query_ms=0)
+
+    with caplog.at_level(logging.WARNING, logger="baggers.slow_query"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    assert caplog.text == ""
+
+
+def test_failed_statements_leave_no_timer(caplog):
+    """Test a statement error does not leave its start time on the connection"""
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine, slow_query_ms=1e-9)
+
+    with caplog.at_level(logging.WARNING, logger="baggers.slow_query"):
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT * FROM missing"))
+            conn.execute(text("SELECT 1"))
+
+            assert "query_start" not in conn.info
+    assert "SELECT 1" in caplog.text
+
+
+def test_pool_checkout_timed(tmp_path):
+    """Test engines from the factory record connection pool checkout time"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'timed.db'}")
+    before = metrics.POOL_CHECKOUT_SECONDS.render()[-2]
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    engine.dispose()
+
+    assert metrics.POOL_CHECKOUT_SECONDS.render()[-2] != before
@@ -0,0 +1,169 @@
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from baggers import cli, crud, migrations, schemas
+from baggers.database import Base
+
+
+def _schema(engine):
+    """Summarise tables, columns and their defaults, indexes and triggers."""
+    inspector = inspect(engine)
+    tables = {
+        table: (
+            sorted(
+                (column["name"], column["default"])
+                for column in inspector.get_columns(table)
+            ),
+            sorted(index["name"] for index in inspector.get_indexes(table)),
+        )
+        for table in inspector.get_table_names()
+        if table != migrations.MIGRATIONS_TABLE and not table.startswith("baggers_fts")
+    }
+    if engine.dialect.name == "sqlite":
+        triggers = "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    else:
+        triggers = "SELECT tgname FROM pg_trigger WHERE NOT tgisinternal"
+    with engine.connect() as conn:
+        return tables, sorted(conn.execute(text(triggers)).scalars())
+
+
+def test_upgrade_matches_models(empty_database):
+    """Test migrating an empty database produces the schema the models declare"""
+    migrated = create_engine(empty_database())
+    applied = migrations.upgrade(migrated)
+    assert [m.version for m in applied] == [m.version for m in migrations.MIGRATIONS]
+    assert migrations.upgrade(migrated) == []
+    schema = _schema(migrated)
+    migrated.dispose()
+
+    declared = create_engine(empty_database())
+    Base.metadata.create_all(bind=declared)
+
+    assert schema == _schema(declared)
+    declared.dispose()
+
+
+def test_upgrade_to_target(empty_database):
+    """Test an upgrade can stop at a given version and resume later"""
+    engine = create_engine(empty_database())
+
+    migrations.upgrade(engine, target=2)
+    assert migrations.applied_versions(engine) == {1, 2}
+    assert not inspect(engine).has_table("bagger_changes")
+
+    migrations.upgrade(engine)
+    assert migrations.applied_versions(engine) == {
+        m.version for m in migrations.MIGRATIONS
+    }
+
+
+def test_upgrade_existing_database(tmp_path):
+    """Test a database from before migrations is upgraded in place"""
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE baggers (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+        '"membershipNo" VARCHAR NOT NULL UNIQUE, "emailAddress" VARCHAR, '
+        '"phoneNumber" VARCHAR)'
+    )
+    conn.execute(
+        "INSERT INTO baggers (name, membershipNo) VALUES ('John Smith', 'AFL1')"
+    )
+    conn.commit()
+    conn.close()
+    engine = create_engine(f"sqlite:///{path}")
+
+    migrations.upgrade(engine)
+
+    with Session(engine) as db:
+        assert crud.get_bagger(db, 1).version == 1
+        assert [row["membershipNo"] for row in crud.search_baggers(db, "smi")] == [
+            "AFL1"
+        ]
+        assert [row["operation"] for row in crud.get_changes(db)] == ["create"]
+        crud.update_bagger(
+            db, 1, schemas.BaggerCreate(name="John Smith", membershipNo="AFL1")
+        )
+        assert crud.get_changes(db)[0]["operation"] == "update"
+
+
+def test_existing_rows_stamped_with_migration_time(empty_database):
+    """Test updated_at is backfilled, and later defaults to the insert time"""
+    engine = create_engine(empty_database())
+    migrations.upgrade(engine, target=1)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO baggers (name, \"membershipNo\") VALUES ('A', 'AFL1')")
+        )
+
+    migrations.upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO baggers (name, \"membershipNo\") VALUES ('B', 'AFL2')")
+        )
+    with Session(engine) as db:
+        stamped = [bagger.updated_at.year for bagger in crud.get_baggers(db)]
+        assert stamped == [datetime.now(timezone.utc).year] * 2
+        assert [row["name"] for row in crud.search_baggers(db, "b")] == ["B"]
+
+
+def test_migrate_status(empty_database, monkeypatch, capsys):
+    """Test the migrate command reports applied and pending migrations"""
+    engine = create_engine(empty_database())
+    monkeypatch.setattr(cli, "engine", engine)
+
+    cli.main(["migrate", "--to", "3"])
+    cli.main(["migrate", "--status"])
+
+    output = capsys.readouterr().out.splitlines()
+    assert "0003 change log: applied" in output
+    assert "0004 name and email indexes: pending" in output
+
+
+def test_normalized_contacts_backfilled(empty_database):
+    """Test existing baggers get normalized contacts without logging updates"""
+    engine = create_engine(empty_database())
+    migrations.upgrade(engine, target=6)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                'INSERT INTO baggers (name, "membershipNo", "emailAddress", '
+                "\"phoneNumber\") VALUES ('A', 'AFL1', 'A@X.com', '0412 345 678'), "
+                "('B', 'AFL2', NULL, NULL)"
+            )
+        )
+
+    migrations.upgrade(engine)
+
+    with Session(engine) as db:
+        assert [
+            (b.email_normalized, b.phone_normalized) for b in crud.get_baggers(db)
+        ] == [("a@x.com", "+61412345678"), (None, None)]
+        assert [row["operation"] for row in crud.get_changes(db)] == ["create"] * 2
+        crud.update_bagger(db, 2, schemas.BaggerCreate(name="B", membershipNo="AFL2"))
+        assert crud.get_changes(db)[-1]["operation"] == "update"
+
+
+def test_email_index_name_restored(empty_database):
+    """Test the email index folded to lower case by PostgreSQL is renamed"""
+    engine = create_engine(empty_database())
+    if engine.dialect.name != "postgresql":
+        pytest.skip("PostgreSQL-specific behaviour")
+    migrations.upgrade(engine, target=9)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                'ALTER INDEX "ix_baggers_emailAddress" RENAME TO ix_baggers_emailaddress'
+            )
+        )
+
+    migrations.upgrade(engine)
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("baggers")}
+    assert "ix_baggers_emailAddress" in indexes
+    assert "ix_baggers_emailaddress" not in indexes
+    engine.dispose()
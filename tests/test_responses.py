@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from baggers import responses
+
+ROWS = [
+    {
+        "id": 1,
+        "name": "Zoë Smith",
+        "membershipNo": "AFL1",
+        "emailAddress": None,
+        "phoneNumber": "0400",
+    }
+]
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_bagger_json_response_encoding(monkeypatch, use_orjson):
+    """Test rows encode identically with and without orjson"""
+    if not use_orjson:
+        monkeypatch.setattr(responses, "orjson", None)
+    elif responses.orjson is None:
+        pytest.skip("orjson not installed")
+
+    body = responses.BaggerJSONResponse(ROWS).body
+
+    assert json.loads(body) == ROWS
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_bagger_json_response_projection(monkeypatch, use_orjson):
+    """Test projected rows encode with just their own keys"""
+    if not use_orjson:
+        monkeypatch.setattr(responses, "orjson", None)
+    elif responses.orjson is None:
+        pytest.skip("orjson not installed")
+    rows = [{"id": 1, "membershipNo": "AFL1"}]
+
+    body = responses.BaggerJSONResponse(rows, fields=("id", "membershipNo")).body
+
+    assert json.loads(body) == rows
@@ -0,0 +1,50 @@
+import dataclasses
+
+import pytest
+from sqlalchemy import create_engine
+
+from baggers import migrations, server
+from baggers.config import settings
+
+
+def test_worker_settings_split_cache():
+    """Test each worker gets an equal share of the SQLite page cache budget"""
+    config = dataclasses.replace(settings, sqlite_cache_size=-64000)
+
+    assert server.worker_settings(config, 1) == {"BAGGERS_SQLITE_CACHE_SIZE": "-64000"}
+    assert server.worker_settings(config, 3) == {"BAGGERS_SQLITE_CACHE_SIZE": "-21333"}
+    assert server.worker_count(2) == 2
+    assert server.worker_count(0) >= 1
+
+
+def test_worker_settings_leave_other_databases_alone():
+    """Test page counts and non-SQLite databases are passed through unchanged"""
+    pages = dataclasses.replace(settings, sqlite_cache_size=2000)
+    postgres = dataclasses.replace(
+        settings, database_url="postgresql+psycopg://db/baggers"
+    )
+
+    assert server.worker_settings(pages, 4) == {}
+    assert server.worker_settings(postgres, 4) == {}
+
+
+def test_prepare_database_requires_migrations(tmp_path):
+    """Test the server refuses to start on an unmigrated database unless asked"""
+    path = tmp_path / "serve.db"
+    config = dataclasses.replace(settings, database_url=f"sqlite:///{path}")
+
+    with pytest.raises(SystemExit, match="baggers migrate"):
+        server.prepare_database(config)
+
+    server.prepare_database(config, migrate=True)
+    engine = create_engine(f"sqlite:///{path}")
+    assert len(migrations.applied_versions(engine)) == len(migrations.MIGRATIONS)
+    engine.dispose()
+
+
+def test_serve_in_memory_needs_one_worker():
+    """Test in-memory serving refuses to start several workers"""
+    config = dataclasses.replace(settings, sqlite_memory=True)
+
+    with pytest.raises(SystemExit, match="single worker"):
+        server.serve(config, workers=2)
@@ -0,0 +1,189 @@
+import csv
+import json
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from baggers import crud, migrations, models, schemas, transfer
+from baggers.database import create_db_engine
+
+
+@pytest.fixture
+def bind(empty_database):
+    """Create a migrated database for an import.
+
+    Yields:
+        Engine: Engine bound to the new database.
+    """
+    engine = create_db_engine(empty_database())
+    migrations.upgrade(engine)
+    yield engine
+    engine.dispose()
+
+
+def write_ndjson(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return str(path)
+
+
+def members(count, start=0):
+    return [
+        {"name": f"Member {i}", "membershipNo": f"M{i:05d}", "emailAddress": None}
+        for i in range(start, start + count)
+    ]
+
+
+def test_import_round_trips_csv_and_ndjson(bind, tmp_path):
+    """Test an export can be imported into another database unchanged"""
+    source = write_ndjson(tmp_path / "in.ndjson", members(25))
+    summary = transfer.import_file(bind, source, batch_size=10, workers=1)
+
+    assert (summary.position, summary.created, summary.rejected) == (25, 25, 0)
+    for format in ("csv", "ndjson"):
+        path = str(tmp_path / f"out.{format}")
+        assert transfer.export_file(bind, path) == 25
+
+        copy = create_db_engine(f"sqlite:///{tmp_path / f'{format}.db'}")
+        migrations.upgrade(copy)
+        assert transfer.import_file(copy, path, workers=2).created == 25
+        assert list(crud.iter_baggers(copy)) == list(crud.iter_baggers(bind))
+        copy.dispose()
+
+    with open(tmp_path / "out.csv", newline="") as f:
+        header = next(csv.reader(f))
+    assert header == list(crud.BAGGER_COLUMNS)
+
+
+def test_import_reports_rejected_records(bind, tmp_path):
+    """Test invalid and conflicting records are rejected without failing the rest"""
+    with Session(bind) as db:
+        crud.create_bagger(
+            db, schemas.BaggerCreate(name="Taken", membershipNo="M00001")
+        )
+    path = tmp_path / "in.ndjson"
+    path.write_text(
+        json.dumps(members(1)[0])
+        + "\n{not json\n\n"
+        + json.dumps({"name": "No number"})
+        + "\n"
+        + json.dumps(members(1, start=1)[0])
+        + "\n"
+    )
+    rejects = tmp_path / "rejects.ndjson"
+
+    summary = transfer.import_file(bind, str(path), workers=1, rejects=str(rejects))
+
+    assert (summary.created, summary.rejected) == (1, 3)
+    assert [json.loads(line) for line in rejects.read_text().splitlines()] == [
+        {"record": 1, "detail": "Invalid JSON"},
+        {"record": 2, "detail": "membershipNo: Field required"},
+        {"record": 3, "detail": "Membership number already registered"},
+    ]
+
+
+def test_import_resumes_from_checkpoint(bind, tmp_path, monkeypatch):
+    """Test an interrupted import continues after its last committed batch"""
+    source = write_ndjson(tmp_path / "in.ndjson", members(30))
+    write_batch = transfer._write_batch
+    calls = []
+
+    def interrupted(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        write_batch(*args)
+
+    monkeypatch.setattr(transfer, "_write_batch", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        transfer.import_file(bind, source, batch_size=10, workers=1)
+    with Session(bind) as db:
+        checkpoint = db.get(models.ImportCheckpoint, str(tmp_path / "in.ndjson"))
+        assert (checkpoint.position, checkpoint.created) == (10, 10)
+        assert db.query(models.Bagger).count() == 10
+
+    monkeypatch.setattr(transfer, "_write_batch", write_batch)
+    summary = transfer.import_file(bind, source, batch_size=10, workers=1)
+
+    assert (summary.resumed_from, summary.created, summary.rejected) == (10, 30, 0)
+    with Session(bind) as db:
+        assert db.query(models.Bagger).count() == 30
+        assert db.query(models.ImportCheckpoint).count() == 0
+
+
+def test_import_refuses_changed_file(bind, tmp_path):
+    """Test a checkpoint is not applied to a file that changed since"""
+    source = write_ndjson(tmp_path / "in.ndjson", members(3))
+    with Session(bind) as db:
+        db.add(
+            models.ImportCheckpoint(
+                source=source, fingerprint="0:0", position=2, created=2
+            )
+        )
+        db.commit()
+
+    with pytest.raises(ValueError, match="--restart"):
+        transfer.import_file(bind, source, workers=1)
+    assert transfer.import_file(bind, source, workers=1, restart=True).created == 3
+
+
+def test_import_rebuilds_deferred_indexes(bind, tmp_path):
+    """Test secondary indexes and search triggers are back after an import"""
+    before = {index["name"] for index in inspect(bind).get_indexes("baggers")}
+    source = write_ndjson(tmp_path / "in.ndjson", members(5))
+
+    transfer.import_file(bind, source, workers=1)
+
+    assert {index["name"] for index in inspect(bind).get_indexes("baggers")} == before
+    with Session(bind) as db:
+        assert [b.name for b in crud.search_baggers(db, "member 3")] == ["Member 3"]
+        crud.create_bagger(db, schemas.BaggerCreate(name="Later", membershipNo="L1"))
+        assert [b.name for b in crud.search_baggers(db, "later")] == ["Later"]
+    if bind.dialect.name == "sqlite":
+        with bind.connect() as conn:
+            triggers = conn.execute(
+                text("SELECT count(*) FROM sqlite_master WHERE type = 'trigger'")
+            ).scalar()
+        assert triggers >= 3
+
+
+def test_interrupted_import_rebuilds_deferred_indexes(bind, tmp_path, monkeypatch):
+    """Test an interrupted import does not leave indexes or triggers dropped"""
+    before = {index["name"] for index in inspect(bind).get_indexes("baggers")}
+    source = write_ndjson(tmp_path / "in.ndjson", members(5))
+
+    def interrupted(*args):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(transfer, "_write_batch", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        transfer.import_file(bind, source, workers=1)
+
+    assert {index["name"] for index in inspect(bind).get_indexes("baggers")} == before
+    with Session(bind) as db:
+        crud.create_bagger(db, schemas.BaggerCreate(name="Later", membershipNo="L1"))
+        assert [b.name for b in crud.search_baggers(db, "later")] == ["Later"]
+
+
+def test_detect_format():
+    """Test formats are inferred from the suffix unless given"""
+    assert transfer.detect_format("a.CSV") == "csv"
+    assert transfer.detect_format("a.jsonl") == "ndjson"
+    assert transfer.detect_format("a.txt", "ndjson") == "ndjson"
+    with pytest.raises(ValueError, match="--format"):
+        transfer.detect_format("a.txt")
+
+
+@pytest.mark.skipif(transfer.pyarrow is None, reason="needs the parquet extra")
+def test_parquet_round_trip(bind, tmp_path):
+    """Test baggers survive a Parquet export and import"""
+    transfer.import_file(
+        bind, write_ndjson(tmp_path / "in.ndjson", members(12)), workers=1
+    )
+    path = str(tmp_path / "out.parquet")
+
+    assert transfer.export_file(bind, path, batch_size=5) == 12
+    copy = create_db_engine(f"sqlite:///{tmp_path / 'copy.db'}")
+    migrations.upgrade(copy)
+    assert transfer.import_file(copy, path, workers=1).created == 12
+    copy.dispose()